@@ -0,0 +1,55 @@
+"""
+Benchmark: integración de IA contra el servidor OpenAI simulado (benchmarks/mock_openai_server.py).
+Envía N peticiones de IA de texto primero en serie (una en vuelo, como el cliente síncrono anterior) y luego
+todas a la vez con el cliente asíncrono (AI_MAX_CONCURRENCY en vuelo, token bucket compartido). Informa el
+tiempo total, las respuestas 429 del servidor y el estado final del limitador de tasa.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ai_concurrency [-n 40] [--concurrency 8] [--latency 0.5] [--server-rpm 120] [--client-rpm 100]
+"""
+import argparse
+import time
+
+from config import settings
+from benchmarks.mock_openai_server import start_mock_server
+
+
+def _run(n: int, concurrency: int, client_rpm: float, burst: int, base_url: str, concurrent: bool) -> tuple:
+    from core.ai_integration import AIIntegrator
+    settings.AI_BASE_URL, settings.OPENROUTER_API_KEY = base_url, "mock"
+    settings.AI_MAX_CONCURRENCY, settings.AI_REQUESTS_PER_MINUTE, settings.AI_RATE_LIMIT_BURST = concurrency, client_rpm, burst
+    settings.API_MAX_RETRIES, settings.AI_CACHE_ENABLED = 5, False # Sin caché: la segunda pasada repetiría los mismos textos
+    integrator = AIIntegrator()
+    texts = [f"Acta de Entrega No. {40000 + i} CC {10000000 + i}" for i in range(n)]
+    start = time.perf_counter()
+    if concurrent:
+        futures = [integrator.submit_text_ai(text, f"doc_{i}.pdf") for i, text in enumerate(texts)]
+        results = [future.result() for future in futures]
+    else:
+        results = [integrator.get_data_with_text_ai(text, f"doc_{i}.pdf") for i, text in enumerate(texts)]
+    elapsed = time.perf_counter() - start
+    stats = integrator.stats()
+    integrator.close()
+    return elapsed, sum(1 for result in results if result), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--server-rpm", type=float, default=120)
+    parser.add_argument("--client-rpm", type=float, default=100)
+    parser.add_argument("--burst", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, concurrency, concurrent in [("en serie", 1, False), (f"asíncrono x{args.concurrency}", args.concurrency, True)]:
+        server = start_mock_server(latency=args.latency, rpm=args.server_rpm, burst=args.burst)
+        elapsed, ok, stats = _run(args.n, concurrency, args.client_rpm, args.burst, server.base_url, concurrent)
+        server.shutdown(); server.server_close()
+        print(f"{label}: {args.n} peticiones en {elapsed:.1f}s ({ok} con datos) | 429 del servidor: {server.rejected} | "
+              f"máximo en vuelo: {server.max_in_flight} | limitador: {stats}")
+
+
+if __name__ == "__main__":
+    main()
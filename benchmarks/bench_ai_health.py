@@ -0,0 +1,54 @@
+"""
+Benchmark: circuit breaker y timeout adaptativo por modelo (core/ai_health.py) contra el servidor OpenAI
+simulado, con el modelo de visión caído (responde 503 tras --vision-latency segundos). Cada documento pasa
+por visión y luego por texto, como el fallback en cadena. Sin circuit breaker, todos los documentos pagan
+la espera (y los reintentos) de la visión; con él, tras AI_CIRCUIT_FAILURE_THRESHOLD fallos los siguientes
+van directos al texto. Informa la latencia media por documento, las peticiones de visión que llegaron al
+servidor y la salud final de cada modelo (percentiles de latencia y timeout adaptativo aprendido).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ai_health [-n 12] [--latency 0.3] [--vision-latency 1.0] [--threshold 3]
+"""
+import argparse
+import time
+from PIL import Image
+
+from config import settings
+from core.ai_health import reset_model_health
+from benchmarks.mock_openai_server import start_mock_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--vision-latency", type=float, default=1.0)
+    parser.add_argument("--threshold", type=int, default=3)
+    args = parser.parse_args()
+
+    from core.ai_integration import AIIntegrator
+    image = Image.new("L", (1700, 2200), "white")
+    for label, threshold in (("sin circuit breaker", 10 ** 6), (f"circuit breaker tras {args.threshold} fallos", args.threshold)):
+        server = start_mock_server(latency=args.latency, vision_latency=args.vision_latency, vision_error_status=503, rpm=6000, burst=100)
+        settings.AI_BASE_URL, settings.OPENROUTER_API_KEY = server.base_url, "mock"
+        settings.AI_REQUESTS_PER_MINUTE, settings.AI_RATE_LIMIT_BURST, settings.AI_CACHE_ENABLED = 6000, 100, False
+        settings.AI_CIRCUIT_FAILURE_THRESHOLD, settings.AI_CIRCUIT_COOLDOWN_SECONDS = threshold, 600
+        reset_model_health()
+        integrator = AIIntegrator()
+        latencies, completed = [], 0
+        for i in range(args.n):
+            text, filename = f"Acta de Entrega No. {40000 + i} CC {10000000 + i}", f"doc_{i}.pdf"
+            start = time.perf_counter()
+            data = integrator.get_data_with_vision_ai(image, filename, "entregado_manuscrito")
+            if not data: data = integrator.get_data_with_text_ai(text, filename)
+            completed += bool(data)
+            latencies.append(time.perf_counter() - start)
+        print(f"{label}: latencia media {sum(latencies) / len(latencies):.2f}s, total {sum(latencies):.1f}s | "
+              f"documentos con datos: {completed}/{args.n} | peticiones de visión al servidor: {server.vision_requests}")
+        print(f"    salud: {integrator.health_stats()}")
+        integrator.close()
+        server.shutdown(); server.server_close()
+
+
+if __name__ == "__main__":
+    main()
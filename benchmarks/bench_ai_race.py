@@ -0,0 +1,73 @@
+"""
+Benchmark: fallback de IA en cadena (visión y luego texto) vs. en carrera (core/ai_race.py) contra el
+servidor OpenAI simulado, con un modelo de visión más lento que el de texto (--vision-latency). Cada
+documento parte sin acta, así que la visión es necesaria; informa la latencia media y máxima por
+documento, cuántas peticiones llegaron al servidor y quién ganó cada carrera.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ai_race [-n 10] [--latency 0.5] [--vision-latency 3.0] [--hedge 0 1 4]
+"""
+import argparse
+import time
+from collections import Counter
+from PIL import Image
+
+from config import settings
+from core.ai_race import RaceEntrant, race_extractors
+from benchmarks.mock_openai_server import start_mock_server
+
+FIELDS = ("id_type", "id_number", "acta_no")
+
+
+def _merged(results: dict) -> dict:
+    # Misma precedencia que la GUI: la visión reemplaza, el texto solo rellena lo vacío
+    data = {"id_type": "CC", "id_number": "12345678", "acta_no": None}
+    for key in FIELDS:
+        if (results.get("vision") or {}).get(key) is not None: data[key] = results["vision"][key]
+    for key in FIELDS:
+        if data[key] is None and (results.get("text") or {}).get(key) is not None: data[key] = results["text"][key]
+    return data
+
+
+def _run(integrator, image, n: int, hedge: float = None) -> tuple:
+    latencies, winners = [], Counter()
+    for i in range(n):
+        text, filename = f"Acta de Entrega No. {40000 + i} CC {10000000 + i}", f"doc_{i}.pdf"
+        start = time.perf_counter()
+        if hedge is None: # Cadena: el texto solo si la visión no completó los datos
+            results = {"vision": integrator.get_data_with_vision_ai(image, filename, "entregado_manuscrito")}
+            if not all(_merged(results).values()): results["text"] = integrator.get_data_with_text_ai(text, filename)
+        else:
+            outcome = race_extractors(
+                [RaceEntrant("vision", lambda results: integrator.submit_vision_ai(image, filename, "entregado_manuscrito")),
+                 RaceEntrant("text", lambda results: integrator.submit_text_ai(text, filename), hedge)],
+                is_done=lambda results: all(_merged(results).values()))
+            winners[outcome.winner or "ninguno"] += 1
+        latencies.append(time.perf_counter() - start)
+    return latencies, winners
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--vision-latency", type=float, default=3.0)
+    parser.add_argument("--hedge", type=float, nargs="+", default=[0.0, 1.0, 4.0])
+    args = parser.parse_args()
+
+    from core.ai_integration import AIIntegrator
+    image = Image.new("L", (1700, 2200), "white")
+    for label, hedge in [("cadena", None)] + [(f"carrera, texto a los {h:g}s", h) for h in args.hedge]:
+        server = start_mock_server(latency=args.latency, vision_latency=args.vision_latency, rpm=6000, burst=100)
+        settings.AI_BASE_URL, settings.OPENROUTER_API_KEY = server.base_url, "mock"
+        settings.AI_REQUESTS_PER_MINUTE, settings.AI_RATE_LIMIT_BURST, settings.AI_CACHE_ENABLED = 6000, 100, False
+        integrator = AIIntegrator()
+        latencies, winners = _run(integrator, image, args.n, hedge)
+        integrator.close()
+        server.shutdown(); server.server_close()
+        print(f"{label}: latencia media {sum(latencies) / len(latencies):.2f}s, máxima {max(latencies):.2f}s | "
+              f"peticiones al servidor: {server.served} | ganadores: {dict(winners) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark: respuestas de IA completas vs. por streaming con corte en cuanto llega el JSON, contra el
+servidor OpenAI simulado (benchmarks/mock_openai_server.py). El servidor simula un modelo que, tras el
+JSON, sigue generando una explicación de --trailing-words palabras (--token-delay s por palabra). Informa
+la latencia media por petición y, con streaming, el tiempo al primer token y al JSON completo.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ai_streaming [-n 20] [--latency 0.5] [--trailing-words 150] [--token-delay 0.02]
+"""
+import argparse
+import time
+
+from config import settings
+from benchmarks.mock_openai_server import start_mock_server
+
+
+def _run(n: int, base_url: str, streaming: bool) -> tuple:
+    from core.ai_integration import AIIntegrator
+    settings.AI_BASE_URL, settings.OPENROUTER_API_KEY = base_url, "mock"
+    settings.AI_REQUESTS_PER_MINUTE, settings.AI_RATE_LIMIT_BURST = 6000, 100
+    settings.AI_CACHE_ENABLED, settings.AI_STREAMING = False, streaming # Sin caché: ambas pasadas envían los mismos textos
+    integrator = AIIntegrator()
+    latencies, ok = [], 0
+    for i in range(n): # En serie: se mide la latencia de cada petición, no el rendimiento en paralelo
+        start = time.perf_counter()
+        ok += bool(integrator.get_data_with_text_ai(f"Acta de Entrega No. {40000 + i} CC {10000000 + i}", f"doc_{i}.pdf"))
+        latencies.append(time.perf_counter() - start)
+    stream_stats = integrator.stream_stats()
+    integrator.close()
+    return sum(latencies) / n, ok, stream_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--trailing-words", type=int, default=150)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    for label, streaming in [("respuesta completa", False), ("streaming con corte", True)]:
+        server = start_mock_server(latency=args.latency, rpm=6000, burst=100, trailing_words=args.trailing_words, token_delay=args.token_delay)
+        mean_latency, ok, stream_stats = _run(args.n, server.base_url, streaming)
+        server.shutdown(); server.server_close()
+        print(f"{label}: latencia media {mean_latency:.2f}s ({ok}/{args.n} con datos)" + (f" | {stream_stats}" if stream_stats else ""))
+
+
+if __name__ == "__main__":
+    main()
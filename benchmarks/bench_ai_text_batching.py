@@ -0,0 +1,58 @@
+"""
+Benchmark: IA de texto en lotes contra el servidor OpenAI simulado (benchmarks/mock_openai_server.py).
+Envía N documentos primero con una petición por documento (todas en vuelo a la vez, como la etapa "ai"
+sin lotes) y luego con AIIntegrator.get_data_with_text_ai_batch (AI_TEXT_BATCH_SIZE documentos por
+petición). Informa el tiempo total, las peticiones atendidas por el servidor, las respuestas 429 y los
+reintentos individuales (con --omit-every el servidor omite entradas de cada lote).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ai_text_batching [-n 40] [--batch-size 5] [--latency 0.5] [--server-rpm 30] [--omit-every 0]
+"""
+import argparse
+import time
+
+from config import settings
+from benchmarks.mock_openai_server import start_mock_server
+
+
+def _run(n: int, batch_size: int, base_url: str, client_rpm: float, burst: int) -> tuple:
+    from core.ai_integration import AIIntegrator
+    settings.AI_BASE_URL, settings.OPENROUTER_API_KEY = base_url, "mock"
+    settings.AI_REQUESTS_PER_MINUTE, settings.AI_RATE_LIMIT_BURST = client_rpm, burst
+    settings.API_MAX_RETRIES, settings.AI_CACHE_ENABLED = 5, False # Sin caché: ambas pasadas envían los mismos textos
+    settings.AI_TEXT_BATCH_SIZE = batch_size
+    integrator = AIIntegrator()
+    items = [(f"Acta de Entrega No. {40000 + i}\nPaciente ... Identificación CC {10000000 + i}", f"doc_{i}.pdf") for i in range(n)]
+    start = time.perf_counter()
+    if batch_size > 1:
+        results = integrator.get_data_with_text_ai_batch(items)
+    else:
+        futures = [integrator.submit_text_ai(text, filename) for text, filename in items]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+    batch_stats = integrator.batch_stats()
+    integrator.close()
+    return elapsed, sum(1 for result in results if result), batch_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--server-rpm", type=float, default=30)
+    parser.add_argument("--client-rpm", type=float, default=30)
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--omit-every", type=int, default=0)
+    args = parser.parse_args()
+
+    for label, batch_size in [("una petición por documento", 1), (f"lotes de {args.batch_size}", args.batch_size)]:
+        server = start_mock_server(latency=args.latency, rpm=args.server_rpm, burst=args.burst, omit_every=args.omit_every)
+        elapsed, ok, batch_stats = _run(args.n, batch_size, server.base_url, args.client_rpm, args.burst)
+        server.shutdown(); server.server_close()
+        print(f"{label}: {args.n} documentos en {elapsed:.1f}s ({ok} con datos) | peticiones atendidas: {server.served} | "
+              f"429 del servidor: {server.rejected} | lotes: {batch_stats or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: coste de cada peldaño de OCR_DPI_LADDER por el camino real de PDFProcessor (caché de páginas
+vacía, render de Poppler, orientación, preprocesamiento y readtext de EasyOCR). Para cada DPI compara
+renderizar al propio DPI del peldaño (lo que hace la escalera) con el render al mínimo de la caché
+(PAGE_CACHE_MIN_RENDER_DPI) reescalado después, que era lo que ocurría antes para los peldaños bajos.
+Informa tiempos de render y OCR, megapíxeles y cuántos campos se resuelven en cada peldaño.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_dpi_ladder actas/*.pdf [--dpi 120 200 300] [--no-ocr]
+"""
+import argparse
+import os
+import time
+
+from config import settings
+from core.page_cache import page_image_cache
+from core.pdf_processor import PDFProcessor
+
+FIELDS = ("id_type", "id_number", "acta_no")
+
+
+def _render(pdf_path: str, dpi: int, exact_render: bool) -> tuple:
+    page_image_cache.clear()
+    start = time.perf_counter()
+    page = page_image_cache.get_page(pdf_path, page=1, dpi=dpi, exact_render=exact_render)
+    return time.perf_counter() - start, page.width * page.height
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--dpi", type=int, nargs="+", default=list(getattr(settings, 'OCR_DPI_LADDER', None) or [120, 200, 300]))
+    parser.add_argument("--no-ocr", action="store_true", help="Solo medir el render")
+    args = parser.parse_args()
+
+    processor = None if args.no_ocr else PDFProcessor(use_daemon=False)
+    totals = {dpi: {"render": 0.0, "render_floor": 0.0, "ocr": 0.0, "fields": 0} for dpi in args.dpi}
+    for pdf_path in args.pdfs:
+        for dpi in args.dpi:
+            exact_seconds, pixels = _render(pdf_path, dpi, exact_render=True)
+            floor_seconds, _ = _render(pdf_path, dpi, exact_render=False)
+            row = totals[dpi]
+            row["render"] += exact_seconds; row["render_floor"] += floor_seconds
+            line = (f"{os.path.basename(pdf_path)} @ {dpi} dpi: {pixels / 1e6:.2f} MP, render {exact_seconds * 1000:.0f} ms "
+                    f"(render a {max(dpi, page_image_cache.min_render_dpi)} dpi + reescalado {floor_seconds * 1000:.0f} ms)")
+            if processor:
+                page_image_cache.clear()
+                start = time.perf_counter()
+                page_np = processor._load_page_for_ocr(pdf_path, dpi)
+                lines = processor.readtext_batch([page_np], detail=0, paragraph=True)[0] or []
+                ocr_seconds = time.perf_counter() - start
+                data = processor.extract_printed_data_from_text("\n".join(lines), verbose=False)
+                resolved = sum(1 for field in FIELDS if data.get(field))
+                row["ocr"] += ocr_seconds; row["fields"] += resolved
+                line += f" | render+OCR {ocr_seconds:.2f}s, campos {resolved}/{len(FIELDS)}"
+            print(line)
+
+    n = len(args.pdfs)
+    for dpi, row in totals.items():
+        summary = f"{dpi} dpi: render medio {row['render'] / n * 1000:.0f} ms (con render mínimo de la caché {row['render_floor'] / n * 1000:.0f} ms)"
+        if processor: summary += f" | render+OCR medio {row['ocr'] / n:.2f}s, campos resueltos {row['fields']}/{n * len(FIELDS)}"
+        print(summary)
+
+
+if __name__ == "__main__":
+    main()
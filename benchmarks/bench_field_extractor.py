@@ -0,0 +1,70 @@
+"""
+Benchmark y verificación: cascada de regex anterior de extract_printed_data_from_text vs.
+extractor de una sola pasada (core.field_extractor.scan_printed_fields).
+
+Primero comprueba que ambos devuelven exactamente los mismos campos sobre el corpus de regresión
+(más variantes aleatorias generadas a partir de sus fragmentos; la misma comprobación, con menos casos,
+está en tests/test_field_extractor_equivalence.py) y luego mide el tiempo sobre
+textos grandes de varias páginas, como los de extracción directa.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_field_extractor [--pages 1 10 50] [--repeat N] [--fuzz N] [--seed S]
+"""
+import argparse
+import random
+import time
+
+from tests.test_field_extractor_equivalence import CORPUS, legacy_cascade, random_text, single_pass
+
+
+def verify(fuzz_cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    cases = CORPUS + [random_text(rng) for _ in range(fuzz_cases)]
+    mismatches = 0
+    for text in cases:
+        expected, got = legacy_cascade(text), single_pass(text)
+        if expected != got:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"DIFERENCIA en {text[:120]!r}:\n  cascada:     {expected}\n  una pasada:  {got}")
+    print(f"Equivalencia: {len(cases) - mismatches}/{len(cases)} casos idénticos ({len(CORPUS)} del corpus, {fuzz_cases} aleatorios).")
+    return mismatches
+
+
+def _multi_page_text(pages: int, rng: random.Random) -> str:
+    # Páginas de relleno con muchos números sin contexto (lo peor para la cascada); los campos al final
+    filler = []
+    for _ in range(pages):
+        lines = [f"Item {rng.randint(100000, 9999999999)} cantidad {rng.randint(1, 99)} lote {rng.randint(1000000, 99999999)} valor ${rng.randint(1000, 999999)}"
+                 for _ in range(60)]
+        filler.append("\n".join(lines))
+    return "\n\f".join(filler) + "\nIdentificación: 1020304050 Edad: 33 AÑOS\nRECIBO 4321"
+
+
+def _time_it(func, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fuzz", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    if verify(args.fuzz, args.seed):
+        raise SystemExit(1)
+    rng = random.Random(args.seed)
+    for pages in args.pages:
+        text = _multi_page_text(pages, rng)
+        t_old = _time_it(legacy_cascade, text, args.repeat)
+        t_new = _time_it(single_pass, text, args.repeat)
+        print(f"{pages} pág. ({len(text)} caracteres): cascada {t_old*1000:.2f} ms | una pasada {t_new*1000:.2f} ms | x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    main()
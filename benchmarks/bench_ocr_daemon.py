@@ -0,0 +1,49 @@
+"""
+Benchmark: latencia hasta el primer resultado OCR de un arranque nuevo, cargando EasyOCR en proceso
+vs. conectándose al servicio OCR local (que debe estar en marcha: python -m core.ocr_daemon).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ocr_daemon archivo.pdf [--repeat N]
+"""
+import argparse
+import time
+import numpy as np
+
+from core.ocr_daemon import connect_ocr_daemon
+from core.page_cache import page_image_cache
+
+
+def _first_result_inprocess(page_gray: np.ndarray) -> float:
+    import easyocr
+    from config import settings
+    start = time.perf_counter()
+    reader = easyocr.Reader(getattr(settings, 'OCR_LANGUAGES', ['es']), gpu=getattr(settings, 'OCR_GPU', False))
+    reader.readtext(page_gray, detail=0)
+    return time.perf_counter() - start
+
+
+def _first_result_daemon(page_gray: np.ndarray) -> float:
+    start = time.perf_counter()
+    reader = connect_ocr_daemon()
+    if reader is None:
+        raise SystemExit("El servicio OCR no está en marcha (python -m core.ocr_daemon).")
+    reader.readtext(page_gray, detail=0)
+    elapsed = time.perf_counter() - start
+    reader.close_connection()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    page_gray = np.asarray(page_image_cache.get_page(args.pdf, page=1, dpi=200).convert('L'))
+    t_daemon = min(_first_result_daemon(page_gray) for _ in range(args.repeat))
+    t_inprocess = min(_first_result_inprocess(page_gray) for _ in range(args.repeat))
+    print(f"Carga de modelos + 1er OCR en proceso: {t_inprocess:.2f}s | conexión al servicio + 1er OCR: {t_daemon:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
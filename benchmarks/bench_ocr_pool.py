@@ -0,0 +1,39 @@
+"""
+Benchmark: rendimiento (documentos/s) del pool OCR multiproceso según el número de workers.
+Desactiva la caché OCR para medir el OCR real.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ocr_pool archivo1.pdf [archivo2.pdf ...] --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+from config import settings
+from core.ocr_pool import OCRWorkerPool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    settings.OCR_CACHE_ENABLED = False
+    cpu_count = os.cpu_count() or 1
+
+    baseline = None
+    for num_workers in args.workers:
+        pool = OCRWorkerPool(num_workers, max(1, cpu_count // num_workers))
+        # Calentamiento: que cada worker cargue su modelo antes de medir
+        list(pool.extract_texts(args.pdfs[:num_workers]))
+        start = time.perf_counter()
+        results = list(pool.extract_texts(args.pdfs))
+        elapsed = time.perf_counter() - start
+        pool.shutdown()
+        docs_per_sec = len(results) / elapsed
+        baseline = baseline or docs_per_sec
+        print(f"{num_workers:>3} workers: {docs_per_sec:.2f} docs/s (x{docs_per_sec / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: memoria pico por documento en el camino de la imagen de página (OCR de página completa +
+ROI del acta manuscrita), medida con tracemalloc. Compara el camino anterior (render RGB, np.array de la
+página completa, cv2.cvtColor y recorte de la ROI sobre el array RGB) con el actual de PDFProcessor (render
+en grises, vistas de solo lectura y ROI renderizada sola o recortada en PIL).
+
+tracemalloc ve los buffers de NumPy/OpenCV y los bytes intermedios, pero no la memoria interna de las
+imágenes PIL: su tamaño se informa aparte (ancho x alto x bandas de la página renderizada).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_page_memory actas/*.pdf [--dpi 200]
+"""
+import argparse
+import os
+import tracemalloc
+import numpy as np
+
+from core.layout_templates import get_template
+from core.page_cache import PageImageCache, page_image_cache
+from core.pdf_processor import PDFProcessor
+
+ACTA_REGION = get_template("entregado_manuscrito").get_region("acta_manuscrita")
+
+
+def _legacy_path(pdf_path: str, dpi: int, rgb_cache: PageImageCache) -> int:
+    import cv2
+    page = rgb_cache.get_page(pdf_path, page=1, dpi=dpi)
+    img_np = np.array(page.convert('RGB'))
+    gray = cv2.cvtColor(img_np, cv2.COLOR_RGB2GRAY)
+    del img_np, gray  # El OCR terminaba aquí; el HTR volvía a convertir la página completa
+    roi = ACTA_REGION.crop(np.array(page.convert('RGB')))
+    roi_gray = cv2.cvtColor(roi, cv2.COLOR_RGB2GRAY).copy()
+    del roi, roi_gray
+    return page.width * page.height * len(page.getbands())
+
+
+def _current_path(pdf_path: str, dpi: int, processor: PDFProcessor) -> int:
+    page = page_image_cache.get_page(pdf_path, page=1, dpi=dpi)
+    img_ocr = processor._load_page_for_ocr(pdf_path, dpi, "entregado_manuscrito")
+    del img_ocr
+    roi = processor._load_handwritten_acta_roi(pdf_path)
+    del roi
+    return page.width * page.height * len(page.getbands())
+
+
+def _measure(func, *args) -> tuple:
+    tracemalloc.start()
+    pil_bytes = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, pil_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    processor = PDFProcessor()
+    rgb_cache = PageImageCache(max_bytes=64 * 1024 * 1024, grayscale=False)
+    totals = {"anterior": 0, "actual": 0}
+    for pdf_path in args.pdfs:
+        rgb_cache.clear(); page_image_cache.clear()
+        legacy_peak, legacy_pil = _measure(_legacy_path, pdf_path, args.dpi, rgb_cache)
+        current_peak, current_pil = _measure(_current_path, pdf_path, args.dpi, processor)
+        totals["anterior"] += legacy_peak; totals["actual"] += current_peak
+        print(f"{os.path.basename(pdf_path)}: pico anterior {legacy_peak / 2**20:.1f} MB (+ página PIL {legacy_pil / 2**20:.1f} MB) | "
+              f"pico actual {current_peak / 2**20:.1f} MB (+ página PIL {current_pil / 2**20:.1f} MB)")
+    n = len(args.pdfs)
+    print(f"Pico medio por documento: anterior {totals['anterior'] / n / 2**20:.1f} MB | actual {totals['actual'] / n / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: extracción directa con doble parseo (comportamiento anterior) vs. contexto PDFDocument compartido.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_pdf_document archivo1.pdf [archivo2.pdf ...] [--repeat N]
+"""
+import argparse
+import time
+from PyPDF2 import PdfReader
+
+from core.pdf_document import PDFDocument
+
+
+def _double_parse(pdf_path: str) -> str:
+    # Réplica del flujo anterior: un PdfReader para la verificación y otro para la extracción
+    probe = PdfReader(pdf_path)
+    for page in probe.pages:
+        text = page.extract_text()
+        if text and len(text.strip()) > 50:
+            break
+    reader = PdfReader(pdf_path)
+    return "\n".join(filter(None, (p.extract_text() for p in reader.pages))).strip()
+
+
+def _shared_context(pdf_path: str) -> str:
+    with PDFDocument(pdf_path) as pdf_doc:
+        for i in range(pdf_doc.num_pages):
+            text = pdf_doc.get_page_text(i)
+            if text and len(text.strip()) > 50:
+                break
+        return pdf_doc.get_full_text()
+
+
+def _time_it(func, pdf_path: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(pdf_path)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    total_old = total_new = 0.0
+    for pdf_path in args.pdfs:
+        t_old = _time_it(_double_parse, pdf_path, args.repeat)
+        t_new = _time_it(_shared_context, pdf_path, args.repeat)
+        total_old += t_old; total_new += t_new
+        print(f"{pdf_path}: doble parseo {t_old*1000:.1f} ms | contexto compartido {t_new*1000:.1f} ms | ahorro {(t_old - t_new)*1000:.1f} ms")
+    n = len(args.pdfs)
+    print(f"Promedio por archivo: {total_old/n*1000:.1f} ms -> {total_new/n*1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
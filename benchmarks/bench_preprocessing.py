@@ -0,0 +1,83 @@
+"""
+Benchmark: perfiles de preprocesamiento de página completa (core/image_preprocessing.py). Para cada perfil
+mide el tiempo de preprocesado por paso, la latencia de EasyOCR (readtext) y el número de cajas que produce
+el detector sobre la 1ra página. Con --expected, un CSV `archivo,id_type,id_number,acta_no`, informa además
+el acierto de los campos extraídos por perfil.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_preprocessing actas/*.pdf [--expected esperado.csv] [--dpi 200] [--repeat N]
+"""
+import argparse
+import csv
+import os
+import time
+from typing import Dict, Optional
+
+from core.field_extractor import scan_printed_fields
+from core.image_preprocessing import ImagePreprocessor, PreprocessingProfile
+from core.page_cache import page_image_cache
+from core.pdf_processor import PDFProcessor
+
+FIELDS = ["id_type", "id_number", "acta_no"]
+PROFILES = {
+    "solo_gris": PreprocessingProfile(),
+    "ajustes": None,  # PREPROCESSING_* de config/settings.py
+    "otsu": PreprocessingProfile(threshold_method="otsu"),
+    "mediana+otsu": PreprocessingProfile(noise_reduction_method="median", threshold_method="otsu"),
+    "gauss+adaptativo": PreprocessingProfile(noise_reduction_method="gaussian", threshold_method="adaptive_gaussian", adaptive_block_size=31, adaptive_c_value=10),
+}
+
+
+def _load_expected(csv_path: Optional[str]) -> Dict[str, Dict[str, str]]:
+    if not csv_path:
+        return {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {row["archivo"]: row for row in csv.DictReader(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--expected", default=None)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    import cv2
+    processor = PDFProcessor(use_daemon=False)
+    if not processor.reader:
+        raise SystemExit("No se pudo inicializar EasyOCR. Revise el log.")
+    processor.warm_up()
+    preprocessors = {name: ImagePreprocessor(profile or PreprocessingProfile.from_settings(), cv2) for name, profile in PROFILES.items()}
+    expected = _load_expected(args.expected)
+    ocr_seconds = {name: 0.0 for name in PROFILES}
+    boxes = {name: 0 for name in PROFILES}
+    correct = {name: 0 for name in PROFILES}
+
+    for pdf_path in args.pdfs:
+        page_img = page_image_cache.get_page(pdf_path, page=1, dpi=args.dpi)
+        truth = expected.get(os.path.basename(pdf_path))
+        for name, preprocessor in preprocessors.items():
+            page = preprocessor.prepare_page(page_img)
+            runs = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = processor.reader.readtext(page, detail=1, paragraph=False)
+                runs.append(time.perf_counter() - start)
+            fields = scan_printed_fields("\n".join(text for _, text, _ in result))
+            fields = {field: fields[field] for field in FIELDS}
+            ocr_seconds[name] += min(runs)
+            boxes[name] += len(result)
+            if truth and all((fields[field] or "") == (truth.get(field) or "") for field in FIELDS):
+                correct[name] += 1
+            print(f"{os.path.basename(pdf_path)} [{name}] OCR {min(runs)*1000:.0f} ms, {len(result)} cajas -> {fields}")
+
+    n = len(args.pdfs)
+    for name, preprocessor in preprocessors.items():
+        accuracy = f", acierto {correct[name]}/{n}" if expected else ""
+        print(f"{name}: OCR medio {ocr_seconds[name]/n*1000:.0f} ms, {boxes[name]/n:.1f} cajas/página{accuracy}")
+        print(f"    {preprocessor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: compactación del texto que se envía a la IA de texto (core.field_extractor.relevant_text_windows).
+Para cada documento informa el tamaño del texto antes y después de compactar y comprueba que los campos
+que el extractor impreso encuentra en el texto completo (id_number, id_type, acta_no) siguen estando en el
+compactado: si el extractor los ve, la IA también tiene el contexto necesario.
+
+Sin PDFs usa textos sintéticos de varias páginas (los de benchmarks/bench_field_extractor.py).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_prompt_compaction [actas/*.pdf] [--window 200] [--header 400] [--pages 1 10 50]
+"""
+import argparse
+import os
+import random
+
+from core.field_extractor import relevant_text_windows, scan_printed_fields
+from benchmarks.bench_field_extractor import CORPUS, _multi_page_text
+
+FIELDS = ("id_number", "id_type", "acta_no")
+
+
+def _documents(args) -> list:
+    if args.pdfs:
+        from core.pdf_processor import PDFProcessor
+        processor = PDFProcessor()
+        documents = []
+        for pdf_path in args.pdfs:
+            text, method = processor.extract_text_from_pdf(pdf_path)
+            documents.append((f"{os.path.basename(pdf_path)} ({method})", text or ""))
+        return documents
+    rng = random.Random(1234)
+    return [(f"corpus #{i}", text) for i, text in enumerate(CORPUS) if text] + \
+           [(f"sintético {pages} pág.", _multi_page_text(pages, rng)) for pages in args.pages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--window", type=int, default=200)
+    parser.add_argument("--header", type=int, default=400)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    total_before = total_after = lost = 0
+    for label, text in _documents(args):
+        compacted, cues = relevant_text_windows(text, window_chars=args.window, header_chars=args.header)
+        if len(compacted) >= len(text): compacted = text # Igual que AIIntegrator._compact_text
+        full_fields, compact_fields = scan_printed_fields(text), scan_printed_fields(compacted)
+        missing = [field for field in FIELDS if full_fields[field] and full_fields[field] != compact_fields[field]]
+        lost += bool(missing)
+        total_before += len(text); total_after += len(compacted)
+        print(f"{label}: {len(text)} -> {len(compacted)} caracteres ({cues} palabras clave)" + (f" | CAMPOS PERDIDOS: {missing}" if missing else ""))
+    print(f"Total: {total_before} -> {total_after} caracteres ({total_after / max(1, total_before) * 100:.0f}%) | documentos con campos perdidos: {lost}")
+    if lost: raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: ROI del acta manuscrita con render de página completa + recorte (comportamiento anterior)
+vs. render solo de la región con pdftoppm en escala de grises.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_region_render archivo1.pdf [archivo2.pdf ...] [--repeat N] [--dpi 200]
+"""
+import argparse
+import time
+import numpy as np
+from pdf2image import convert_from_path
+
+from config import settings
+from core.layout_templates import get_template
+from core.pdf_document import PDFDocument
+from core.poppler_render import render_region
+
+ACTA_REGION = get_template("entregado_manuscrito").get_region("acta_manuscrita")
+
+
+def _full_page_crop(pdf_path: str, dpi: int, page_size_pts) -> tuple:
+    # Réplica del flujo anterior: página completa a color -> array RGB -> recorte
+    page = convert_from_path(pdf_path, poppler_path=getattr(settings, 'POPPLER_PATH', None), first_page=1, last_page=1, dpi=dpi)[0]
+    page_np = np.array(page.convert('RGB'))
+    roi = ACTA_REGION.crop(page_np)
+    return roi, page_np.nbytes
+
+
+def _region_only(pdf_path: str, dpi: int, page_size_pts) -> tuple:
+    roi = np.asarray(render_region(pdf_path, ACTA_REGION.box, dpi, page=1, grayscale=True, page_size_pts=page_size_pts))
+    return roi, roi.nbytes
+
+
+def _time_it(func, pdf_path: str, dpi: int, page_size_pts, repeat: int) -> tuple:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        roi, peak_bytes = func(pdf_path, dpi, page_size_pts)
+    return (time.perf_counter() - start) / repeat, peak_bytes, roi.shape
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dpi", type=int, default=200)
+    args = parser.parse_args()
+
+    total_old = total_new = 0.0
+    for pdf_path in args.pdfs:
+        with PDFDocument(pdf_path) as pdf_doc:
+            page_size_pts = pdf_doc.get_page_size(0)
+        t_old, bytes_old, shape_old = _time_it(_full_page_crop, pdf_path, args.dpi, page_size_pts, args.repeat)
+        t_new, bytes_new, shape_new = _time_it(_region_only, pdf_path, args.dpi, page_size_pts, args.repeat)
+        total_old += t_old; total_new += t_new
+        print(f"{pdf_path}: página+recorte {t_old*1000:.1f} ms, {bytes_old/1024:.0f} KiB, ROI {shape_old} | "
+              f"solo región {t_new*1000:.1f} ms, {bytes_new/1024:.0f} KiB, ROI {shape_new}")
+    n = len(args.pdfs)
+    print(f"Promedio por archivo: {total_old/n*1000:.1f} ms -> {total_new/n*1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
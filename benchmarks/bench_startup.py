@@ -0,0 +1,53 @@
+"""
+Benchmark: coste de importar la GUI (lo que separa el arranque de la aparición de la ventana).
+Ejecuta `python -X importtime -c "import gui.interface"` en un proceso nuevo y muestra el tiempo total
+y los módulos más costosos. Con --eager importa además los paquetes pesados
+(easyocr, cv2, openai, PyPDF2, pdf2image) para comparar con el comportamiento anterior.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_startup [--eager] [--top N] [--repeat N]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["easyocr", "cv2", "openai", "PyPDF2", "pdf2image"]
+
+
+def _run_import(eager: bool) -> tuple:
+    code = "import gui.interface"
+    if eager:
+        code = "; ".join(f"import {name}" for name in HEAVY_MODULES) + "; " + code
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise SystemExit(f"La importación falló:\n{proc.stderr[-2000:]}")
+    modules = []
+    for line in proc.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | <sangría por nivel>paquete"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative) / 1e6, name[1:].rstrip()))
+    return elapsed, sorted(modules, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eager", action="store_true", help="Importar también los módulos pesados (comportamiento anterior).")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [_run_import(args.eager) for _ in range(args.repeat)]
+    best_elapsed, modules = min(runs, key=lambda run: run[0])
+    print(f"Proceso + importación de gui.interface ({'con' if args.eager else 'sin'} módulos pesados): {best_elapsed:.2f}s (mejor de {args.repeat})")
+    print("Módulos con mayor tiempo acumulado de importación (la sangría indica quién los importa):")
+    for seconds, name in modules[:args.top]:
+        print(f"  {seconds:7.3f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
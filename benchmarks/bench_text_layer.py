@@ -0,0 +1,74 @@
+"""
+Benchmark: backends de capa de texto para PDFs digitales (pdftotext de Poppler vs. PyPDF2).
+Mide el tiempo de extraer la 1ra página (lo que hace la extracción directa en el caso normal) y compara
+los campos que salen de cada texto. Con --expected, un CSV `archivo,id_type,id_number,acta_no`, informa
+además el acierto de cada backend frente a los valores correctos.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_text_layer actas/*.pdf [--expected esperado.csv] [--repeat N]
+"""
+import argparse
+import csv
+import os
+import time
+from typing import Dict, Optional
+
+from core.field_extractor import scan_printed_fields
+from core.pdf_document import PDFDocument
+
+BACKENDS = ["pdftotext", "pypdf2"]
+FIELDS = ["id_type", "id_number", "acta_no"]
+
+
+def _first_page_fields(pdf_path: str, backend: str) -> tuple:
+    start = time.perf_counter()
+    with PDFDocument(pdf_path, text_backend=backend) as pdf_doc:
+        text = pdf_doc.get_page_text(0)
+        used_backend = pdf_doc.text_backend  # Puede haber caído a PyPDF2
+    elapsed = time.perf_counter() - start
+    fields = scan_printed_fields(text)
+    return elapsed, {field: fields[field] for field in FIELDS}, used_backend
+
+
+def _load_expected(csv_path: Optional[str]) -> Dict[str, Dict[str, str]]:
+    if not csv_path:
+        return {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {row["archivo"]: row for row in csv.DictReader(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--expected", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    expected = _load_expected(args.expected)
+    totals = {backend: 0.0 for backend in BACKENDS}
+    correct = {backend: 0 for backend in BACKENDS}
+    agree = 0
+    for pdf_path in args.pdfs:
+        results = {}
+        for backend in BACKENDS:
+            runs = [_first_page_fields(pdf_path, backend) for _ in range(args.repeat)]
+            elapsed = min(run[0] for run in runs)
+            _, fields, used_backend = runs[0]
+            totals[backend] += elapsed
+            results[backend] = fields
+            note = f" (cayó a {used_backend})" if used_backend != backend else ""
+            print(f"{os.path.basename(pdf_path)} [{backend}{note}] {elapsed*1000:.1f} ms -> {fields}")
+            truth = expected.get(os.path.basename(pdf_path))
+            if truth and all((fields[field] or "") == (truth.get(field) or "") for field in FIELDS):
+                correct[backend] += 1
+        agree += results["pdftotext"] == results["pypdf2"]
+
+    n = len(args.pdfs)
+    print("Promedio por archivo: " + " | ".join(f"{backend} {totals[backend]/n*1000:.1f} ms" for backend in BACKENDS))
+    print(f"Campos idénticos entre backends: {agree}/{n}")
+    if expected:
+        print("Acierto frente a --expected: " + " | ".join(f"{backend} {correct[backend]}/{n}" for backend in BACKENDS))
+
+
+if __name__ == "__main__":
+    main()
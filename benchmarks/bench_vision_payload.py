@@ -0,0 +1,88 @@
+"""
+Benchmark: imagen enviada a la IA de visión con distintas opciones (core/vision_payload.py) frente a la
+anterior (página completa en PNG, sin pasar a grises). Para cada opción informa bytes medios y tiempo de
+preparación (recorte + conversión + redimensión + codificación) sobre la 1ra página de cada PDF.
+
+Con --with-ai además consulta la IA de visión (caché de IA desactivada) con cada opción y compara los
+campos devueltos con los de la imagen anterior: coincidencias por campo y latencia media. Necesita
+OPENROUTER_API_KEY (o AI_BASE_URL apuntando a un servidor compatible) y consume peticiones reales.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_vision_payload actas/*.pdf [--dpi 200] [--doc-type entregado_manuscrito] [--with-ai]
+"""
+import argparse
+import os
+import time
+
+from config import settings
+from core.page_cache import page_image_cache, render_page
+from core.vision_payload import VisionPayloadOptions, build_vision_payload
+
+BASELINE = ("anterior (full/png)", VisionPayloadOptions(region="full", grayscale=False, image_format="png"))
+VARIANTS = [
+    ("full/gris/jpeg85", VisionPayloadOptions(region="full", grayscale=True, image_format="jpeg", quality=85)),
+    ("full/gris/webp80", VisionPayloadOptions(region="full", grayscale=True, image_format="webp", quality=80)),
+    ("header/gris/jpeg85", VisionPayloadOptions(region="header", grayscale=True, image_format="jpeg", quality=85)),
+    ("header/gris/webp80", VisionPayloadOptions(region="header", grayscale=True, image_format="webp", quality=80)),
+    ("fields/gris/jpeg85", VisionPayloadOptions(region="fields", grayscale=True, image_format="jpeg", quality=85)),
+]
+FIELDS = ("id_type", "id_number", "acta_no")
+
+
+def _ask_ai(integrator, image, filename: str, doc_type: str, options: VisionPayloadOptions) -> tuple:
+    settings.VISION_PAYLOAD_REGION, settings.VISION_PAYLOAD_GRAYSCALE = options.region, options.grayscale
+    settings.VISION_PAYLOAD_FORMAT, settings.VISION_PAYLOAD_QUALITY = options.image_format, options.quality
+    start = time.perf_counter()
+    result = integrator.get_data_with_vision_ai(image, filename, doc_type)
+    return result or {}, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--doc-type", default="entregado_manuscrito")
+    parser.add_argument("--with-ai", action="store_true")
+    args = parser.parse_args()
+    settings.ENABLE_LAYOUT_TEMPLATES = True # Para comparar los recortes "header"/"fields" (cajas sin calibrar)
+
+    integrator = None
+    if args.with_ai:
+        from core.ai_integration import AIIntegrator
+        settings.AI_CACHE_ENABLED = False # Cada opción debe llegar de verdad al modelo
+        integrator = AIIntegrator()
+        if not integrator.is_api_configured_and_client_valid():
+            raise SystemExit("IA no configurada (OPENROUTER_API_KEY); se puede ejecutar sin --with-ai.")
+
+    options_list = [BASELINE] + [(label, options.validated()) for label, options in VARIANTS]
+    sizes = {label: [] for label, _ in options_list}
+    encode_times = {label: [] for label, _ in options_list}
+    latencies = {label: [] for label, _ in options_list}
+    matches = {label: 0 for label, _ in options_list}
+    for pdf_path in args.pdfs:
+        filename = os.path.basename(pdf_path)
+        gray_image = page_image_cache.get_page(pdf_path, page=1, dpi=args.dpi)
+        color_image = render_page(pdf_path, page=1, dpi=args.dpi, grayscale=False) # Las opciones en color parten de una página en color, como en la GUI
+        baseline_fields = None
+        for label, options in options_list:
+            image = gray_image if options.grayscale else color_image
+            payload = build_vision_payload(image, options, args.doc_type)
+            sizes[label].append(payload.num_bytes); encode_times[label].append(payload.encode_seconds)
+            if integrator:
+                fields, latency = _ask_ai(integrator, image, filename, args.doc_type, options)
+                latencies[label].append(latency)
+                if baseline_fields is None: baseline_fields = fields
+                matches[label] += sum(1 for field in FIELDS if fields.get(field) == baseline_fields.get(field))
+                print(f"{filename} | {label}: {fields}")
+
+    n = len(args.pdfs)
+    for label, _ in options_list:
+        line = f"{label}: {sum(sizes[label]) / n / 1024:.0f} KB, preparación {sum(encode_times[label]) / n * 1000:.0f} ms"
+        if integrator:
+            line += f" | latencia IA {sum(latencies[label]) / n:.2f}s | campos iguales a la imagen anterior: {matches[label]}/{n * len(FIELDS)}"
+        print(line)
+    if integrator: integrator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Servidor local que imita POST /chat/completions de una API compatible con OpenAI (OpenRouter), para probar
+y medir la integración de IA sin red ni API key. Cada respuesta tarda --latency segundos y devuelve un JSON
+con id_type/id_number/acta_no. Tiene su propio límite de tasa (--rpm, --burst): por encima responde 429
+con Retry-After, como el servicio real. Los prompts de lote (varios documentos delimitados por
+'=== Documento: "<nombre>" ===') reciben un array JSON con una entrada por documento; --omit-every N omite
+la N-ésima de cada lote para probar los reintentos individuales. Con --trailing-words N, tras el JSON el
+"modelo" sigue generando una explicación de N palabras (--token-delay segundos por palabra), y con
+"stream": true responde por SSE como la API real: un cliente que corta tras el JSON deja de esperarla.
+--vision-latency da a las peticiones con imagen una latencia distinta (p. ej. un modelo de visión lento), y
+--vision-error-status (p. ej. 503) hace que fallen todas tras esa latencia (modelo de visión caído).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.mock_openai_server [--port 8765] [--latency 0.5] [--rpm 60] [--burst 5] [--omit-every 0]
+        [--trailing-words 0] [--token-delay 0.02] [--vision-latency S] [--vision-error-status 0]
+Luego, en config/settings.py: AI_BASE_URL = "http://127.0.0.1:8765/v1" (y cualquier OPENROUTER_API_KEY).
+"""
+import argparse
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+RESPONSE_CONTENT = '{"id_type": "CC", "id_number": "12345678", "acta_no": "46150"}'
+BATCH_DOCUMENT_RE = re.compile(r'=== Documento: "(.+?)" ===')
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float, rpm: float, burst: int, omit_every: int = 0,
+                 trailing_words: int = 0, token_delay: float = 0.02, vision_latency: Optional[float] = None,
+                 vision_error_status: int = 0):
+        super().__init__(address, _MockHandler)
+        self.latency = latency
+        self.vision_latency = latency if vision_latency is None else vision_latency
+        self.vision_error_status = vision_error_status
+        self.vision_requests = 0
+        self.omit_every = omit_every
+        self.trailing_words = trailing_words
+        self.token_delay = token_delay
+        self.streams_cut = 0
+        self.rate = rpm / 60.0
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.served = 0
+        self.rejected = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+
+    def admit(self) -> float:
+        """0 si la petición entra; si no, los segundos hasta que haya cupo (para Retry-After)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self._in_flight)
+                return 0.0
+            self.rejected += 1
+            return (1 - self._tokens) / self.rate
+
+    def finish(self):
+        with self._lock:
+            self._in_flight -= 1
+            self.served += 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    server: MockOpenAIServer
+
+    def log_message(self, format, *args):
+        pass  # Silencioso: el benchmark imprime su propio resumen
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, request: dict, content: str, trailing: list):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)] + trailing
+        try:
+            for index, piece in enumerate(pieces):
+                chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": request.get("model", "mock"),
+                         "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if index >= len(pieces) - len(trailing): time.sleep(self.server.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.streams_cut += 1 # El cliente cerró el stream antes del final
+
+    def _response_content(self, request: dict) -> str:
+        prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+        labels = BATCH_DOCUMENT_RE.findall(prompt)
+        if not labels:
+            return RESPONSE_CONTENT
+        omit = self.server.omit_every
+        entries = [dict(json.loads(RESPONSE_CONTENT), archivo=label) for i, label in enumerate(labels, 1) if not (omit and i % omit == 0)]
+        return json.dumps(entries, ensure_ascii=False)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Ruta desconocida: {self.path}"}})
+            return
+        wait = self.server.admit()
+        if wait:
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                            {"Retry-After": str(math.ceil(wait))})
+            return
+        try:
+            is_vision = any(isinstance(message.get("content"), list) for message in request.get("messages", []))
+            if is_vision: self.server.vision_requests += 1
+            time.sleep(self.server.vision_latency if is_vision else self.server.latency)
+            if is_vision and self.server.vision_error_status:
+                self._send_json(self.server.vision_error_status, {"error": {"message": "Model unavailable", "type": "server_error"}})
+                return
+            content = self._response_content(request)
+            trailing = [f" palabra{i}" for i in range(self.server.trailing_words)]
+            if trailing: trailing[0] = "\n\nExplicación:" + trailing[0]
+            if request.get("stream"):
+                self._send_stream(request, content, trailing)
+                return
+            time.sleep(self.server.token_delay * len(trailing)) # Sin streaming, la respuesta sale cuando el modelo termina
+            content += "".join(trailing)
+            self._send_json(200, {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        finally:
+            self.server.finish()
+
+
+def start_mock_server(port: int = 0, latency: float = 0.5, rpm: float = 60, burst: int = 5, omit_every: int = 0,
+                      trailing_words: int = 0, token_delay: float = 0.02, vision_latency: Optional[float] = None,
+                      vision_error_status: int = 0) -> MockOpenAIServer:
+    """Arranca el servidor en un hilo de fondo (port=0: puerto libre cualquiera) y lo devuelve."""
+    server = MockOpenAIServer(("127.0.0.1", port), latency, rpm, burst, omit_every, trailing_words, token_delay, vision_latency,
+                              vision_error_status)
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--rpm", type=float, default=60)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--omit-every", type=int, default=0)
+    parser.add_argument("--trailing-words", type=int, default=0)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--vision-latency", type=float, default=None)
+    parser.add_argument("--vision-error-status", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(("127.0.0.1", args.port), args.latency, args.rpm, args.burst, args.omit_every,
+                              args.trailing_words, args.token_delay, args.vision_latency, args.vision_error_status)
+    print(f"Servidor OpenAI simulado en {server.base_url} (latencia {args.latency}s, {args.rpm} peticiones/min). Ctrl+C para salir.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Atendidas: {server.served} | rechazadas con 429: {server.rejected} | máximo en vuelo: {server.max_in_flight}")
+
+
+if __name__ == "__main__":
+    main()
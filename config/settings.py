@@ -19,6 +19,25 @@ ENABLE_MULTIMODAL_FALLBACK = False # Cambia a True si implementas y quieres usar
 # --- Configuraciones de OCR (EasyOCR) ---
 OCR_LANGUAGES = ['es']  # Lista de idiomas para EasyOCR
 OCR_GPU = True          # True para intentar usar GPU, False para forzar CPU
+OCR_WORKERS = 1                     # Procesos OCR en paralelo (cada uno carga su propio EasyOCR). 1 = sin pool, None = un worker por núcleo
+OCR_TORCH_THREADS_PER_WORKER = None # Hilos de torch por worker. None = núcleos / OCR_WORKERS
+OCR_BATCH_SIZE = 4                  # Páginas/ROIs por llamada a readtext_batched (en modo pipeline, agrupa varios documentos). 1 = sin lotes
+OCR_BATCH_TIMEOUT_SECONDS = 0.5     # Espera máxima para completar un lote antes de procesarlo incompleto
+OCR_RECOGNIZER_BATCH_SIZE = 8       # Cajas de texto por pasada del reconocedor de EasyOCR
+OCR_USE_DAEMON = True               # Usar el servicio OCR local (python -m core.ocr_daemon) si está en marcha; si no, EasyOCR en proceso
+OCR_DAEMON_SOCKET_PATH = None       # Socket Unix del servicio. None = <directorio temporal>/ocrename-ocr-<uid>.sock
+OCR_DAEMON_TIMEOUT_SECONDS = 120    # Tiempo máximo de espera por petición al servicio
+OCR_WARMUP_ENABLED = True           # Inferencia de prueba al cargar EasyOCR (en segundo plano), para que el 1er documento no pague el arranque de torch
+
+# Plantillas de formato (core/layout_templates.py): OCR solo de las regiones conocidas de cada formato,
+# usando el reconocedor de EasyOCR sin el detector. El OCR de página completa queda como respaldo.
+# Desactivado por defecto: las cajas de las plantillas no están calibradas (ver core/layout_templates.py) y
+# una caja mal puesta que aún resuelva los campos imprescindibles daría datos erróneos sin pasar por el OCR completo.
+ENABLE_LAYOUT_TEMPLATES = False
+
+# Escalera de DPI para el OCR de página completa: se empieza barato y solo se re-renderiza a más DPI
+# si al texto OCR le faltan campos. El peldaño que resolvió cada documento queda en el log.
+OCR_DPI_LADDER = [120, 200, 300]
 
 # (Opcional) Habilitar preprocesamiento de imágenes con OpenCV
 ENABLE_IMAGE_PREPROCESSING = True # True para habilitar, False para deshabilitar
@@ -26,11 +45,50 @@ ENABLE_IMAGE_PREPROCESSING = True # True para habilitar, False para deshabilitar
 # Estos son ejemplos, ajústalos según tus necesidades de preprocesamiento
 PREPROCESSING_NOISE_REDUCTION_METHOD = "none"       # "none", "gaussian", "median"
 PREPROCESSING_NOISE_KERNEL_SIZE = 3                 # Tamaño del kernel para reducción de ruido (impar)
-PREPROCESSING_THRESHOLD_METHOD = "adaptive_mean"    # "none", "global", "otsu", "adaptive_mean", "adaptive_gaussian"
+PREPROCESSING_THRESHOLD_METHOD = "none"             # "none", "global", "otsu", "adaptive_mean", "adaptive_gaussian" (medir con bench_preprocessing antes de activarlo)
 PREPROCESSING_GLOBAL_THRESHOLD_VALUE = 127          # Para umbral global (0-255)
 PREPROCESSING_ADAPTIVE_BLOCK_SIZE = 15              # Para umbral adaptativo (impar, ej. 11, 15, 21)
 PREPROCESSING_ADAPTIVE_C_VALUE = 5                  # Constante C para umbral adaptativo (ej. 2, 5, 7)
 PREPROCESSING_THRESHOLD_INVERT = False              # False para cv2.THRESH_BINARY, True para cv2.THRESH_BINARY_INV
+# Perfiles por tipo de documento: sobrescriben los valores anteriores (claves en minúsculas sin el prefijo), p. ej.
+# {"entregado_manuscrito": {"noise_reduction_method": "median", "threshold_method": "adaptive_gaussian", "adaptive_block_size": 31}}
+PREPROCESSING_PROFILES = {}
+
+# Orientación e inclinación (core/page_orientation.py): se detectan sobre una copia reducida de la 1ra página
+# y se corrigen antes del OCR de página completa (páginas escaneadas giradas 90/180° o torcidas)
+ENABLE_ORIENTATION_CORRECTION = True
+ORIENTATION_ANALYSIS_MAX_SIDE = 1000  # Lado mayor (px) de la copia reducida que se analiza
+DESKEW_MAX_ANGLE = 5.0                # Inclinación máxima buscada (grados, en ambos sentidos)
+DESKEW_MIN_ANGLE = 0.3                # Por debajo de esta inclinación no se endereza
+
+# --- Extracción directa de texto (PDFs digitales) ---
+TEXT_LAYER_BACKEND = "pdftotext"  # "pdftotext" (Poppler nativo, mucho más rápido) o "pypdf2". Si Poppler falla con un PDF, se usa PyPDF2
+PDFTOTEXT_LAYOUT = False          # True = pdftotext -layout (conserva columnas); False = orden de lectura
+TEXT_PROBE_MAX_PAGES = 1  # Páginas a sondear para decidir si el PDF tiene capa de texto. None = todas.
+                          # Los regex solo necesitan la cabecera de la pág 1, así que 1 evita recorrer anexos escaneados.
+
+# --- Caché de páginas rasterizadas (Poppler) ---
+PAGE_CACHE_MAX_MB = 256          # Memoria máxima para páginas renderizadas (LRU)
+PAGE_CACHE_MIN_RENDER_DPI = 200  # DPI mínimo de render: la vista previa (150 dpi) reutiliza el render usado por OCR/HTR
+PAGE_RENDER_GRAYSCALE = True     # Páginas en grises (pdftoppm -gray): un tercio de la memoria de RGB para OCR y HTR
+PREVIEW_CACHE_MAX_MB = 32        # Con PAGE_RENDER_GRAYSCALE, la vista previa se renderiza en color en esta caché aparte
+ENABLE_REGION_RENDERING = True   # ROIs (acta manuscrita, regiones de plantilla) con pdftoppm -x/-y/-W/-H en grises, sin página completa
+
+# --- Caché persistente de resultados OCR (SQLite) ---
+OCR_CACHE_ENABLED = True                        # False (o --no-ocr-cache) para ignorar la caché
+OCR_CACHE_PATH = "ocrename_ocr_cache.sqlite3"   # Clave: SHA-256 del PDF + idiomas, DPI y PREPROCESSING_*
+OCR_CACHE_MAX_MB = 200                          # Tamaño máximo; se expulsan primero las entradas menos usadas
+
+# --- Pipeline de procesamiento por etapas ---
+PIPELINE_ENABLED = True  # True: rasterizado, OCR, regex, IA y copia se solapan entre documentos. False: un documento a la vez
+PIPELINE_QUEUE_SIZE = 4  # Documentos máximos en espera entre dos etapas (backpressure: acota la memoria)
+PIPELINE_STAGE_WORKERS = {  # Hilos por etapa. La IA es espera de red, así que admite más concurrencia
+    "rasterize": 1,
+    "ocr": 1,        # Con OCR_WORKERS > 1 se eleva automáticamente al tamaño del pool
+    "fields": 1,
+    "ai": 4,
+    "commit": 1,     # Mantener en 1: el manejo de colisiones de nombres no es concurrente
+}
 
 # --- Configuraciones de FileManager ---
 OUTPUT_BASE_DIR = "OCRename_Resultados"
@@ -46,6 +104,45 @@ LOG_LEVEL = "DEBUG"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
 API_MAX_RETRIES = 1       # Número de reintentos DESPUÉS del primer intento (total 1+1=2 intentos si es 1).
                           # Si es 0, solo 1 intento en total. Para tu caso de timeout rápido, 0 o 1 es adecuado.
 API_TIMEOUT_SECONDS = 10  # Timeout en segundos para la respuesta de la API.
+AI_BASE_URL = "https://openrouter.ai/api/v1"  # Cualquier API compatible con OpenAI (p. ej. un servidor simulado local para pruebas)
+# Las llamadas a la IA se hacen con un cliente asíncrono en un bucle de eventos propio: varias peticiones en vuelo a la vez
+AI_MAX_CONCURRENCY = 4      # Peticiones simultáneas como máximo (texto + visión)
+AI_REQUESTS_PER_MINUTE = 20 # Token bucket compartido; se reduce solo ante respuestas 429 y respeta Retry-After
+AI_RATE_LIMIT_BURST = 4     # Peticiones que pueden salir seguidas antes de que se note el límite de tasa
+AI_STREAMING = True         # Respuestas por streaming: se cortan en cuanto llega el JSON completo (mide primer token / JSON)
+# Salud por modelo (core/ai_health.py): timeout adaptativo a partir de las latencias recientes y circuit breaker
+AI_ADAPTIVE_TIMEOUT = True         # Timeout = AI_TIMEOUT_MULTIPLIER x percentil, entre AI_TIMEOUT_MIN_SECONDS y API_TIMEOUT_SECONDS
+AI_TIMEOUT_PERCENTILE = 95
+AI_TIMEOUT_MULTIPLIER = 2.0
+AI_TIMEOUT_MIN_SECONDS = 3.0
+AI_LATENCY_WINDOW = 50             # Últimas latencias correctas usadas para los percentiles
+AI_CIRCUIT_FAILURE_THRESHOLD = 3   # Fallos seguidos (timeout, conexión, 5xx) que abren el circuito del modelo; los 429 no cuentan
+AI_CIRCUIT_COOLDOWN_SECONDS = 60   # Tiempo sin peticiones al modelo antes de la petición de prueba
+AI_CIRCUIT_HOLD_MAX_SECONDS = 300  # Espera máxima al final del lote para reintentar los documentos retenidos por un circuito abierto (0 = no retener)
+# Imagen enviada a la IA de visión (core/vision_payload.py); comparar opciones con benchmarks/bench_vision_payload.py
+VISION_PAYLOAD_REGION = "full"    # "full" (página completa), "header" (banda superior) o "fields" (regiones de la plantilla apiladas); los recortes requieren ENABLE_LAYOUT_TEMPLATES
+VISION_PAYLOAD_GRAYSCALE = False  # False = color (como antes): con PAGE_RENDER_GRAYSCALE la página para Visión se renderiza aparte en color
+VISION_PAYLOAD_FORMAT = "png"     # "png" (sin pérdida, como antes), "jpeg" o "webp"; grises/JPEG solo tras comprobar la precisión con bench_vision_payload --with-ai
+VISION_PAYLOAD_QUALITY = 85       # Calidad JPEG/WebP (1-100)
+VISION_MAX_DIM = 1280             # Lado mayor de la imagen enviada, en píxeles
+# Estrategia del fallback de IA (también con lotes de texto): "chain" = visión y luego texto, cada una esperando a la anterior;
+# "race" = texto en paralelo si la visión no completó los datos en AI_RACE_HEDGE_DELAY_SECONDS (gana el primero que los completa)
+AI_STRATEGY = "chain"              # "race" es opcional: cada hedge puede ser una petición de texto de más (el cuello de botella en cuotas gratuitas)
+AI_RACE_HEDGE_DELAY_SECONDS = 4.0  # 0 = ambas a la vez (más peticiones); valores altos se acercan a "chain"
+# Lotes de IA de texto (modo pipeline): varios documentos incompletos en un solo prompt que devuelve un array JSON
+AI_TEXT_BATCH_SIZE = 5               # Documentos por petición (1 = una petición por documento, como antes)
+AI_TEXT_BATCH_TIMEOUT_SECONDS = 2.0  # Espera máxima de la etapa "ai" para juntar un lote
+AI_TEXT_BATCH_MAX_CHARS = 12000      # Texto máximo por petición; un documento más largo va solo
+# Compactación del texto enviado a la IA: encabezado + ventanas alrededor de las palabras clave de los campos
+AI_TEXT_PROMPT_COMPACTION = True  # False para enviar el texto OCR completo
+AI_TEXT_HEADER_CHARS = 400        # Caracteres iniciales que siempre se envían
+AI_TEXT_WINDOW_CHARS = 200        # Caracteres tras cada palabra clave (y la mitad antes)
+
+# --- Caché persistente de respuestas de la IA (core/ai_cache.py) ---
+AI_CACHE_ENABLED = True                      # False (o --no-ai-cache) para consultar siempre a la API
+AI_CACHE_PATH = "ocrename_ai_cache.sqlite3"  # Clave: modelo + versión del prompt + hash del texto o la imagen enviados
+AI_CACHE_MAX_MB = 20                         # Tamaño máximo; se expulsan primero las entradas menos usadas
+AI_CACHE_TTL_DAYS = 30                       # Antigüedad máxima de una respuesta (None = sin caducidad)
 
 # --- (Opcional) Ruta a Poppler ---
 # Si Poppler no está en el PATH del sistema, descomenta y ajusta la siguiente línea.
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import threading
+from typing import Dict, Optional
+
+from config import settings
+from core.sqlite_cache import SQLiteCache
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+
+def hash_payload(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class AIResultCache(SQLiteCache):
+    """
+    Caché persistente de respuestas de la IA ya parseadas ({id_type, id_number, acta_no}). La clave combina
+    el modelo, el tipo de petición con la versión de su plantilla de prompt, y el hash del texto o de la
+    imagen enviados: cambiar de modelo o de prompt invalida las entradas sin tener que purgar.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int, ttl_seconds: Optional[float]):
+        super().__init__(db_path, table="ai_results", max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+
+    @staticmethod
+    def make_key(model_name: str, request_kind: str, prompt_version: int, payload_hash: str) -> str:
+        return hashlib.sha256(json.dumps([model_name, request_kind, prompt_version, payload_hash]).encode('utf-8')).hexdigest()
+
+    def get_result(self, key: str) -> Optional[Dict[str, Optional[str]]]:
+        return self.get(key)
+
+    def put_result(self, key: str, data: Dict[str, Optional[str]]):
+        self.set(key, data)
+
+
+_ai_cache_instance: Optional[AIResultCache] = None
+_ai_cache_lock = threading.Lock()
+
+
+def _open_ai_cache() -> AIResultCache:
+    ttl_days = getattr(settings, 'AI_CACHE_TTL_DAYS', 30)
+    return AIResultCache(
+        getattr(settings, 'AI_CACHE_PATH', "ocrename_ai_cache.sqlite3"),
+        max_bytes=int(getattr(settings, 'AI_CACHE_MAX_MB', 20)) * 1024 * 1024,
+        ttl_seconds=ttl_days * 86400 if ttl_days else None,
+    )
+
+
+def get_ai_cache() -> Optional[AIResultCache]:
+    """Retorna la caché de IA compartida, o None si está deshabilitada (AI_CACHE_ENABLED / --no-ai-cache)."""
+    global _ai_cache_instance
+    if not getattr(settings, 'AI_CACHE_ENABLED', False):
+        return None
+    with _ai_cache_lock:
+        if _ai_cache_instance is None:
+            try:
+                _ai_cache_instance = _open_ai_cache()
+            except Exception as e:
+                app_logger.error(f"No se pudo abrir la caché de IA; se continúa sin caché: {e}", exc_info=True)
+                settings.AI_CACHE_ENABLED = False
+                return None
+        return _ai_cache_instance
+
+
+def purge_ai_cache():
+    """Vacía la caché de IA en disco aunque esté deshabilitada en settings."""
+    (get_ai_cache() or _open_ai_cache()).purge()
@@ -0,0 +1,164 @@
+"""
+Salud de cada modelo de IA: latencias recientes (percentiles móviles), timeout adaptativo a partir de
+ellas y circuit breaker. Tras AI_CIRCUIT_FAILURE_THRESHOLD fallos seguidos (timeouts, errores de conexión,
+5xx; los 429 los gestiona el limitador de tasa) el circuito se abre y el modelo deja de recibir peticiones durante AI_CIRCUIT_COOLDOWN_SECONDS;
+después pasa a semiabierto y una única petición de prueba decide si se cierra o vuelve a abrirse.
+Las peticiones por lotes (varios documentos en un prompt) tardan bastante más que las individuales, así
+que sus latencias y su timeout adaptativo van en una ventana aparte (`kind`); el circuito es común.
+"""
+import math
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, Optional
+
+from config import settings
+
+CLOSED, OPEN, HALF_OPEN = "cerrado", "abierto", "semiabierto"
+MIN_LATENCY_SAMPLES = 5 # Por debajo, el timeout es el fijo (API_TIMEOUT_SECONDS)
+SINGLE, BATCH = "individual", "lote" # Tipos de petición con ventana de latencias propia
+
+
+class ModelHealth:
+    def __init__(self, model_name: str, window: int = 50, failure_threshold: int = 3, cooldown_seconds: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.model_name = model_name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._clock = clock
+        self._window = max(MIN_LATENCY_SAMPLES, int(window))
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.counts: Counter = Counter()
+
+    # --- Latencias y timeout ---
+
+    def percentile(self, percent: float, kind: str = SINGLE) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if not samples:
+            return None
+        rank = max(0, math.ceil(percent / 100.0 * len(samples)) - 1) # Método del rango más cercano
+        return samples[rank]
+
+    def timeout(self, default: float, kind: str = SINGLE) -> float:
+        """AI_TIMEOUT_MULTIPLIER x percentil AI_TIMEOUT_PERCENTILE de `kind`, entre AI_TIMEOUT_MIN_SECONDS y `default`."""
+        if not getattr(settings, 'AI_ADAPTIVE_TIMEOUT', True) or len(self._latencies.get(kind, ())) < MIN_LATENCY_SAMPLES:
+            return default
+        reference = self.percentile(float(getattr(settings, 'AI_TIMEOUT_PERCENTILE', 95)), kind)
+        adaptive = reference * float(getattr(settings, 'AI_TIMEOUT_MULTIPLIER', 2.0))
+        return min(default, max(float(getattr(settings, 'AI_TIMEOUT_MIN_SECONDS', 3.0)), adaptive))
+
+    # --- Circuit breaker ---
+
+    def allow_request(self) -> Optional[bool]:
+        """
+        None si el circuito está abierto (la petición no debe salir). Si no, True cuando esta petición es la
+        única de prueba del estado semiabierto y False si es una petición normal; quien la lanza lo pasa
+        luego a release_probe.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if self._clock() - self._opened_at < self.cooldown_seconds:
+                    self.counts["rechazadas"] += 1
+                    return None
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self.counts["rechazadas"] += 1
+                    return None
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def is_available(self) -> bool:
+        """Como allow_request, pero sin reservar la petición de prueba ni contar rechazos."""
+        with self._lock:
+            if self.state == OPEN:
+                return self._clock() - self._opened_at >= self.cooldown_seconds
+            return not (self.state == HALF_OPEN and self._probe_in_flight)
+
+    def cooldown_remaining(self) -> Optional[float]:
+        """Segundos hasta la petición de prueba con el circuito abierto (0 si ya toca); None si no está abierto."""
+        with self._lock:
+            if self.state != OPEN:
+                return None
+            return max(0.0, self.cooldown_seconds - (self._clock() - self._opened_at))
+
+    def record_success(self, latency: float, kind: str = SINGLE):
+        with self._lock:
+            self._latencies.setdefault(kind, deque(maxlen=self._window)).append(latency)
+            self.counts["exitos"] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self) -> bool:
+        """Registra un fallo; True si con él se abre el circuito."""
+        with self._lock:
+            self.counts["fallos"] += 1
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN: self.counts["aperturas"] += 1
+                self.state = OPEN
+                self._opened_at = self._clock()
+                return True
+            return False
+
+    def release_probe(self, probe: bool):
+        """
+        La petición terminó sin decir nada de la salud del modelo (p. ej. 401, 429 o cancelación). Solo
+        libera la prueba si era esta petición (`probe`, lo que devolvió allow_request): una petición normal
+        cancelada no debe dejar pasar una segunda prueba mientras la primera sigue en vuelo.
+        """
+        if not probe:
+            return
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, object]:
+        default_timeout = float(getattr(settings, 'API_TIMEOUT_SECONDS', 60))
+        stats: Dict[str, object] = {"estado": self.state}
+        for kind, suffix in ((SINGLE, ""), (BATCH, "_lote")):
+            if suffix and kind not in self._latencies: continue
+            p50, p95 = self.percentile(50, kind), self.percentile(95, kind)
+            stats[f"p50{suffix}"] = round(p50, 2) if p50 is not None else None
+            stats[f"p95{suffix}"] = round(p95, 2) if p95 is not None else None
+            stats[f"timeout{suffix}"] = round(self.timeout(default_timeout, kind), 1)
+        stats.update(self.counts)
+        return stats
+
+
+_model_health: Dict[str, ModelHealth] = {}
+_model_health_lock = threading.Lock()
+
+
+def get_model_health(model_name: str) -> ModelHealth:
+    with _model_health_lock:
+        health = _model_health.get(model_name)
+        if health is None:
+            health = ModelHealth(
+                model_name,
+                window=getattr(settings, 'AI_LATENCY_WINDOW', 50),
+                failure_threshold=getattr(settings, 'AI_CIRCUIT_FAILURE_THRESHOLD', 3),
+                cooldown_seconds=getattr(settings, 'AI_CIRCUIT_COOLDOWN_SECONDS', 60),
+            )
+            _model_health[model_name] = health
+        return health
+
+
+def model_health_stats() -> Dict[str, Dict[str, object]]:
+    with _model_health_lock:
+        models = dict(_model_health)
+    return {model_name: health.stats() for model_name, health in models.items()}
+
+
+def reset_model_health():
+    """Olvida latencias y estado de todos los modelos (p. ej. entre pasadas de un benchmark)."""
+    with _model_health_lock:
+        _model_health.clear()
@@ -1,11 +1,12 @@
-from openai import OpenAI, APIConnectionError, RateLimitError, APIStatusError # IMPORTACIONES CORREGIDAS
+import asyncio
+import concurrent.futures
 import json
+import threading
 import time
 import re
-import base64
-from io import BytesIO
 from PIL import Image
-from typing import Optional, Dict
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, TypeVar
 
 # Importar settings y logger
 try:
@@ -22,9 +23,69 @@ except ImportError:
     settings = MockSettings()
     print("ADVERTENCIA (ai_integration.py): No se pudo importar 'config.settings'. Usando configuraciones por defecto.")
 
+from core.ai_cache import get_ai_cache, hash_payload
+from core.ai_health import BATCH, SINGLE, get_model_health, model_health_stats
+from core.field_extractor import relevant_text_windows
+from core.json_stream import IncrementalJSONScanner, first_matching_value
+from core.vision_payload import VisionPayloadOptions, build_vision_payload
+from core.rate_limiter import AsyncTokenBucket, parse_retry_after
 from utils.logger import get_app_logger
+from utils.startup_timer import startup_timer
 app_logger = get_app_logger()
 
+DEFAULT_AI_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Versión de cada plantilla de prompt (forma parte de la clave de la caché de IA): subirla al cambiar el prompt
+TEXT_PROMPT_VERSION = 1
+VISION_PROMPT_VERSION = 2
+AI_FIELDS = ("id_type", "id_number", "acta_no")
+_JSON_START_RE = re.compile(r"[\[{]")
+
+T = TypeVar("T")
+
+
+class _TextBatchItem(NamedTuple):
+    """Un documento dentro de un lote de IA de texto; `label` es su nombre (único) dentro del prompt."""
+    label: str
+    text: str
+    filename: str
+    cache_key: Optional[str]
+
+
+class _EventLoopThread:
+    """
+    Bucle asyncio en un hilo de fondo (daemon), arrancado en el primer uso. Todas las llamadas a la API,
+    vengan del hilo que vengan, se ejecutan en él y comparten el límite de concurrencia y el token bucket.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="ai-event-loop", daemon=True)
+                self._thread.start()
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stop(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop, self._thread = None, None
+
+
+def _completed_future(result) -> concurrent.futures.Future:
+    future = concurrent.futures.Future()
+    future.set_result(result)
+    return future
+
 
 class AIIntegrator:
     def __init__(self):
@@ -38,30 +99,149 @@ class AIIntegrator:
         if hasattr(settings, 'LLAMA32_VISION_MODEL') and settings.LLAMA32_VISION_MODEL:
             self.vision_model_name = settings.LLAMA32_VISION_MODEL
         
-        self.client = None
+        # El cliente (y el paquete `openai`, de importación costosa) se crea en el primer uso, no al arrancar
+        self._client = None
+        self._client_init_attempted = False
+        self._client_lock = threading.Lock()
+        # Límites compartidos por todas las peticiones; se crean dentro del bucle de eventos de la IA
+        self.max_concurrency = max(1, int(getattr(settings, 'AI_MAX_CONCURRENCY', 4)))
+        self._loop_thread = _EventLoopThread()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.rate_limiter: Optional[AsyncTokenBucket] = None
+        self.text_batch_stats: Counter = Counter() # Solo se modifica dentro del bucle de eventos de la IA
+        self.prompt_compaction_stats: Counter = Counter()
+        self.vision_payload_stats: Counter = Counter()
+        self.streaming_stats: Counter = Counter() # Solo se modifica dentro del bucle de eventos de la IA
+        self._stats_lock = threading.Lock()
         if not self.api_key:
             app_logger.warning("OPENROUTER_API_KEY no está configurada. La integración con IA estará deshabilitada.")
-        else:
-            try:
-                timeout_seconds = settings.API_TIMEOUT_SECONDS if hasattr(settings, 'API_TIMEOUT_SECONDS') else 60
-                self.client = OpenAI(
-                    base_url="https://openrouter.ai/api/v1",
-                    api_key=self.api_key,
-                    timeout=timeout_seconds,
-                    max_retries=0 
-                )
-                app_logger.info(f"Cliente OpenAI inicializado para OpenRouter. Modelo Texto: {self.text_model_name}, Modelo Visión: {self.vision_model_name}")
-            except Exception as e:
-                app_logger.error(f"Error al inicializar el cliente OpenAI para OpenRouter: {e}", exc_info=True)
+
+    @property
+    def client(self):
+        if self.api_key and not self._client_init_attempted:
+            with self._client_lock:
+                if not self._client_init_attempted:
+                    self._client = self._create_client()
+                    self._client_init_attempted = True
+        return self._client
+
+    def _create_client(self):
+        try:
+            openai = startup_timer.import_module("openai")
+            timeout_seconds = settings.API_TIMEOUT_SECONDS if hasattr(settings, 'API_TIMEOUT_SECONDS') else 60
+            client = openai.AsyncOpenAI(
+                base_url=getattr(settings, 'AI_BASE_URL', None) or DEFAULT_AI_BASE_URL,
+                api_key=self.api_key,
+                timeout=timeout_seconds,
+                max_retries=0 
+            )
+            app_logger.info(f"Cliente OpenAI inicializado para OpenRouter. Modelo Texto: {self.text_model_name}, Modelo Visión: {self.vision_model_name}")
+            return client
+        except Exception as e:
+            app_logger.error(f"Error al inicializar el cliente OpenAI para OpenRouter: {e}", exc_info=True)
+            return None
+
+    def is_api_key_configured(self) -> bool:
+        """Comprobación barata (no crea el cliente): útil para la GUI durante el arranque."""
+        return bool(self.api_key)
 
     def is_api_configured_and_client_valid(self) -> bool:
         return bool(self.api_key and self.client)
 
-    def _make_api_call(self, model_name: str, messages_payload: list, original_filename: str) -> Optional[Dict[str, str]]:
+    def _get_async_limits(self):
+        # Debe llamarse desde el bucle de eventos de la IA (los primitivos asyncio se atan a él)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            requests_per_minute = float(getattr(settings, 'AI_REQUESTS_PER_MINUTE', 20))
+            self.rate_limiter = AsyncTokenBucket(rate=requests_per_minute / 60.0, burst=getattr(settings, 'AI_RATE_LIMIT_BURST', 4))
+        return self._semaphore, self.rate_limiter
+
+    def _cache_key(self, model_name: str, request_kind: str, prompt_version: int, payload: Callable[[], bytes]) -> Optional[str]:
+        """Clave de la caché de IA, o None si está deshabilitada (el payload solo se lee y hashea si hace falta)."""
+        ai_cache = get_ai_cache()
+        return ai_cache.make_key(model_name, request_kind, prompt_version, hash_payload(payload())) if ai_cache else None
+
+    def _cached_result_future(self, cache_key: Optional[str], model_name: str, original_filename: str) -> Optional[concurrent.futures.Future]:
+        ai_cache = get_ai_cache()
+        if not (ai_cache and cache_key): return None
+        try:
+            cached = ai_cache.get_result(cache_key)
+        except Exception as e_cache:
+            app_logger.warning(f"Error consultando caché de IA para '{original_filename}': {e_cache}")
+            return None
+        if cached is None: return None
+        app_logger.info(f"Respuesta de IA ({model_name}) para '{original_filename}' recuperada de la caché: {cached}")
+        return _completed_future(cached)
+
+    def _store_cached_result(self, cache_key: str, data: Dict[str, str], original_filename: str):
+        ai_cache = get_ai_cache()
+        if not ai_cache: return
+        try: ai_cache.put_result(cache_key, data)
+        except Exception as e_cache: app_logger.warning(f"Error guardando en caché de IA para '{original_filename}': {e_cache}")
+
+    @staticmethod
+    def _model_available(model_name: str, original_filename: str) -> bool:
+        """False con el circuito del modelo abierto: el documento sigue por el otro camino (visión/texto) sin esperar."""
+        if get_model_health(model_name).is_available():
+            return True
+        app_logger.warning(f"Circuito de {model_name} abierto: se omite la IA de este modelo para '{original_filename}'.")
+        return False
+
+    @staticmethod
+    def _record_model_failure(health, model_name: str) -> bool:
+        """Registra el fallo en la salud del modelo; True si con él se abre el circuito (no tiene sentido reintentar)."""
+        if not health.record_failure():
+            return False
+        app_logger.error(f"Circuito de {model_name} abierto tras {health.failure_threshold} fallo(s) seguidos; "
+                         f"sin peticiones a este modelo durante {health.cooldown_seconds:.0f}s.")
+        return True
+
+    def _submit_api_call(self, model_name: str, messages_payload: list, original_filename: str, cache_key: Optional[str] = None) -> concurrent.futures.Future:
+        """Encola la llamada en el bucle de eventos de la IA y devuelve un Future con el resultado (o None)."""
         if not self.is_api_configured_and_client_valid():
             app_logger.info("Cliente IA no configurado o inválido, omitiendo llamada a API.")
-            return None
+            return _completed_future(None)
+        if not self._model_available(model_name, original_filename):
+            return _completed_future(None)
+        return self._loop_thread.submit(self._make_api_call_async(model_name, messages_payload, original_filename, cache_key))
+
+    def _parse_ai_response(self, ai_message_content: str, model_name: str, attempt: int, original_filename: str) -> Optional[Dict[str, str]]:
+        json_match = re.search(r"```json\s*(\{.*?\})\s*```|(\{.*?\})", ai_message_content, re.DOTALL)
+        if json_match:
+            json_str = json_match.group(1) if json_match.group(1) else json_match.group(2)
+            try:
+                extracted_data = json.loads(json_str)
+                final_data = {
+                    "id_type": extracted_data.get("id_type"),
+                    "id_number": extracted_data.get("id_number"),
+                    "acta_no": extracted_data.get("acta_no")
+                }
+                app_logger.info(f"Datos extraídos por IA ({model_name}) para '{original_filename}': {final_data}")
+                return final_data
+            except json.JSONDecodeError as json_err_inner:
+                app_logger.error(f"Error al decodificar JSON de la respuesta IA ({model_name}, intento {attempt + 1}): {json_err_inner}. JSON string: '{json_str}'")
+        else:
+            app_logger.warning(f"No se encontró JSON en la respuesta de IA ({model_name}, intento {attempt + 1}) para '{original_filename}'. Contenido: {ai_message_content}")
+        return None
+
+    async def _make_api_call_async(self, model_name: str, messages_payload: list, original_filename: str, cache_key: Optional[str] = None) -> Optional[Dict[str, str]]:
+        final_data = await self._request_with_retries(
+            model_name, messages_payload, original_filename,
+            lambda ai_message_content, attempt: self._parse_ai_response(ai_message_content, model_name, attempt, original_filename),
+            stop_when=lambda value: isinstance(value, dict) and all(key in value for key in AI_FIELDS))
+        if final_data is not None and cache_key:
+            await asyncio.to_thread(self._store_cached_result, cache_key, final_data, original_filename)
+        return final_data
 
+    async def _request_with_retries(self, model_name: str, messages_payload: list, original_filename: str,
+                                    parse: Callable[[str, int], Optional[T]], max_tokens: int = 350,
+                                    stop_when: Optional[Callable[[object], bool]] = None, latency_kind: str = SINGLE) -> Optional[T]:
+        """
+        Envía la petición con reintentos; `parse(contenido, intento)` devuelve el resultado o None para reintentar.
+        `latency_kind` separa las latencias (y el timeout adaptativo) de las peticiones por lotes de las individuales.
+        Con AI_STREAMING la respuesta llega por streaming y se corta en cuanto aparece un valor JSON completo
+        que cumple `stop_when` (el resto, p. ej. explicaciones tras el JSON, ni se espera ni se genera).
+        """
         site_url = settings.OPENROUTER_SITE_URL if hasattr(settings, 'OPENROUTER_SITE_URL') else "YOUR_SITE_URL_HERE"
         site_title = settings.OPENROUTER_SITE_TITLE if hasattr(settings, 'OPENROUTER_SITE_TITLE') else "OCRenameApp"
         
@@ -73,75 +253,212 @@ class AIIntegrator:
         app_logger.info(f"Enviando solicitud para '{original_filename}' al modelo IA: {model_name}")
         
         max_retries = settings.API_MAX_RETRIES if hasattr(settings, 'API_MAX_RETRIES') else 3
-        completion = None # Inicializar completion a None
+        streaming = bool(getattr(settings, 'AI_STREAMING', False))
+        semaphore, rate_limiter = self._get_async_limits()
+        health = get_model_health(model_name)
+        default_timeout = float(getattr(settings, 'API_TIMEOUT_SECONDS', 60))
+        from openai import APIConnectionError, RateLimitError, APIStatusError # Ya importado al crear el cliente
 
         for attempt in range(max_retries):
+            probe = health.allow_request()
+            if probe is None:
+                app_logger.warning(f"Circuito de {model_name} abierto: '{original_filename}' no se envía a este modelo (intento {attempt+1}).")
+                return None
             try:
-                api_start_time = time.time()
-                completion = self.client.chat.completions.create( # Asignar a completion
-                    model=model_name,
-                    messages=messages_payload,
-                    temperature=0.1,
-                    max_tokens=350,
-                    extra_headers=extra_headers,
-                )
+                request_kwargs = dict(model=model_name, messages=messages_payload, temperature=0.1, max_tokens=max_tokens,
+                                      extra_headers=extra_headers, timeout=health.timeout(default_timeout, latency_kind))
+                async with semaphore:
+                    await rate_limiter.acquire()
+                    api_start_time = time.time()
+                    if streaming:
+                        ai_message_content = await self._stream_completion_content(request_kwargs, stop_when, api_start_time, attempt)
+                    else:
+                        completion = await self.client.chat.completions.create(**request_kwargs)
+                rate_limiter.on_success()
                 api_duration = time.time() - api_start_time
+                health.record_success(api_duration, latency_kind)
                 app_logger.debug(f"API call to {model_name} took {api_duration:.2f} seconds.")
                 
-                # Verificar si completion y sus atributos necesarios existen antes de acceder
-                if completion and completion.choices and len(completion.choices) > 0 and completion.choices[0].message:
-                    ai_message_content = completion.choices[0].message.content
-                    if ai_message_content is None: # A veces el contenido puede ser None explícitamente
-                        ai_message_content = "" 
-                        app_logger.warning(f"IA ({model_name}, intento {attempt+1}) devolvió contenido de mensaje None, tratando como vacío.")
-                else:
-                    app_logger.error(f"Respuesta inesperada de IA o estructura de 'completion' incompleta ({model_name}, intento {attempt+1}). Completion: {completion}")
-                    ai_message_content = "" # Tratar como si no hubiera contenido para evitar más errores
+                if not streaming:
+                    # Verificar si completion y sus atributos necesarios existen antes de acceder
+                    if completion and completion.choices and len(completion.choices) > 0 and completion.choices[0].message:
+                        ai_message_content = completion.choices[0].message.content
+                        if ai_message_content is None: # A veces el contenido puede ser None explícitamente
+                            ai_message_content = "" 
+                            app_logger.warning(f"IA ({model_name}, intento {attempt+1}) devolvió contenido de mensaje None, tratando como vacío.")
+                    else:
+                        app_logger.error(f"Respuesta inesperada de IA o estructura de 'completion' incompleta ({model_name}, intento {attempt+1}). Completion: {completion}")
+                        ai_message_content = "" # Tratar como si no hubiera contenido para evitar más errores
 
                 app_logger.debug(f"Respuesta cruda de IA ({model_name}, intento {attempt+1}): {ai_message_content}")
+                parsed = parse(ai_message_content, attempt)
+                if parsed is not None: # Éxito
+                    return parsed
 
-                json_match = re.search(r"```json\s*(\{.*?\})\s*```|(\{.*?\})", ai_message_content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1) if json_match.group(1) else json_match.group(2)
-                    try:
-                        extracted_data = json.loads(json_str)
-                        final_data = {
-                            "id_type": extracted_data.get("id_type"),
-                            "id_number": extracted_data.get("id_number"),
-                            "acta_no": extracted_data.get("acta_no")
-                        }
-                        app_logger.info(f"Datos extraídos por IA ({model_name}) para '{original_filename}': {final_data}")
-                        return final_data # Éxito, salir del bucle y la función
-                    except json.JSONDecodeError as json_err_inner:
-                        app_logger.error(f"Error al decodificar JSON de la respuesta IA ({model_name}, intento {attempt + 1}): {json_err_inner}. JSON string: '{json_str}'")
-                else:
-                    app_logger.warning(f"No se encontró JSON en la respuesta de IA ({model_name}, intento {attempt + 1}) para '{original_filename}'. Contenido: {ai_message_content}")
-
-            # --- BLOQUES EXCEPT CORREGIDOS ---
-            except APIConnectionError as e: 
+            except asyncio.CancelledError:
+                health.release_probe(probe) # Cancelada (p. ej. perdió la carrera): no dice nada de la salud del modelo
+                raise
+            except APIConnectionError as e: # Incluye APITimeoutError (timeout adaptativo agotado)
                 app_logger.error(f"API Connection Error ({model_name}, intento {attempt+1}): {e}")
-            except RateLimitError as e: 
-                app_logger.warning(f"API Rate Limit Error ({model_name}, intento {attempt+1}): {e}. Esperando...")
-                time.sleep(10 * (attempt + 1))
-            except APIStatusError as e: 
+                if self._record_model_failure(health, model_name): return None
+            except RateLimitError as e:
+                # Sin dormir aquí: el token bucket frena (y, con Retry-After, pausa) a todas las peticiones a la vez
+                retry_after = parse_retry_after(e.response.headers if getattr(e, 'response', None) is not None else None)
+                rate_limiter.on_rate_limited(retry_after)
+                app_logger.warning(f"API Rate Limit Error ({model_name}, intento {attempt+1}): {e}. Tasa reducida a {rate_limiter.rate * 60:.1f} peticiones/min"
+                                   + (f", pausa de {retry_after:.1f}s pedida por el servidor." if retry_after else "."))
+                health.release_probe(probe) # Un 429 es cosa del límite de tasa, no de la salud del modelo
+                if attempt < max_retries - 1: continue
+            except APIStatusError as e:
                 response_text = e.response.text if hasattr(e, 'response') and e.response else 'N/A'
                 status_code = e.status_code if hasattr(e, 'status_code') else 'N/A'
                 app_logger.error(f"API Status Error ({model_name}, intento {attempt+1}): Code={status_code}, Resp={response_text}")
                 if hasattr(e, 'status_code') and e.status_code == 401:
                     app_logger.error("Error de autenticación con OpenRouter. Verifica tu API Key.")
+                    health.release_probe(probe)
                     return None 
-            except Exception as e_gen: 
-                 app_logger.error(f"API General Error ({model_name}, intento {attempt+1}): {e_gen}", exc_info=True)
+                if isinstance(status_code, int) and status_code >= 500:
+                    if self._record_model_failure(health, model_name): return None
+                else:
+                    health.release_probe(probe) # Un 4xx es problema de la petición, no del modelo
+            except Exception as e_gen:
+                app_logger.error(f"API General Error ({model_name}, intento {attempt+1}): {e_gen}", exc_info=True)
+                if self._record_model_failure(health, model_name): return None
             
             if attempt < max_retries - 1:
                 app_logger.info(f"Reintentando llamada a API ({model_name}) en {3 * (attempt + 1)} segundos...")
-                time.sleep(3 * (attempt + 1))
+                await asyncio.sleep(3 * (attempt + 1)) # Solo espera esta petición; el hilo y las demás siguen
             else:
                 app_logger.error(f"Todos los {max_retries} intentos de API ({model_name}) fallaron para '{original_filename}'.")
         return None # Retornar None si todos los reintentos fallan o si hay error no recuperable
 
+    async def _stream_completion_content(self, request_kwargs: dict, stop_when: Optional[Callable[[object], bool]],
+                                         start_time: float, attempt: int) -> str:
+        """Contenido de la respuesta por streaming; registra tiempo al primer token y al JSON completo."""
+        model_name = request_kwargs["model"]
+        scanner = IncrementalJSONScanner()
+        first_token_at = json_at = matched = None
+        stream = await self.client.chat.completions.create(stream=True, **request_kwargs)
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta if chunk.choices else None
+                if delta is None: continue
+                # Los modelos de razonamiento envían primero `reasoning` (que no se usa): también cuenta como primer token
+                if first_token_at is None and (delta.content or getattr(delta, "reasoning", None)):
+                    first_token_at = time.time()
+                if not delta.content: continue
+                completed = scanner.feed(delta.content)
+                matched = first_matching_value(completed, stop_when) if stop_when and completed else None
+                if matched is not None:
+                    json_at = time.time()
+                    break
+        finally:
+            await stream.close() # Al cortar antes del final, cierra la conexión y el servidor deja de generar
+        end_time = time.time()
+        stats = self.streaming_stats
+        stats["peticiones"] += 1
+        stats["caracteres"] += len(scanner.text)
+        if first_token_at is not None: stats["con_primer_token"] += 1; stats["segundos_primer_token"] += first_token_at - start_time
+        if json_at is not None: stats["cortadas_tras_json"] += 1; stats["segundos_hasta_json"] += json_at - start_time
+        stats["segundos_totales"] += end_time - start_time
+        app_logger.debug(f"Streaming de IA ({model_name}, intento {attempt+1}): primer token "
+                         + (f"{first_token_at - start_time:.2f}s" if first_token_at is not None else "n/d")
+                         + (f", JSON completo a los {json_at - start_time:.2f}s (stream cortado)" if json_at is not None else f", fin del stream a los {end_time - start_time:.2f}s")
+                         + f", {len(scanner.text)} caracteres.")
+        # Tras un corte se devuelve solo el valor que lo provocó: el texto previo (razonamiento) no llega al parseo
+        return json.dumps(matched, ensure_ascii=False) if matched is not None else scanner.text
+
+    def stats(self) -> Optional[Dict[str, float]]:
+        return self.rate_limiter.stats() if self.rate_limiter else None
+
+    def batch_stats(self) -> Dict[str, int]:
+        return dict(self.text_batch_stats)
+
+    def stream_stats(self) -> Optional[str]:
+        stats = dict(self.streaming_stats)
+        if not stats.get("peticiones"): return None
+        parts = [f"{stats['peticiones']} petición(es), {stats.get('cortadas_tras_json', 0)} cortada(s) tras el JSON"]
+        if stats.get("con_primer_token"): parts.append(f"primer token medio {stats['segundos_primer_token'] / stats['con_primer_token']:.2f}s")
+        if stats.get("cortadas_tras_json"): parts.append(f"JSON completo medio {stats['segundos_hasta_json'] / stats['cortadas_tras_json']:.2f}s")
+        parts.append(f"duración media {stats['segundos_totales'] / stats['peticiones']:.2f}s")
+        return ", ".join(parts)
+
+    def vision_stats(self) -> Optional[str]:
+        with self._stats_lock:
+            stats = dict(self.vision_payload_stats)
+        if not stats.get("peticiones"): return None
+        return (f"{stats['peticiones']} imagen(es), media {stats['bytes'] / stats['peticiones'] / 1024:.0f} KB y "
+                f"{stats['segundos_codificacion'] / stats['peticiones'] * 1000:.0f} ms de preparación")
+
+    def compaction_stats(self) -> Optional[str]:
+        with self._stats_lock:
+            stats = dict(self.prompt_compaction_stats)
+        if not stats.get("documentos"): return None
+        before, after = stats["caracteres_antes"], stats["caracteres_despues"]
+        return (f"{stats['documentos']} documento(s), {stats.get('compactados', 0)} compactado(s); texto enviado {after}/{before} caracteres "
+                f"({after / before * 100 if before else 100:.0f}%), media {after // stats['documentos']} por documento")
+
+    def circuit_wait_seconds(self) -> Optional[float]:
+        """Segundos hasta que todos los circuitos abiertos de los modelos de visión/texto admitan la prueba; None si ninguno está abierto."""
+        remaining = [get_model_health(model_name).cooldown_remaining() for model_name in (self.vision_model_name, self.text_model_name) if model_name]
+        remaining = [seconds for seconds in remaining if seconds is not None]
+        return max(remaining) if remaining else None
+
+    @staticmethod
+    def health_stats() -> Optional[str]:
+        """Estado, percentiles de latencia y timeout vigente de cada modelo usado (ver core/ai_health.py)."""
+        stats = model_health_stats()
+        if not stats: return None
+        return "; ".join(f"{model_name}: " + ", ".join(f"{key}={value}" for key, value in model_stats.items() if value is not None)
+                         for model_name, model_stats in stats.items())
+
+    def close(self):
+        """Cierra el cliente HTTP y detiene el bucle de eventos de la IA (al salir de la aplicación)."""
+        if self._client is not None:
+            try:
+                self._loop_thread.submit(self._client.close()).result(timeout=5)
+            except Exception as e:
+                app_logger.debug(f"Error cerrando el cliente de IA: {e}")
+        self._loop_thread.stop()
+
     def get_data_with_text_ai(self, text_content: str, original_filename: str) -> Optional[Dict[str, str]]:
-        # ... (código del prompt sin cambios) ...
+        return self.submit_text_ai(text_content, original_filename).result()
+
+    def get_data_with_vision_ai(self, pil_image_obj: Image.Image, original_filename: str, doc_type: Optional[str] = None) -> Optional[Dict[str, str]]:
+        return self.submit_vision_ai(pil_image_obj, original_filename, doc_type).result()
+
+    def submit_text_ai(self, text_content: str, original_filename: str) -> concurrent.futures.Future:
+        """Como get_data_with_text_ai, pero sin esperar: varias peticiones pueden quedar en vuelo a la vez."""
+        text_content = self._compact_text(text_content, original_filename)
+        cache_key = self._cache_key(self.text_model_name, "texto", TEXT_PROMPT_VERSION, lambda: text_content.encode('utf-8'))
+        cached = self._cached_result_future(cache_key, self.text_model_name, original_filename)
+        if cached: return cached
+        messages_payload = self._build_text_messages(text_content, original_filename)
+        return self._submit_api_call(self.text_model_name, messages_payload, original_filename, cache_key)
+
+    def _compact_text(self, text_content: str, original_filename: str) -> str:
+        """
+        Con AI_TEXT_PROMPT_COMPACTION, deja solo el encabezado y las ventanas alrededor de las palabras clave
+        de los campos (ver field_extractor.relevant_text_windows). La clave de la caché usa el texto ya
+        compactado: cambiar los ajustes de compactación no reutiliza respuestas de otro texto.
+        """
+        if not text_content or not getattr(settings, 'AI_TEXT_PROMPT_COMPACTION', True):
+            return text_content
+        compacted, cue_count = relevant_text_windows(text_content, window_chars=getattr(settings, 'AI_TEXT_WINDOW_CHARS', 200),
+                                                     header_chars=getattr(settings, 'AI_TEXT_HEADER_CHARS', 400))
+        if len(compacted) >= len(text_content): compacted = text_content # Texto corto o palabras clave por todas partes
+        with self._stats_lock:
+            self.prompt_compaction_stats["documentos"] += 1
+            self.prompt_compaction_stats["compactados"] += compacted is not text_content
+            self.prompt_compaction_stats["caracteres_antes"] += len(text_content)
+            self.prompt_compaction_stats["caracteres_despues"] += len(compacted)
+        if compacted is text_content:
+            app_logger.debug(f"Prompt de IA de texto para '{original_filename}': {len(text_content)} caracteres, sin compactar ({cue_count} palabras clave).")
+        else:
+            app_logger.info(f"Prompt de IA de texto para '{original_filename}' compactado: {len(text_content)} -> {len(compacted)} caracteres ({cue_count} palabras clave).")
+        return compacted
+
+    def _build_text_messages(self, text_content: str, original_filename: str) -> list:
         prompt = f"""
         Analiza el siguiente texto extraído de un documento llamado "{original_filename}". El texto puede contener errores de OCR.
         El documento es un "Acta de Entrega de Medicamentos" o una "Fórmula Médica" en español.
@@ -160,44 +477,201 @@ class AIIntegrator:
         Asegúrate de que la respuesta sea solo el objeto JSON, sin texto adicional antes o después.
         Ejemplo: {{"id_type": "CC", "id_number": "12345678", "acta_no": "98765"}}
         """
-        messages_payload = [{"role": "user", "content": prompt}]
-        return self._make_api_call(self.text_model_name, messages_payload, original_filename)
+        return [{"role": "user", "content": prompt}]
+
+    def get_data_with_text_ai_batch(self, items: List[Tuple[str, str]]) -> List[Optional[Dict[str, str]]]:
+        """
+        IA de texto para varios documentos `(texto, nombre_archivo)` con menos peticiones: los que no están en
+        la caché se agrupan (hasta AI_TEXT_BATCH_SIZE documentos y AI_TEXT_BATCH_MAX_CHARS caracteres de texto)
+        y cada grupo va en un solo prompt que pide un array JSON con una entrada por archivo. Los documentos
+        cuya entrada falte o venga mal formada se reintentan uno a uno. Devuelve un resultado por documento.
+        """
+        return self.submit_text_ai_batch(items).result()
 
-    def get_data_with_vision_ai(self, pil_image_obj: Image.Image, original_filename: str) -> Optional[Dict[str, str]]:
-        # ... (código del prompt sin cambios) ...
+    def submit_text_ai_batch(self, items: List[Tuple[str, str]]) -> concurrent.futures.Future:
+        """Como get_data_with_text_ai_batch, pero sin esperar. Cancelar el Future cancela todas las peticiones del lote."""
+        if not items: return _completed_future([])
+        if not self.is_api_configured_and_client_valid():
+            app_logger.info("Cliente IA no configurado o inválido, omitiendo llamada a API.")
+            return _completed_future([None] * len(items))
+        results: List[Optional[Dict[str, str]]] = [None] * len(items)
+        pending: List[Tuple[int, _TextBatchItem]] = []
+        used_labels = set()
+        for index, (text_content, original_filename) in enumerate(items):
+            text_content = self._compact_text(text_content, original_filename)
+            # Misma clave que submit_text_ai: la respuesta de un lote vale igual que la individual para ese texto
+            cache_key = self._cache_key(self.text_model_name, "texto", TEXT_PROMPT_VERSION, lambda: text_content.encode('utf-8'))
+            cached = self._cached_result_future(cache_key, self.text_model_name, original_filename)
+            if cached:
+                results[index] = cached.result()
+                continue
+            label, suffix = original_filename, 2
+            while label in used_labels: # El array de respuesta se asocia por nombre: deben ser únicos en el lote
+                label, suffix = f"{original_filename} ({suffix})", suffix + 1
+            used_labels.add(label)
+            pending.append((index, _TextBatchItem(label, text_content, original_filename, cache_key)))
+        if not pending or not self._model_available(self.text_model_name, f"{len(pending)} documento(s) del lote"):
+            return _completed_future(results)
+        return self._loop_thread.submit(self._text_batch_groups_async(results, self._group_text_batch(pending)))
+
+    async def _text_batch_groups_async(self, results: List[Optional[Dict[str, str]]],
+                                       groups: List[List[Tuple[int, _TextBatchItem]]]) -> List[Optional[Dict[str, str]]]:
+        # Todos los grupos quedan en vuelo a la vez
+        group_results = await asyncio.gather(*(self._text_batch_call_async([item for _, item in group]) for group in groups))
+        for group, group_result in zip(groups, group_results):
+            for (index, _), result in zip(group, group_result):
+                results[index] = result
+        return results
+
+    @staticmethod
+    def _group_text_batch(pending: List[Tuple[int, _TextBatchItem]]) -> List[List[Tuple[int, _TextBatchItem]]]:
+        batch_size = max(1, int(getattr(settings, 'AI_TEXT_BATCH_SIZE', 5)))
+        max_chars = int(getattr(settings, 'AI_TEXT_BATCH_MAX_CHARS', 12000))
+        groups, current, current_chars = [], [], 0
+        for entry in pending:
+            text_chars = len(entry[1].text)
+            if current and (len(current) >= batch_size or current_chars + text_chars > max_chars):
+                groups.append(current)
+                current, current_chars = [], 0
+            current.append(entry)
+            current_chars += text_chars
+        if current: groups.append(current)
+        return groups
+
+    async def _single_text_call_async(self, item: _TextBatchItem) -> Optional[Dict[str, str]]:
+        return await self._make_api_call_async(self.text_model_name, self._build_text_messages(item.text, item.filename), item.filename, item.cache_key)
+
+    async def _text_batch_call_async(self, group: List[_TextBatchItem]) -> List[Optional[Dict[str, str]]]:
+        if len(group) == 1: # Un documento solo va con el prompt individual de siempre
+            return [await self._single_text_call_async(group[0])]
+        model_name = self.text_model_name
+        batch_label = f"lote de {len(group)} documentos ({', '.join(item.label for item in group)})"
+        labels = [item.label for item in group]
+        self.text_batch_stats["lotes"] += 1
+        self.text_batch_stats["documentos_en_lote"] += len(group)
+        entries = await self._request_with_retries(
+            model_name, self._build_text_batch_messages(group), batch_label,
+            lambda ai_message_content, attempt: self._parse_ai_batch_response(ai_message_content, model_name, attempt, labels),
+            max_tokens=350 * len(group), latency_kind=BATCH,
+            stop_when=lambda value: (isinstance(value, list) and any(isinstance(entry, dict) for entry in value))
+                                    or (isinstance(value, dict) and set(labels) <= set(value)))
+        entries = entries or {}
+
+        results: List[Optional[Dict[str, str]]] = []
+        retry_positions = []
+        for position, item in enumerate(group):
+            data = entries.get(item.label)
+            results.append(data)
+            if data is None:
+                retry_positions.append(position)
+            elif item.cache_key:
+                await asyncio.to_thread(self._store_cached_result, item.cache_key, data, item.filename)
+        if retry_positions:
+            self.text_batch_stats["reintentos_individuales"] += len(retry_positions)
+            app_logger.warning(f"IA de texto ({model_name}): sin entrada válida en el {batch_label} para "
+                               f"{[group[p].label for p in retry_positions]}. Se reintentan individualmente.")
+            retried = await asyncio.gather(*(self._single_text_call_async(group[p]) for p in retry_positions))
+            for position, data in zip(retry_positions, retried):
+                results[position] = data
+        return results
+
+    def _build_text_batch_messages(self, group: List[_TextBatchItem]) -> list:
+        documents = "\n\n".join(f'=== Documento: "{item.label}" ===\n{item.text}' for item in group)
+        prompt = f"""
+        Analiza los siguientes {len(group)} textos extraídos de documentos distintos. Cada texto va precedido de una línea
+        '=== Documento: "<nombre del archivo>" ===' y puede contener errores de OCR.
+        Cada documento es un "Acta de Entrega de Medicamentos" o una "Fórmula Médica" en español.
+        Para CADA documento, extrae la siguiente información:
+        1. "id_type": El tipo de identificación del PACIENTE (ej. CC, TI, NIT, CE, RC, PA). Busca términos como "Identificación", "USUARIO", "Paciente", "DOCUMENTO".
+        2. "id_number": El número de identificación del PACIENTE.
+        3. "acta_no": El número del "Acta de Entrega" o "Fórmula Médica Nro." o "Orden". Busca términos como "Acta de Entrega No.", "Formula Médica Nro.", "Solicitud De Medicamentos N°", "Orden".
+        No mezcles datos entre documentos: cada valor debe salir del texto de su propio documento.
+
+        Textos a analizar:
+        ---
+        {documents}
+        ---
+
+        Por favor, devuelve la información ÚNICAMENTE como un array JSON con un objeto por documento, en el mismo orden,
+        con las claves "archivo" (el nombre exacto del documento), "id_type", "id_number" y "acta_no".
+        Si alguna pieza de información no se puede encontrar de forma confiable, establece su valor como null.
+        Asegúrate de que la respuesta sea solo el array JSON, sin texto adicional antes o después.
+        Ejemplo: [{{"archivo": "acta_1.pdf", "id_type": "CC", "id_number": "12345678", "acta_no": "98765"}}, {{"archivo": "acta_2.pdf", "id_type": "TI", "id_number": "1098765432", "acta_no": null}}]
+        """
+        return [{"role": "user", "content": prompt}]
+
+    def _parse_ai_batch_response(self, ai_message_content: str, model_name: str, attempt: int, labels: List[str]) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Entradas válidas de la respuesta de un lote, por nombre de documento. Acepta un array de objetos con
+        "archivo", un objeto indexado por nombre o objetos sueltos; una entrada sin las tres claves se descarta
+        (se reintentará sola). None si no hay ninguna entrada utilizable (se reintenta el lote completo).
+        """
+        decoder = json.JSONDecoder()
+        wanted = set(labels)
+        entries: Dict[str, Dict[str, str]] = {}
+
+        def add_entry(label, value):
+            if label in wanted and label not in entries and isinstance(value, dict) and all(key in value for key in AI_FIELDS):
+                entries[label] = {key: value.get(key) for key in AI_FIELDS}
+
+        position = 0
+        while True:
+            match = _JSON_START_RE.search(ai_message_content, position)
+            if not match: break
+            try:
+                value, position = decoder.raw_decode(ai_message_content, match.start())
+            except json.JSONDecodeError:
+                position = match.start() + 1
+                continue
+            for candidate in (value if isinstance(value, list) else [value]):
+                if not isinstance(candidate, dict): continue
+                if "archivo" in candidate:
+                    add_entry(candidate.get("archivo"), candidate)
+                else:
+                    for label, entry in candidate.items(): add_entry(label, entry)
+
+        if not entries:
+            app_logger.warning(f"No se encontró un array JSON utilizable en la respuesta de lote de IA ({model_name}, intento {attempt + 1}). Contenido: {ai_message_content}")
+            return None
+        app_logger.info(f"Datos extraídos por IA ({model_name}) en lote: {len(entries)}/{len(labels)} documentos: {entries}")
+        return entries
+
+    def submit_vision_ai(self, pil_image_obj: Image.Image, original_filename: str, doc_type: Optional[str] = None) -> concurrent.futures.Future:
+        """
+        Como get_data_with_vision_ai, pero sin esperar. La imagen se prepara en el hilo que llama, según
+        VISION_PAYLOAD_* (región de la plantilla de `doc_type`, grises, formato y calidad; ver core/vision_payload.py).
+        """
         if not self.vision_model_name:
             app_logger.warning("Nombre del modelo de visión no configurado. Omitiendo IA de visión.")
-            return None
+            return _completed_future(None)
         if not pil_image_obj:
             app_logger.warning("Objeto de imagen PIL vacío proporcionado a la IA de visión.")
-            return None
+            return _completed_future(None)
 
         try:
-            # Optimizar imagen para Vision AI
-            max_dim = 1280
-            width, height = pil_image_obj.size
-            
-            if width > max_dim or height > max_dim:
-                app_logger.debug(f"Imagen original ({width}x{height}) excede max_dim ({max_dim}). Redimensionando...")
-                if width > height:
-                    new_width = max_dim
-                    new_height = int(height * (max_dim / width))
-                else:
-                    new_height = max_dim
-                    new_width = int(width * (max_dim / height))
-                
-                pil_image_obj = pil_image_obj.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                app_logger.debug(f"Imagen redimensionada a {new_width}x{new_height}.")
-            
-            buffered = BytesIO()
-            pil_image_obj.save(buffered, format="PNG") 
-            img_str_base64 = base64.b64encode(buffered.getvalue()).decode('utf-8')
-            image_data_url = f"data:image/png;base64,{img_str_base64}"
+            options = VisionPayloadOptions.from_settings()
+            # Con acierto en caché no se recorta ni se codifica la imagen. Las opciones y el tipo de documento
+            # (que decide el recorte) forman parte de la clave: otra imagen enviada, otra respuesta.
+            cache_key = self._cache_key(self.vision_model_name, "vision", VISION_PROMPT_VERSION,
+                                        lambda: f"{pil_image_obj.mode}:{pil_image_obj.size}:{options.describe()}:{doc_type}:".encode('utf-8') + pil_image_obj.tobytes())
+            cached = self._cached_result_future(cache_key, self.vision_model_name, original_filename)
+            if cached: return cached
+            if not self._model_available(self.vision_model_name, original_filename): # Sin recortar ni codificar
+                return _completed_future(None)
+
+            payload = build_vision_payload(pil_image_obj, options, doc_type)
+            with self._stats_lock:
+                self.vision_payload_stats["peticiones"] += 1
+                self.vision_payload_stats["bytes"] += payload.num_bytes
+                self.vision_payload_stats["segundos_codificacion"] += payload.encode_seconds
+            app_logger.info(f"Imagen para IA de visión de '{original_filename}' ({options.describe()}): {payload.size[0]}x{payload.size[1]}, "
+                            f"{payload.num_bytes / 1024:.0f} KB, preparada en {payload.encode_seconds * 1000:.0f} ms.")
+            image_data_url = payload.data_url
 
             prompt_text = f"""
             Analiza la siguiente imagen de un documento llamado "{original_filename}".
             El documento es un "Acta de Entrega de Medicamentos" o una "Fórmula Médica" en español.
-            Puede contener tanto texto impreso como texto manuscrito.
+            Puede contener tanto texto impreso como texto manuscrito. {payload.region_note}
             Tu tarea es extraer la siguiente información directamente de la imagen:
             1. "id_type": El tipo de identificación del PACIENTE (ej. CC, TI, NIT, CE, RC, PA). Busca la identificación asociada al paciente o usuario.
             2. "id_number": El número de identificación del PACIENTE.
@@ -221,8 +695,8 @@ class AIIntegrator:
                     }
                 ]
             }]
-            return self._make_api_call(self.vision_model_name, messages_payload, original_filename)
+            return self._submit_api_call(self.vision_model_name, messages_payload, original_filename, cache_key)
 
         except Exception as e_vision_prep:
             app_logger.error(f"Error preparando datos o llamando a IA de visión: {e_vision_prep}", exc_info=True)
-            return None
\ No newline at end of file
+            return _completed_future(None)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+Carrera entre extractores de IA (visión, texto...) que devuelven concurrent.futures.Future: se lanzan
+de forma escalonada (cada uno tras su `delay`, o en cuanto no queda ninguno en vuelo) y la carrera
+termina con el primer conjunto de resultados que `is_done` da por bueno; los que siguen en vuelo se
+cancelan. La política de combinación de resultados queda del lado de quien llama.
+"""
+import concurrent.futures
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+
+class RaceEntrant(NamedTuple):
+    name: str
+    # Recibe los resultados llegados hasta ese momento; devuelve el Future, o None si no debe participar
+    launch: Callable[[Dict[str, Any]], Optional[concurrent.futures.Future]]
+    delay: float = 0.0 # Segundos desde el inicio de la carrera (hedge); 0 = salida inmediata
+
+
+class RaceOutcome(NamedTuple):
+    results: Dict[str, Any]     # Por nombre, solo los que terminaron (None si fallaron)
+    winner: Optional[str]       # Extractor cuyo resultado completó los datos; None si ninguno lo logró
+    launched: List[str]
+    cancelled: List[str]
+    seconds: float
+
+
+def race_extractors(entrants: List[RaceEntrant], is_done: Callable[[Dict[str, Any]], bool],
+                    clock: Callable[[], float] = time.perf_counter) -> RaceOutcome:
+    start = clock()
+    waiting = sorted(entrants, key=lambda entrant: entrant.delay)
+    running: Dict[concurrent.futures.Future, str] = {}
+    results: Dict[str, Any] = {}
+    launched: List[str] = []
+    winner = None
+    while True:
+        elapsed = clock() - start
+        # Salen los que ya cumplieron su espera, y el siguiente sin esperar si no queda nadie en vuelo
+        while waiting and (waiting[0].delay <= elapsed or not running):
+            entrant = waiting.pop(0)
+            future = entrant.launch(dict(results))
+            if future is not None:
+                running[future] = entrant.name
+                launched.append(entrant.name)
+        if not running:
+            break
+        timeout = max(0.0, waiting[0].delay - elapsed) if waiting else None
+        done, _ = concurrent.futures.wait(running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                app_logger.error(f"Extractor de IA '{name}' falló en la carrera: {e}", exc_info=True)
+                results[name] = None
+            if winner is None and is_done(results):
+                winner = name
+        if winner is not None:
+            break
+
+    cancelled = []
+    for future, name in running.items():
+        future.cancel() # Cancela la tarea asyncio de la petición en el bucle de eventos de la IA
+        cancelled.append(name)
+    return RaceOutcome(results, winner, launched, cancelled, clock() - start)
@@ -0,0 +1,191 @@
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# Extractor de campos impresos en una sola pasada.
+# Un único patrón maestro recorre el texto una vez y emite todos los "tokens" que interesan a la vez:
+# números candidatos a documento, pistas de contexto de identificación, números de acta y edad.
+# Las pistas, actas y edad van dentro de lookaheads (ancho cero), así que no consumen texto y no se
+# ocultan entre sí; cada alternativa empieza por caracteres distintos, por lo que en una misma posición
+# solo una de ellas puede coincidir. Con eso el resultado es idéntico a la cascada de regex anterior
+# (ver benchmarks/bench_field_extractor.py, que la conserva y verifica la equivalencia).
+
+ALLOWED_ID_TYPES = ("CC", "TI", "CE", "PA", "RC")
+CONTEXT_RADIUS = 70  # Caracteres a cada lado del número en los que se busca contexto de identificación
+
+# Orden de prioridad de los patrones de acta (el primero que aparezca en el texto gana)
+_ACTA_PATTERNS = (
+    r"Acta\s*de\s*Entrega\s*No\.?\s*(?P<acta1>\d+)",
+    r"F[oó]rmula\s*M[eé]dica\s*Nro\.?\s*(?P<acta2>\d+)",
+    r"(?:ORDEN|AUTORIZACION)\s*N[°oº\.]*[:\s]*(?P<acta3>\d+)",
+    r"(?:Entrega\s*No|Nro|RECIBO)\.?\s*(?P<acta4>\d+)",
+)
+
+_MASTER_RE = re.compile(
+    r"(?P<num>\b\d{6,10}\b)"
+    # Pistas de contexto. La de "C.C." se captura sin su \b final: en una ventana recortada el fin de
+    # la ventana cuenta como límite de palabra, así que se evalúa aparte (ver _window_has_cue).
+    r"|(?=(?P<cue>Identificaci[oó]n|DOCUMENTO|No\.\s*Doc|IDENTIFICACION\s*No)|(?P<cue_cc>C[.\s]*C))"
+    r"|(?=" + "|".join(_ACTA_PATTERNS) + r")"
+    r"|(?=\b(?:Edad\s*[:\-]?\s*)?(?P<age>\d{1,3})\s*A[ÑN]OS\b)"
+    r"|(?=\b(?P<age_simple>\d{1,3})\b\s*A[ÑN]OS)",
+    re.IGNORECASE,
+)
+_WORD_CHAR_RE = re.compile(r"\w")
+_ID_TYPE_RE = re.compile(rf"\b({'|'.join(ALLOWED_ID_TYPES)})\b", re.IGNORECASE)
+
+
+class _Cue:
+    __slots__ = ("start", "end", "needs_edge")
+
+    def __init__(self, start: int, end: int, needs_edge: bool):
+        self.start = start
+        self.end = end
+        self.needs_edge = needs_edge  # "C.C" seguido de letra/dígito: solo vale si la ventana termina justo ahí
+
+
+def _window_has_cue(cue_starts: List[int], cues: List[_Cue], win_start: int, win_end: int) -> bool:
+    idx = bisect_left(cue_starts, win_start)
+    while idx < len(cues) and cues[idx].start < win_end:
+        cue = cues[idx]
+        if cue.end <= win_end and (not cue.needs_edge or cue.end == win_end):
+            return True
+        idx += 1
+    return False
+
+
+def scan_printed_fields(text: str) -> Dict[str, Optional[object]]:
+    """
+    Recorre `text` una sola vez y devuelve los campos crudos:
+    id_number (1er número de 6-10 dígitos con contexto de identificación a <= 70 caracteres),
+    id_type (1er tipo permitido en esa misma ventana), acta_no / acta_pattern (patrón de mayor
+    prioridad presente, base 1) y age (edad en años, si aparece).
+    """
+    result: Dict[str, Optional[object]] = {"id_number": None, "id_type": None, "acta_no": None, "acta_pattern": None, "age": None}
+    if not text:
+        return result
+
+    numbers: List[Tuple[int, int]] = []
+    cues: List[_Cue] = []
+    acta_hits: Dict[int, str] = {}
+    age: Optional[str] = None
+    age_simple: Optional[Tuple[int, str]] = None
+    text_len = len(text)
+
+    for m in _MASTER_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == "num":
+            numbers.append(m.span())
+        elif kind == "cue":
+            cues.append(_Cue(m.start(), m.end("cue"), False))
+        elif kind == "cue_cc":
+            end = m.end("cue_cc")
+            cues.append(_Cue(m.start(), end, end < text_len and _WORD_CHAR_RE.match(text, end) is not None))
+        elif kind == "age":
+            if age is None: age = m.group("age")
+        elif kind == "age_simple":
+            if age_simple is None: age_simple = (m.start(), m.group("age_simple"))
+        elif kind is not None and kind.startswith("acta"):
+            priority = int(kind[4:])
+            if priority not in acta_hits: acta_hits[priority] = m.group(kind)
+
+    # id_number: el primer número cuya ventana de contexto contiene alguna pista
+    cue_starts = [cue.start for cue in cues]
+    for num_start, num_end in numbers:
+        win_start, win_end = max(0, num_start - CONTEXT_RADIUS), min(text_len, num_end + CONTEXT_RADIUS)
+        if _window_has_cue(cue_starts, cues, win_start, win_end):
+            result["id_number"] = text[num_start:num_end]
+            type_match = _ID_TYPE_RE.search(text[win_start:win_end])  # Sobre el recorte: sus bordes cuentan como límite de palabra
+            if type_match: result["id_type"] = type_match.group(1).upper()
+            break
+
+    if acta_hits:
+        priority = min(acta_hits)
+        result["acta_no"], result["acta_pattern"] = acta_hits[priority], priority
+
+    if age is not None:
+        result["age"] = int(age)
+    elif age_simple is not None:
+        start, digits = age_simple
+        if "EDAD" in text[max(0, start - 30):start].upper():
+            result["age"] = int(digits)
+    return result
+
+
+def merge_printed_fields(merged: Optional[Dict[str, Optional[object]]], page_fields: Dict[str, Optional[object]]) -> Dict[str, Optional[object]]:
+    """
+    Suma los campos de una página más (scan_printed_fields de esa página) a los de las anteriores, con la
+    misma precedencia que un escaneo del texto concatenado: id_number/id_type y edad de la primera página
+    que los tenga; acta del patrón de mayor prioridad y, a igual prioridad, de la primera página.
+    """
+    if merged is None:
+        return dict(page_fields)
+    merged = dict(merged)
+    if not merged["id_number"] and page_fields["id_number"]:
+        merged["id_number"], merged["id_type"] = page_fields["id_number"], page_fields["id_type"]
+    if page_fields["acta_pattern"] is not None and (merged["acta_pattern"] is None or page_fields["acta_pattern"] < merged["acta_pattern"]):
+        merged["acta_no"], merged["acta_pattern"] = page_fields["acta_no"], page_fields["acta_pattern"]
+    if merged["age"] is None:
+        merged["age"] = page_fields["age"]
+    return merged
+
+
+def printed_fields_final(fields: Dict[str, Optional[object]]) -> bool:
+    """True si ninguna página posterior puede cambiar id_number ni acta_no (acta del patrón de máxima prioridad)."""
+    return bool(fields["id_number"]) and fields["acta_pattern"] == 1
+
+
+# --- Compactación del texto para la IA ---
+# Mismas palabras clave que usa el extractor (contexto de identificación, patrones de acta y edad), sin
+# exigir los dígitos: si el texto llega a la IA suele ser porque el OCR estropeó justo esos números.
+# Se añaden "Paciente"/"USUARIO"/"Solicitud de Medicamentos", que el prompt de la IA también menciona.
+_RELEVANCE_RE = re.compile(
+    r"Identificaci[oó]n|\bDOCUMENTO|\bNo\.\s*Doc|\bC\.?\s?C\b|\bPaciente|\bUSUARIO|\bEdad\b"
+    r"|Acta\s*de\s*Entrega|F[oó]rmula\s*M[eé]dica|\bORDEN\b|\bAUTORIZACION|\bEntrega\s*No|\bNro\b|\bRECIBO\b"
+    r"|Solicitud\s*De\s*Medicamentos",
+    re.IGNORECASE,
+)
+WINDOW_SEPARATOR = "\n[...]\n"
+
+
+def _snap_to_whitespace(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Ensancha [start, end) hasta el espacio más cercano (máx. 20 caracteres) para no partir palabras ni números."""
+    limit = max(0, start - 20)
+    while start > limit and not text[start - 1].isspace():
+        start -= 1
+    limit = min(len(text), end + 20)
+    while end < limit and not text[end].isspace():
+        end += 1
+    return start, end
+
+
+def relevant_text_windows(text: str, window_chars: int = 200, header_chars: int = 400) -> Tuple[str, int]:
+    """
+    Recorta `text` a las zonas donde están los campos: el encabezado (primeros `header_chars` caracteres)
+    y una ventana alrededor de cada palabra clave (la mitad de `window_chars` antes, `window_chars` después,
+    que es donde suelen ir los valores). Las ventanas solapadas se funden y se separan con "[...]".
+    Devuelve (texto, número de palabras clave encontradas); sin ninguna, devuelve el texto completo.
+    """
+    if not text:
+        return text, 0
+    text_len = len(text)
+    spans: List[Tuple[int, int]] = []
+    cue_count = 0
+    for m in _RELEVANCE_RE.finditer(text):
+        cue_count += 1
+        spans.append(_snap_to_whitespace(text, max(0, m.start() - window_chars // 2), min(text_len, m.end() + window_chars)))
+    if not cue_count:
+        return text, 0
+    if header_chars > 0:
+        spans.append(_snap_to_whitespace(text, 0, min(text_len, header_chars)))
+    spans.sort()
+    merged: List[List[int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + len(WINDOW_SEPARATOR): # Fundir también si el hueco es menor que el separador
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    pieces = [text[start:end].strip() for start, end in merged]
+    if merged[0][0] > 0: pieces.insert(0, "")
+    if merged[-1][1] < text_len: pieces.append("")
+    return WINDOW_SEPARATOR.join(pieces).strip(), cue_count
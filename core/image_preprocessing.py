@@ -0,0 +1,215 @@
+"""
+Preprocesamiento de la página completa antes del OCR, guiado por los ajustes PREPROCESSING_* (con
+perfiles por tipo de documento en PREPROCESSING_PROFILES): escala de grises -> reducción de ruido ->
+umbralización. La página entra como vista de solo lectura del buffer de PIL; el primer paso escribe en
+un único buffer uint8 nuevo y los siguientes trabajan in situ sobre él (sin copias intermedias). Cada
+paso registra su duración.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+from config import settings
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+NOISE_REDUCTION_METHODS = ("none", "gaussian", "median")
+THRESHOLD_METHODS = ("none", "global", "otsu", "adaptive_mean", "adaptive_gaussian")
+
+
+class PreprocessingProfile(NamedTuple):
+    """Parámetros de preprocesamiento; cada campo corresponde a PREPROCESSING_<CAMPO EN MAYÚSCULAS>."""
+    noise_reduction_method: str = "none"
+    noise_kernel_size: int = 3
+    threshold_method: str = "none"
+    global_threshold_value: int = 127
+    adaptive_block_size: int = 15
+    adaptive_c_value: int = 5
+    threshold_invert: bool = False
+
+    @classmethod
+    def from_settings(cls, doc_type: Optional[str] = None) -> "PreprocessingProfile":
+        """Perfil de los PREPROCESSING_* globales, con los valores de PREPROCESSING_PROFILES[doc_type] encima."""
+        values = {field: getattr(settings, f"PREPROCESSING_{field.upper()}", default) for field, default in cls._field_defaults.items()}
+        overrides = get_profile_overrides(doc_type)
+        unknown = set(overrides) - set(cls._fields)
+        if unknown:
+            raise ValueError(f"PREPROCESSING_PROFILES['{doc_type}'] tiene claves desconocidas: {sorted(unknown)}")
+        values.update(overrides)
+        return cls(**values).validated()
+
+    def validated(self) -> "PreprocessingProfile":
+        if self.noise_reduction_method not in NOISE_REDUCTION_METHODS:
+            raise ValueError(f"Método de reducción de ruido no válido: '{self.noise_reduction_method}' (opciones: {NOISE_REDUCTION_METHODS})")
+        if self.threshold_method not in THRESHOLD_METHODS:
+            raise ValueError(f"Método de umbralización no válido: '{self.threshold_method}' (opciones: {THRESHOLD_METHODS})")
+        if self.noise_reduction_method != "none" and (self.noise_kernel_size < 1 or self.noise_kernel_size % 2 == 0):
+            raise ValueError(f"El kernel de reducción de ruido debe ser impar y positivo (valor: {self.noise_kernel_size})")
+        if self.threshold_method.startswith("adaptive") and (self.adaptive_block_size < 3 or self.adaptive_block_size % 2 == 0):
+            raise ValueError(f"El bloque del umbral adaptativo debe ser impar y >= 3 (valor: {self.adaptive_block_size})")
+        return self
+
+    def describe(self) -> str:
+        parts = []
+        if self.noise_reduction_method != "none":
+            parts.append(f"{self.noise_reduction_method}(k={self.noise_kernel_size})")
+        if self.threshold_method == "global":
+            parts.append(f"global({self.global_threshold_value})")
+        elif self.threshold_method.startswith("adaptive"):
+            parts.append(f"{self.threshold_method}(bloque={self.adaptive_block_size}, C={self.adaptive_c_value})")
+        elif self.threshold_method != "none":
+            parts.append(self.threshold_method)
+        if self.threshold_method != "none" and self.threshold_invert:
+            parts.append("invertido")
+        return " -> ".join(["gris"] + parts)
+
+
+def get_profile_overrides(doc_type: Optional[str]) -> Dict[str, object]:
+    profiles = getattr(settings, 'PREPROCESSING_PROFILES', None) or {}
+    return dict(profiles.get(doc_type) or {}) if doc_type else {}
+
+
+def page_to_grayscale(page_img: Image.Image) -> np.ndarray:
+    """Página en grises como array uint8 de solo lectura (las imágenes de la caché de páginas son compartidas)."""
+    gray_img = page_img if page_img.mode == "L" else page_img.convert("L") # Conversión en C, sin pasar por un array RGB
+    return np.asarray(gray_img) # Una sola copia (la de PIL); np.array haría una segunda
+
+
+class ImagePreprocessor:
+    """
+    Cadena de pasos de un perfil. Cada paso es `paso(src, dst)` y las operaciones de OpenCV escriben en `dst`,
+    que a partir del segundo paso es el mismo buffer que `src` (in situ). Sin OpenCV solo se puede aplicar el
+    umbral global (con NumPy); los demás pasos se omiten con una advertencia al construir la cadena.
+    Thread-safe: las etapas del pipeline y el lote OCR pueden compartir la instancia.
+    """
+
+    def __init__(self, profile: PreprocessingProfile, cv2_module=None):
+        self.profile = profile
+        self._cv2 = cv2_module
+        self._steps: List[Tuple[str, Callable[[np.ndarray, np.ndarray], None]]] = self._build_steps()
+        self.step_seconds: Counter = Counter()
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    @property
+    def step_names(self) -> List[str]:
+        return ["gris"] + [name for name, _ in self._steps]
+
+    def _build_steps(self) -> List[Tuple[str, Callable[[np.ndarray, np.ndarray], None]]]:
+        profile, cv2 = self.profile, self._cv2
+        steps = []
+        if profile.noise_reduction_method != "none":
+            if cv2 is None:
+                app_logger.warning(f"Reducción de ruido '{profile.noise_reduction_method}' requiere OpenCV; se omite.")
+            else:
+                steps.append((profile.noise_reduction_method, self._denoise))
+        method = profile.threshold_method
+        if method == "global":
+            steps.append(("global", self._threshold_global if cv2 is not None else self._threshold_global_numpy))
+        elif method != "none":
+            if cv2 is None:
+                app_logger.warning(f"Umbralización '{method}' requiere OpenCV; se omite.")
+            else:
+                steps.append((method, self._threshold_otsu if method == "otsu" else self._threshold_adaptive))
+        return steps
+
+    # --- Pasos (src -> dst, uint8, 2D, contiguos; src y dst pueden ser el mismo buffer) ---
+
+    def _threshold_type(self) -> int:
+        return self._cv2.THRESH_BINARY_INV if self.profile.threshold_invert else self._cv2.THRESH_BINARY
+
+    def _denoise(self, src: np.ndarray, dst: np.ndarray):
+        k = self.profile.noise_kernel_size
+        if self.profile.noise_reduction_method == "gaussian":
+            self._cv2.GaussianBlur(src, (k, k), 0, dst=dst)
+        else:
+            self._cv2.medianBlur(src, k, dst=dst)
+
+    def _threshold_global(self, src: np.ndarray, dst: np.ndarray):
+        self._cv2.threshold(src, self.profile.global_threshold_value, 255, self._threshold_type(), dst=dst)
+
+    def _threshold_global_numpy(self, src: np.ndarray, dst: np.ndarray):
+        compare = np.less_equal if self.profile.threshold_invert else np.greater
+        mask = compare(src, self.profile.global_threshold_value) # Única temporal: 1 byte por píxel
+        np.multiply(mask, 255, out=dst, casting="unsafe")
+
+    def _threshold_otsu(self, src: np.ndarray, dst: np.ndarray):
+        self._cv2.threshold(src, 0, 255, self._threshold_type() | self._cv2.THRESH_OTSU, dst=dst)
+
+    def _threshold_adaptive(self, src: np.ndarray, dst: np.ndarray):
+        cv2 = self._cv2
+        adaptive = cv2.ADAPTIVE_THRESH_MEAN_C if self.profile.threshold_method == "adaptive_mean" else cv2.ADAPTIVE_THRESH_GAUSSIAN_C
+        cv2.adaptiveThreshold(src, 255, adaptive, self._threshold_type(), self.profile.adaptive_block_size, self.profile.adaptive_c_value, dst=dst)
+
+    # --- Ejecución ---
+
+    def apply(self, page: np.ndarray) -> np.ndarray:
+        """
+        Aplica los pasos del perfil a una página en grises (uint8) y devuelve el resultado. Si `page` es
+        escribible se modifica in situ; si es de solo lectura (vista de PIL), el primer paso escribe en un
+        buffer nuevo. Sin pasos, se devuelve `page` tal cual.
+        """
+        if page.ndim != 2 or page.dtype != np.uint8 or not page.flags.c_contiguous:
+            raise ValueError(f"Se esperaba una página uint8 en grises y contigua (shape={page.shape}, dtype={page.dtype})")
+        src, dst = page, page
+        if self._steps and not page.flags.writeable:
+            dst = np.empty_like(page)
+        timings = []
+        for name, step in self._steps:
+            start = time.perf_counter()
+            step(src, dst)
+            src = dst
+            timings.append((name, time.perf_counter() - start))
+        self._record(timings)
+        return src
+
+    def prepare_page(self, page_img: Image.Image) -> np.ndarray:
+        """Grises + pasos del perfil sobre una imagen PIL (la imagen no se modifica)."""
+        start = time.perf_counter()
+        page = page_to_grayscale(page_img)
+        self._record([("gris", time.perf_counter() - start)], count_page=False)
+        return self.apply(page)
+
+    def _record(self, timings: List[Tuple[str, float]], count_page: bool = True):
+        with self._lock:
+            for name, seconds in timings:
+                self.step_seconds[name] += seconds
+            if count_page:
+                self.pages += 1
+
+    def stats(self) -> str:
+        with self._lock:
+            if not self.pages:
+                return f"{self.profile.describe()}: sin páginas"
+            steps = " | ".join(f"{name} {self.step_seconds[name] / self.pages * 1000:.1f} ms" for name in self.step_names if name in self.step_seconds)
+            return f"{self.profile.describe()}: {self.pages} página(s), media por paso: {steps}"
+
+
+_preprocessors: Dict[Optional[str], ImagePreprocessor] = {}
+_preprocessors_lock = threading.Lock()
+
+
+def get_image_preprocessor(doc_type: Optional[str] = None, cv2_module=None) -> ImagePreprocessor:
+    """Preprocesador (compartido) del tipo de documento. Un perfil mal configurado se registra y cae a solo grises."""
+    key = doc_type if get_profile_overrides(doc_type) else None # Sin perfil propio, el tipo usa el perfil global
+    with _preprocessors_lock:
+        preprocessor = _preprocessors.get(key)
+        if preprocessor is None:
+            try:
+                profile = PreprocessingProfile.from_settings(key)
+            except ValueError as e:
+                app_logger.error(f"Perfil de preprocesamiento inválido ({key or 'global'}): {e}. Se usará solo escala de grises.")
+                profile = PreprocessingProfile()
+            preprocessor = ImagePreprocessor(profile, cv2_module)
+            app_logger.info(f"Preprocesamiento de página ({key or 'global'}): {profile.describe()}")
+            _preprocessors[key] = preprocessor
+        return preprocessor
+
+
+def preprocessing_stats() -> Dict[str, str]:
+    """Tiempos por paso de cada perfil usado en este proceso, para el log de fin de lote."""
+    with _preprocessors_lock:
+        return {key or "global": preprocessor.stats() for key, preprocessor in _preprocessors.items() if preprocessor.pages}
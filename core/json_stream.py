@@ -0,0 +1,50 @@
+"""
+Detección incremental de valores JSON en una respuesta de IA que llega por streaming: permite cortar el
+stream en cuanto el objeto (o array) con los datos está completo, sin esperar el resto de la respuesta.
+"""
+import json
+from typing import Any, Callable, List, Optional
+
+_CLOSERS = {"}": "{", "]": "["}
+
+
+class IncrementalJSONScanner:
+    """
+    Recibe el texto por trozos y devuelve, ya decodificado, cada valor JSON ({...} o [...]) en cuanto
+    llega el carácter que lo cierra. Cada llave o corchete de cierre se prueba contra las aperturas
+    anteriores del mismo tipo, de la más cercana a la más lejana, sin seguir el estado de comillas: una
+    llave o unas comillas sueltas en la prosa (p. ej. el razonamiento del modelo) no desincronizan nada.
+    Los valores anidados salen antes que el que los contiene. El coste está acotado por el tamaño de la
+    respuesta (max_tokens).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._openers: List[int] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        start_position = len(self.text)
+        self.text += chunk
+        values = []
+        for position in range(start_position, len(self.text)):
+            char = self.text[position]
+            if char in "{[":
+                self._openers.append(position)
+            elif char in _CLOSERS:
+                opener = _CLOSERS[char]
+                for start in reversed(self._openers):
+                    if self.text[start] != opener: continue
+                    try:
+                        values.append(json.loads(self.text[start:position + 1]))
+                        break # El valor más interno que cierra aquí; los externos se cierran más adelante
+                    except json.JSONDecodeError:
+                        continue
+        return values
+
+
+def first_matching_value(values: List[Any], predicate: Callable[[Any], bool]) -> Optional[Any]:
+    """Primer valor ya decodificado que cumple `predicate`."""
+    for value in values:
+        if predicate(value):
+            return value
+    return None
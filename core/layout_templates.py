@@ -0,0 +1,113 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Caja relativa a la página: (x_inicio, y_inicio, x_fin, y_fin) como fracciones de ancho/alto
+RelativeBox = Tuple[float, float, float, float]
+
+
+class FieldRegion:
+    """Región de la página que contiene uno o más campos. `handwritten` marca las regiones que van por HTR."""
+
+    def __init__(self, name: str, box: RelativeBox, allowlist: Optional[str] = None, handwritten: bool = False):
+        self.name = name
+        self.box = box
+        self.allowlist = allowlist
+        self.handwritten = handwritten
+
+    def pixel_box(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """Convierte la caja relativa a píxeles (x0, y0, x1, y1) para una página de width x height."""
+        x0, y0, x1, y1 = self.box
+        return int(width * x0), int(height * y0), int(width * x1), int(height * y1)
+
+    def crop(self, page_np: np.ndarray) -> np.ndarray:
+        """Vista (sin copia) de la región dentro de la página."""
+        x0, y0, x1, y1 = self.pixel_box(page_np.shape[1], page_np.shape[0])
+        return page_np[y0:y1, x0:x1]
+
+
+class LayoutTemplate:
+    """
+    Plantilla de un formato conocido: qué regiones de la 1ra página contienen los campos y cuáles son
+    imprescindibles para dar la extracción por buena sin recurrir al OCR de página completa.
+    """
+
+    def __init__(self, doc_type: str, description: str, regions: List[FieldRegion], required_fields: List[str]):
+        self.doc_type = doc_type
+        self.description = description
+        self.regions = regions
+        self.required_fields = required_fields
+
+    @property
+    def printed_regions(self) -> List[FieldRegion]:
+        return [r for r in self.regions if not r.handwritten]
+
+    def get_region(self, name: str) -> Optional[FieldRegion]:
+        for region in self.regions:
+            if region.name == name:
+                return region
+        return None
+
+
+LAYOUT_TEMPLATES: Dict[str, LayoutTemplate] = {}
+
+
+def register_template(template: LayoutTemplate):
+    LAYOUT_TEMPLATES[template.doc_type] = template
+
+
+def get_template(doc_type: Optional[str]) -> Optional[LayoutTemplate]:
+    return LAYOUT_TEMPLATES.get(doc_type) if doc_type else None
+
+
+# --- Formatos soportados (las claves coinciden con los valores de tipo de documento de la GUI) ---
+# La caja "acta_manuscrita" es la ROI de HTR que ya usaba la aplicación (18% superior, 30% derecho). Las
+# demás son estimaciones de la disposición típica de cada formato, sin calibrar contra un conjunto de actas:
+# por eso ENABLE_LAYOUT_TEMPLATES viene desactivado. Comprobarlas con documentos reales antes de activarlo.
+
+register_template(LayoutTemplate(
+    doc_type="pendiente_impreso",
+    description="Formato A: Acta Impresa (ej. SUPLY)",
+    regions=[
+        FieldRegion("acta", (0.45, 0.00, 1.00, 0.14)),      # "Acta de Entrega No." / "Fórmula Médica Nro." en la cabecera
+        FieldRegion("paciente", (0.00, 0.10, 1.00, 0.34)),  # Bloque del paciente: "Identificación", documento, edad
+    ],
+    required_fields=["id_number", "acta_no"],
+))
+
+register_template(LayoutTemplate(
+    doc_type="entregado_manuscrito",
+    description="Formato B: Acta Manuscrita (ej. E.S.E.)",
+    regions=[
+        FieldRegion("acta_manuscrita", (0.70, 0.00, 1.00, 0.18), allowlist='0123456789', handwritten=True),
+        FieldRegion("paciente", (0.00, 0.12, 1.00, 0.36)),
+    ],
+    required_fields=["id_number"],  # El acta la aporta el HTR de "acta_manuscrita"
+))
+
+
+def find_text_line_boxes(gray_np: np.ndarray, min_line_height: int = 8, padding: int = 3) -> List[List[int]]:
+    """
+    Segmentación barata de líneas por perfil de proyección horizontal. Devuelve cajas en el formato
+    `horizontal_list` de EasyOCR ([x_min, x_max, y_min, y_max]) para usar el reconocedor sin el detector.
+    """
+    if gray_np.size == 0:
+        return []
+    ink = gray_np < (gray_np.mean() - 0.5 * gray_np.std())  # Píxeles de tinta: claramente más oscuros que el fondo
+    row_ink = ink.sum(axis=1)
+    text_rows = row_ink > max(2, int(0.01 * gray_np.shape[1]))
+    boxes = []
+    height, width = gray_np.shape[:2]
+    y = 0
+    while y < height:
+        if not text_rows[y]:
+            y += 1
+            continue
+        y_start = y
+        while y < height and text_rows[y]:
+            y += 1
+        if y - y_start >= min_line_height:
+            cols = np.flatnonzero(ink[y_start:y].any(axis=0))
+            if cols.size:
+                boxes.append([max(0, int(cols[0]) - padding), min(width, int(cols[-1]) + padding + 1),
+                              max(0, y_start - padding), min(height, y + padding)])
+    return boxes
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import threading
+from typing import Optional, Tuple
+
+from config import settings
+from core.sqlite_cache import SQLiteCache
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+# Subir este número si cambia la forma en que extract_text_from_pdf produce el texto
+OCR_CACHE_SCHEMA_VERSION = 1
+
+# Parámetros de render usados por extract_text_from_pdf (forman parte de la clave de caché)
+OCR_RENDER_DPI = 200
+
+
+def compute_file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def ocr_settings_fingerprint() -> str:
+    """Huella de todas las configuraciones que afectan al texto OCR: si cambian, la entrada en caché no aplica."""
+    relevant = {
+        "schema": OCR_CACHE_SCHEMA_VERSION,
+        "dpi": OCR_RENDER_DPI,
+        "OCR_DPI_LADDER": list(getattr(settings, 'OCR_DPI_LADDER', None) or [OCR_RENDER_DPI]),
+        "OCR_LANGUAGES": list(getattr(settings, 'OCR_LANGUAGES', ['es'])),
+        "ENABLE_IMAGE_PREPROCESSING": getattr(settings, 'ENABLE_IMAGE_PREPROCESSING', False),
+        "TEXT_PROBE_MAX_PAGES": getattr(settings, 'TEXT_PROBE_MAX_PAGES', 1),
+        "ENABLE_LAYOUT_TEMPLATES": getattr(settings, 'ENABLE_LAYOUT_TEMPLATES', False),
+        "ENABLE_REGION_RENDERING": getattr(settings, 'ENABLE_REGION_RENDERING', True),
+        "TEXT_LAYER_BACKEND": getattr(settings, 'TEXT_LAYER_BACKEND', 'pypdf2'),
+        "PDFTOTEXT_LAYOUT": getattr(settings, 'PDFTOTEXT_LAYOUT', False),
+        "PAGE_RENDER_GRAYSCALE": getattr(settings, 'PAGE_RENDER_GRAYSCALE', False),
+        "ENABLE_ORIENTATION_CORRECTION": getattr(settings, 'ENABLE_ORIENTATION_CORRECTION', False),
+        "ORIENTATION_ANALYSIS_MAX_SIDE": getattr(settings, 'ORIENTATION_ANALYSIS_MAX_SIDE', 1000),
+        "DESKEW_MAX_ANGLE": getattr(settings, 'DESKEW_MAX_ANGLE', 5.0),
+        "DESKEW_MIN_ANGLE": getattr(settings, 'DESKEW_MIN_ANGLE', 0.3),
+    }
+    for name in sorted(dir(settings)):
+        if name.startswith("PREPROCESSING_"):
+            relevant[name] = getattr(settings, name)
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class OCRResultCache(SQLiteCache):
+    """Caché persistente de resultados de extract_text_from_pdf, direccionada por contenido (SHA-256 del PDF)."""
+
+    def __init__(self, db_path: str, max_bytes: int):
+        super().__init__(db_path, table="ocr_results", max_bytes=max_bytes)
+
+    def make_key(self, pdf_path: str, variant: str = "") -> str:
+        """`variant` distingue extracciones del mismo PDF que dependen del contexto (p. ej. plantilla por tipo de documento)."""
+        return f"{compute_file_sha256(pdf_path)}:{ocr_settings_fingerprint()}:{variant}"
+
+    def get_result(self, key: str) -> Optional[Tuple[str, str]]:
+        value = self.get(key)
+        if value is None:
+            return None
+        return value["text"], value["method"]
+
+    def put_result(self, key: str, text: str, method: str):
+        self.set(key, {"text": text, "method": method})
+
+
+_ocr_cache_instance: Optional[OCRResultCache] = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRResultCache]:
+    """Retorna la caché OCR compartida, o None si está deshabilitada (OCR_CACHE_ENABLED / --no-ocr-cache)."""
+    global _ocr_cache_instance
+    if not getattr(settings, 'OCR_CACHE_ENABLED', False):
+        return None
+    with _ocr_cache_lock:
+        if _ocr_cache_instance is None:
+            try:
+                _ocr_cache_instance = OCRResultCache(
+                    getattr(settings, 'OCR_CACHE_PATH', "ocrename_ocr_cache.sqlite3"),
+                    max_bytes=int(getattr(settings, 'OCR_CACHE_MAX_MB', 200)) * 1024 * 1024,
+                )
+            except Exception as e:
+                app_logger.error(f"No se pudo abrir la caché OCR; se continúa sin caché: {e}", exc_info=True)
+                settings.OCR_CACHE_ENABLED = False
+                return None
+        return _ocr_cache_instance
+
+
+def purge_ocr_cache():
+    """Vacía la caché OCR en disco aunque esté deshabilitada en settings."""
+    cache = get_ocr_cache() or OCRResultCache(
+        getattr(settings, 'OCR_CACHE_PATH', "ocrename_ocr_cache.sqlite3"),
+        max_bytes=int(getattr(settings, 'OCR_CACHE_MAX_MB', 200)) * 1024 * 1024,
+    )
+    cache.purge()
@@ -0,0 +1,278 @@
+"""
+Servicio OCR local de larga duración: mantiene un easyocr.Reader cargado (y caliente) y atiende peticiones
+por un socket de dominio Unix, para que cada arranque de la app no vuelva a cargar los pesos del detector y
+del reconocedor, y para que varias instancias compartan una sola copia del modelo en memoria.
+
+Arranque (desde la raíz del proyecto):
+    python -m core.ocr_daemon [--socket RUTA]
+
+PDFProcessor usa el servicio automáticamente si está en marcha (OCR_USE_DAEMON) y, si no, carga EasyOCR
+en el propio proceso.
+"""
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from config import settings
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+PROTOCOL_VERSION = 1
+_FRAME_HEADER = struct.Struct("!II")  # (bytes de la cabecera JSON, bytes del payload binario)
+_SUPPORTED_OPS = ("ping", "readtext", "recognize", "readtext_batched")
+
+
+def daemon_available() -> bool:
+    return hasattr(socket, "AF_UNIX")  # No disponible en Windows: allí siempre se usa el modo en proceso
+
+
+def get_daemon_socket_path() -> str:
+    configured = getattr(settings, 'OCR_DAEMON_SOCKET_PATH', None)
+    if configured:
+        return configured
+    user_id = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.path.join(tempfile.gettempdir(), f"ocrename-ocr-{user_id}.sock")
+
+
+# --- Protocolo: cabecera JSON + arrays NumPy crudos, sin pickle (el socket no debe ejecutar código) ---
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Conexión cerrada por el otro extremo.")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def _send_message(sock: socket.socket, header: Dict[str, Any], arrays: Tuple[np.ndarray, ...] = ()):
+    arrays = [np.ascontiguousarray(arr) for arr in arrays]
+    header = dict(header, arrays=[{"shape": list(arr.shape), "dtype": arr.dtype.str} for arr in arrays])
+    header_bytes = json.dumps(header).encode("utf-8")
+    payload_size = sum(arr.nbytes for arr in arrays)
+    sock.sendall(_FRAME_HEADER.pack(len(header_bytes), payload_size) + header_bytes)
+    for arr in arrays:
+        sock.sendall(memoryview(arr).cast("B"))
+
+
+def _recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], List[np.ndarray]]:
+    header_size, payload_size = _FRAME_HEADER.unpack(_recv_exact(sock, _FRAME_HEADER.size))
+    header = json.loads(_recv_exact(sock, header_size).decode("utf-8"))
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    arrays, offset = [], 0
+    for spec in header.pop("arrays", []):
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays.append(np.frombuffer(payload, dtype=dtype, count=count, offset=offset).reshape(spec["shape"]))
+        offset += count * dtype.itemsize
+    return header, arrays
+
+
+def _to_jsonable(value: Any) -> Any:
+    # Los resultados con detail=1 traen cajas np.int32 y confianzas np.float64
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(v) for v in value]
+    return value
+
+
+# --- Servidor ---
+
+class _OCRRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server: "OCRDaemonServer" = self.server
+        while True:
+            try:
+                header, arrays = _recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            op = header.get("op")
+            try:
+                if op not in _SUPPORTED_OPS:
+                    raise ValueError(f"Operación no soportada: {op}")
+                result = server.execute(op, arrays, header.get("kwargs") or {})
+                _send_message(self.request, {"ok": True, "result": _to_jsonable(result)})
+            except Exception as e:
+                app_logger.error(f"Servicio OCR: error en '{op}': {e}", exc_info=True)
+                try:
+                    _send_message(self.request, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+                except OSError:
+                    return
+
+
+class OCRDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Un hilo por cliente; la inferencia se serializa con un lock (un solo Reader compartido)."""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, reader):
+        self.reader = reader
+        self.socket_path = socket_path
+        self.requests_served = 0
+        self._inference_lock = threading.Lock()
+        super().__init__(socket_path, _OCRRequestHandler)
+        os.chmod(socket_path, 0o600)  # Solo el usuario que lanzó el servicio puede usarlo
+
+    def execute(self, op: str, arrays: List[np.ndarray], kwargs: Dict[str, Any]) -> Any:
+        if op == "ping":
+            return {"protocol": PROTOCOL_VERSION, "pid": os.getpid(), "languages": getattr(settings, 'OCR_LANGUAGES', ['es'])}
+        with self._inference_lock:
+            self.requests_served += 1
+            if op == "readtext_batched":
+                return self.reader.readtext_batched(arrays, **kwargs)
+            return getattr(self.reader, op)(arrays[0], **kwargs)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+# --- Cliente ---
+
+class RemoteOCRReader:
+    """
+    Sustituto de easyocr.Reader para PDFProcessor: expone readtext, recognize y readtext_batched con la misma
+    firma y los delega al servicio. Una conexión persistente por instancia, protegida por un lock.
+    """
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _call(self, op: str, arrays: Tuple[np.ndarray, ...] = (), **kwargs) -> Any:
+        with self._lock:
+            for attempt in range(2):  # Un reintento con conexión nueva si el servicio se reinició
+                sent = False
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    _send_message(self._sock, {"op": op, "kwargs": kwargs}, arrays)
+                    sent = True
+                    header, _ = _recv_message(self._sock)
+                    break
+                except (ConnectionRefusedError, BrokenPipeError, ConnectionResetError):
+                    # Solo se reintenta si la petición no llegó a enviarse (conexión caída o servicio reiniciándose);
+                    # reenviarla tras un corte en la respuesta duplicaría una inferencia que puede estar en curso.
+                    self.close_connection()
+                    if attempt or sent:
+                        raise
+                except OSError:
+                    # socket.timeout incluido: la petición puede seguir ejecutándose, no se reenvía
+                    self.close_connection()
+                    raise
+        if not header.get("ok"):
+            raise RuntimeError(f"Servicio OCR: {header.get('error')}")
+        return header.get("result")
+
+    def ping(self) -> Dict[str, Any]:
+        return self._call("ping")
+
+    def readtext(self, image: np.ndarray, **kwargs) -> list:
+        return self._call("readtext", (np.asarray(image),), **kwargs)
+
+    def recognize(self, image: np.ndarray, **kwargs) -> list:
+        return self._call("recognize", (np.asarray(image),), **kwargs)
+
+    def readtext_batched(self, images: List[np.ndarray], **kwargs) -> list:
+        return self._call("readtext_batched", tuple(np.asarray(img) for img in images), **kwargs)
+
+    def close_connection(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def connect_ocr_daemon(socket_path: Optional[str] = None) -> Optional[RemoteOCRReader]:
+    """Cliente conectado al servicio OCR si está en marcha y es compatible; None en caso contrario."""
+    if not daemon_available():
+        return None
+    socket_path = socket_path or get_daemon_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    client = RemoteOCRReader(socket_path, timeout=getattr(settings, 'OCR_DAEMON_TIMEOUT_SECONDS', 120))
+    try:
+        info = client.ping()
+    except Exception as e:
+        app_logger.info(f"Servicio OCR en '{socket_path}' no responde ({e}). Se usará EasyOCR en proceso.")
+        client.close_connection()
+        return None
+    if info.get("protocol") != PROTOCOL_VERSION or info.get("languages") != getattr(settings, 'OCR_LANGUAGES', ['es']):
+        app_logger.warning(f"Servicio OCR incompatible ({info}). Se usará EasyOCR en proceso.")
+        client.close_connection()
+        return None
+    app_logger.info(f"Conectado al servicio OCR local (pid {info.get('pid')}, socket '{socket_path}').")
+    return client
+
+
+def _remove_stale_socket(socket_path: str) -> bool:
+    """Elimina el socket de un servicio que ya no existe. False si hay otro servicio activo en esa ruta."""
+    if not os.path.exists(socket_path):
+        return True
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+        return False
+    except OSError:
+        os.unlink(socket_path)
+        return True
+    finally:
+        probe.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=None, help="Ruta del socket (por defecto OCR_DAEMON_SOCKET_PATH o el directorio temporal).")
+    args = parser.parse_args()
+
+    if not daemon_available():
+        raise SystemExit("Los sockets de dominio Unix no están disponibles en esta plataforma.")
+    socket_path = args.socket or get_daemon_socket_path()
+    if not _remove_stale_socket(socket_path):
+        raise SystemExit(f"Ya hay un servicio OCR escuchando en '{socket_path}'.")
+
+    from core.pdf_processor import PDFProcessor
+    start_time = time.time()
+    processor = PDFProcessor(use_daemon=False)
+    if not processor.reader:
+        raise SystemExit("No se pudo inicializar EasyOCR. Revise el log.")
+    processor.warm_up()
+    server = OCRDaemonServer(socket_path, processor.reader)
+    app_logger.info(f"Servicio OCR listo en '{socket_path}' (pid {os.getpid()}, modelos cargados en {time.time() - start_time:.1f}s).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        app_logger.info(f"Servicio OCR detenido tras {server.requests_served} peticiones.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional, Tuple, List, Iterator
+
+from config import settings
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+# Estado por proceso trabajador: cada worker carga su propio easyocr.Reader una sola vez
+_worker_processor = None
+
+
+def _init_worker(torch_threads: int):
+    global _worker_processor
+    # Limitar hilos antes de importar torch para que N workers no se disputen todos los núcleos
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    from core.pdf_processor import PDFProcessor
+    # Cada worker con su propio EasyOCR: el servicio OCR local serializa la inferencia y el pool quedaría en un OCR a la vez
+    _worker_processor = PDFProcessor(use_daemon=False)
+    if getattr(settings, 'OCR_WARMUP_ENABLED', True): _worker_processor.warm_up()
+    app_logger.info(f"Worker OCR (pid {os.getpid()}) listo con {torch_threads} hilo(s) de torch.")
+
+
+def _worker_extract_text(pdf_path: str, doc_type: Optional[str] = None) -> Tuple[Optional[str], str]:
+    if _worker_processor is None or not _worker_processor.reader:
+        return None, "fallido_ocr_no_init"
+    try:
+        return _worker_processor.extract_text_from_pdf(pdf_path, doc_type=doc_type)
+    finally:
+        _worker_processor.forget_document(pdf_path) # El documento no vuelve a este worker
+
+
+def resolve_worker_settings() -> Tuple[int, int]:
+    """Devuelve (workers, hilos_torch_por_worker) a partir de settings, con valores automáticos si son None."""
+    cpu_count = os.cpu_count() or 1
+    num_workers = getattr(settings, 'OCR_WORKERS', 1) or cpu_count
+    torch_threads = getattr(settings, 'OCR_TORCH_THREADS_PER_WORKER', None) or max(1, cpu_count // num_workers)
+    return max(1, int(num_workers)), max(1, int(torch_threads))
+
+
+class OCRWorkerPool:
+    """
+    Pool de procesos para extract_text_from_pdf. Cada proceso inicializa su propio lector EasyOCR
+    (el modelo no se comparte entre procesos) y los resultados se recogen en el orden de envío.
+    """
+
+    def __init__(self, num_workers: int, torch_threads: int):
+        self.num_workers = num_workers
+        self.torch_threads = torch_threads
+        # "spawn" evita heredar el estado de Tk/torch del proceso principal (y es lo único disponible en Windows)
+        ctx = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=ctx,
+            initializer=_init_worker, initargs=(torch_threads,),
+        )
+        app_logger.info(f"Pool OCR iniciado: {num_workers} workers x {torch_threads} hilo(s) de torch.")
+
+    def submit(self, pdf_path: str, doc_type: Optional[str] = None) -> "Future[Tuple[Optional[str], str]]":
+        return self._executor.submit(_worker_extract_text, pdf_path, doc_type)
+
+    def extract_texts(self, pdf_paths: List[str], doc_type: Optional[str] = None) -> Iterator[Tuple[Optional[str], str]]:
+        """Despacha todos los PDFs y devuelve sus resultados en el mismo orden de entrada."""
+        return self._executor.map(_worker_extract_text, pdf_paths, [doc_type] * len(pdf_paths))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        app_logger.info("Pool OCR detenido.")
@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+from PIL import Image
+
+from config import settings
+from utils.logger import get_app_logger
+from utils.startup_timer import startup_timer
+app_logger = get_app_logger()
+
+CacheKey = Tuple[str, float, int, int]  # (ruta absoluta, mtime, página, dpi)
+
+
+def render_page(pdf_path: str, page: int = 1, dpi: int = 200, grayscale: bool = False) -> Image.Image:
+    """Render directo con Poppler, sin caché (p. ej. la página en color para la IA de visión cuando la caché guarda grises)."""
+    poppler_path = getattr(settings, 'POPPLER_PATH', None)
+    convert_from_path = startup_timer.import_module("pdf2image").convert_from_path # Importación diferida (arranque rápido)
+    images = convert_from_path(pdf_path, poppler_path=poppler_path, first_page=page, last_page=page, dpi=dpi,
+                               grayscale=grayscale) # pdftoppm -gray: 1 byte por píxel en vez de 3
+    if not images:
+        raise ValueError(f"Poppler no devolvió imágenes para '{pdf_path}' pág {page}.")
+    return images[0]
+
+
+class PageImageCache:
+    """
+    Caché LRU, acotada en memoria, de páginas rasterizadas con Poppler.
+    La clave es (ruta, mtime, página, dpi); si se pide un DPI menor que uno ya renderizado,
+    se sirve reescalando la imagen en memoria en vez de volver a invocar a Poppler. Si no hay ninguno,
+    se renderiza a max(dpi, min_render_dpi) para que los demás consumidores lo reutilicen, salvo con
+    `exact_render` (peldaños bajos de OCR_DPI_LADDER), que renderiza justo al DPI pedido.
+    Las imágenes devueltas son compartidas: los consumidores no deben modificarlas in situ.
+    """
+
+    def __init__(self, max_bytes: int, min_render_dpi: int = 0, grayscale: bool = False):
+        self.max_bytes = max_bytes
+        self.min_render_dpi = min_render_dpi
+        self.grayscale = grayscale
+        self._entries: "OrderedDict[CacheKey, Image.Image]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.downscale_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _image_bytes(img: Image.Image) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    def _store(self, key: CacheKey, img: Image.Image):
+        # Debe llamarse con el lock adquirido
+        if key in self._entries:
+            self._current_bytes -= self._image_bytes(self._entries.pop(key))
+        self._entries[key] = img
+        self._current_bytes += self._image_bytes(img)
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= self._image_bytes(evicted)
+
+    def _find_higher_dpi(self, path: str, mtime: float, page: int, dpi: int) -> Optional[Tuple[int, Image.Image]]:
+        # Debe llamarse con el lock adquirido. Devuelve el render más pequeño con DPI mayor al pedido.
+        best = None
+        for (e_path, e_mtime, e_page, e_dpi), img in self._entries.items():
+            if e_path == path and e_mtime == mtime and e_page == page and e_dpi > dpi:
+                if best is None or e_dpi < best[0]:
+                    best = (e_dpi, img)
+        return best
+
+    def peek(self, pdf_path: str, page: int = 1, min_dpi: int = 0) -> Optional[Tuple[int, Image.Image]]:
+        """(dpi, imagen) del render en caché con DPI >= min_dpi (el menor que cumpla), sin invocar a Poppler."""
+        path = os.path.abspath(pdf_path)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            exact = self._entries.get((path, mtime, page, min_dpi))
+            if exact is not None:
+                return min_dpi, exact
+            return self._find_higher_dpi(path, mtime, page, min_dpi)
+
+    def get_page(self, pdf_path: str, page: int = 1, dpi: int = 200, exact_render: bool = False) -> Image.Image:
+        """Devuelve la página `page` (base 1) de `pdf_path` a `dpi`. Lanza la excepción de Poppler si falla el render."""
+        path = os.path.abspath(pdf_path)
+        mtime = os.path.getmtime(path)
+        key = (path, mtime, page, dpi)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            higher = self._find_higher_dpi(path, mtime, page, dpi)
+        if higher is not None:
+            src_dpi, src_img = higher
+            scaled = self._downscale(src_img, src_dpi, dpi)
+            with self._lock:
+                self.downscale_hits += 1
+                self._store(key, scaled)
+            app_logger.debug(f"Caché de páginas: '{os.path.basename(path)}' pág {page} a {dpi} dpi servida desde render a {src_dpi} dpi.")
+            return scaled
+
+        render_dpi = dpi if exact_render else max(dpi, self.min_render_dpi)
+        rendered = render_page(path, page, render_dpi, self.grayscale)
+        with self._lock:
+            self.misses += 1
+            self._store((path, mtime, page, render_dpi), rendered)
+        if render_dpi == dpi:
+            return rendered
+        scaled = self._downscale(rendered, render_dpi, dpi)
+        with self._lock:
+            self._store(key, scaled)
+        return scaled
+
+    @staticmethod
+    def _downscale(img: Image.Image, src_dpi: int, dst_dpi: int) -> Image.Image:
+        ratio = dst_dpi / src_dpi
+        new_size = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+        return img.resize(new_size, Image.Resampling.LANCZOS)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "downscale_hits": self.downscale_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._current_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current_bytes = 0
+
+
+page_image_cache = PageImageCache(
+    max_bytes=int(getattr(settings, 'PAGE_CACHE_MAX_MB', 256)) * 1024 * 1024,
+    min_render_dpi=getattr(settings, 'PAGE_CACHE_MIN_RENDER_DPI', 200),
+    grayscale=getattr(settings, 'PAGE_RENDER_GRAYSCALE', True),
+)
+
+# Vista previa de la GUI en color: con PAGE_RENDER_GRAYSCALE la caché compartida solo guarda grises
+preview_image_cache = PageImageCache(
+    max_bytes=int(getattr(settings, 'PREVIEW_CACHE_MAX_MB', 32)) * 1024 * 1024,
+    grayscale=False,
+)
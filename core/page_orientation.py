@@ -0,0 +1,140 @@
+"""
+Detección barata de orientación (0/90/180/270°) e inclinación de una página escaneada, sobre una copia
+reducida y binarizada de la página, con perfiles de proyección:
+- 90/270°: las líneas de texto dan un perfil por filas (ya enderezado) mucho más "dentado" que por
+  columnas; si ocurre al revés, el texto está en vertical.
+- Inclinación: el ángulo que maximiza la nitidez del perfil de filas de los píxeles de tinta proyectados
+  (se prueban ángulos sin rotar la imagen: solo se transforman las coordenadas de la tinta).
+- 180°: en texto latino la tinta por encima de la banda central de cada línea (mayúsculas, dígitos,
+  ascendentes) supera a la de debajo (descendentes); al revés, la proporción se invierte. Esta prueba se
+  hace con más resolución (_UPSIDE_DOWN_MAX_SIDE): en la copia reducida, los ascendentes y descendentes
+  del texto pequeño ocupan uno o dos píxeles y no se distinguen de la banda central.
+"""
+import time
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+_MIN_INK_FRACTION = 0.002      # Menos tinta que esto: página en blanco, no se analiza
+_MAX_INK_SAMPLES = 40000        # Píxeles de tinta usados para estimar la inclinación
+_VERTICAL_TEXT_RATIO = 1.5      # Nitidez por columnas / por filas a partir de la cual el texto está en vertical
+_UPSIDE_DOWN_RATIO = 1.25       # Tinta bajo la banda central / sobre ella a partir de la cual la página está invertida
+_LINE_CORE_FRACTION = 0.3      # Filas de una línea con al menos esta fracción de su máximo: banda central (altura x)
+_UPSIDE_DOWN_MAX_SIDE = 2400    # Lado mayor (px) de la máscara usada para la prueba de 180°
+_MAX_UPSIDE_DOWN_SAMPLES = 400000 # Píxeles de tinta proyectados para el perfil de filas de esa prueba
+
+_TRANSPOSE = {90: Image.ROTATE_90, 180: Image.ROTATE_180, 270: Image.ROTATE_270}
+
+
+class PageOrientation(NamedTuple):
+    """Corrección a aplicar: `rotation` grados antihorarios (múltiplo de 90) y luego `skew` grados antihorarios."""
+    rotation: int = 0
+    skew: float = 0.0
+    seconds: float = 0.0
+
+    def is_identity(self, min_skew: float) -> bool:
+        return self.rotation == 0 and abs(self.skew) < min_skew
+
+
+def _ink_mask(page_img: Image.Image, max_side: int) -> np.ndarray:
+    """Máscara booleana de tinta de la página reducida (caja de promedio de Pillow) con umbral de Otsu."""
+    gray = page_img if page_img.mode == "L" else page_img.convert("L")
+    factor = max(1, -(-max(gray.size) // max_side))
+    small = np.asarray(gray.reduce(factor) if factor > 1 else gray)
+    hist = np.bincount(small.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (cum_mean[-1] - cum_mean) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    if np.isnan(between).all():
+        return np.zeros(small.shape, dtype=bool) # Un solo nivel de gris (página en blanco): sin tinta
+    threshold = int(np.nanargmax(between))
+    return small <= threshold
+
+
+def _profile_sharpness(profile: np.ndarray) -> float:
+    diffs = np.diff(profile.astype(np.float64))
+    return float(np.dot(diffs, diffs))
+
+
+def _row_profile(ys: np.ndarray, xs: np.ndarray, angle: float) -> np.ndarray:
+    """Perfil de filas de los píxeles de tinta tras enderezar `angle` grados."""
+    rad = np.deg2rad(angle)
+    rows = ys * np.cos(rad) - xs * np.sin(rad)
+    return np.bincount((rows - rows.min()).astype(np.intp))
+
+
+def _ink_points(mask: np.ndarray, max_samples: int) -> Tuple[np.ndarray, np.ndarray]:
+    ys, xs = np.nonzero(mask)
+    step = max(1, ys.size // max_samples)
+    return ys[::step].astype(np.float64), xs[::step].astype(np.float64)
+
+
+def _estimate_skew(ys: np.ndarray, xs: np.ndarray, max_skew: float) -> Tuple[float, float]:
+    """(ángulo de las líneas en grados, nitidez del perfil de filas a ese ángulo), por búsqueda gruesa y luego fina."""
+    def best_of(angles: np.ndarray) -> Tuple[float, float]:
+        return max(((float(angle), _profile_sharpness(_row_profile(ys, xs, angle))) for angle in angles), key=lambda item: item[1])
+
+    coarse, _ = best_of(np.arange(-max_skew, max_skew + 1e-9, 0.5))
+    return best_of(np.arange(coarse - 0.5, coarse + 0.5 + 1e-9, 0.1))
+
+
+def _is_upside_down(row_profile: np.ndarray) -> bool:
+    """Compara la tinta por encima y por debajo de la banda central de cada línea de texto."""
+    if row_profile.size == 0 or row_profile.max() == 0:
+        return False
+    in_line = row_profile > 0.05 * row_profile.max()
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], in_line.astype(np.int8), [0]))))
+    above = below = 0.0
+    for start, end in zip(edges[::2], edges[1::2]):
+        line = row_profile[start:end]
+        if line.size < 3:
+            continue
+        core = np.flatnonzero(line >= _LINE_CORE_FRACTION * line.max())
+        above += line[:core[0]].sum()
+        below += line[core[-1] + 1:].sum()
+    return below > above * _UPSIDE_DOWN_RATIO
+
+
+def detect_orientation(page_img: Image.Image, max_side: int = 1000, max_skew: float = 5.0) -> PageOrientation:
+    """Orientación e inclinación de la página; identidad si la página está (casi) en blanco."""
+    start = time.perf_counter()
+    mask = _ink_mask(page_img, max_side)
+    if mask.mean() < _MIN_INK_FRACTION:
+        return PageOrientation(seconds=time.perf_counter() - start)
+    rotation = 0
+    # Se compara la nitidez ya enderezada en ambos sentidos: con la página inclinada, el perfil de filas se
+    # emborrona y el de columnas (huecos entre palabras) podría parecer el de las líneas de texto
+    skew, sharpness = _estimate_skew(*_ink_points(mask, _MAX_INK_SAMPLES), max_skew)
+    turned_skew, turned_sharpness = _estimate_skew(*_ink_points(np.rot90(mask), _MAX_INK_SAMPLES), max_skew)
+    if turned_sharpness > sharpness * _VERTICAL_TEXT_RATIO:
+        rotation, skew = 90, turned_skew  # Vista: el texto vertical queda horizontal (o invertido, lo decide la prueba de 180°)
+    detail_mask = _ink_mask(page_img, max(max_side, _UPSIDE_DOWN_MAX_SIDE))
+    if rotation: detail_mask = np.rot90(detail_mask)
+    detail_ys, detail_xs = _ink_points(detail_mask, _MAX_UPSIDE_DOWN_SAMPLES)
+    # A más resolución, un error de una décima de grado ya desplaza las líneas largas más que la altura de un ascendente
+    fine_profiles = [_row_profile(detail_ys, detail_xs, angle) for angle in np.arange(skew - 0.3, skew + 0.3 + 1e-9, 0.03)]
+    if _is_upside_down(max(fine_profiles, key=_profile_sharpness)):
+        rotation = (rotation + 180) % 360  # La pendiente de las líneas no cambia al girar 180°
+    return PageOrientation(rotation, skew, time.perf_counter() - start)
+
+
+def correct_page(page_img: Image.Image, orientation: PageOrientation, min_skew: float = 0.3) -> Image.Image:
+    """Nueva imagen enderezada (la original, p. ej. de la caché de páginas, no se modifica)."""
+    corrected = page_img
+    if orientation.rotation:
+        corrected = corrected.transpose(_TRANSPOSE[orientation.rotation])
+    if abs(orientation.skew) >= min_skew:
+        fill = 255 if corrected.mode == "L" else (255,) * len(corrected.getbands())
+        corrected = corrected.rotate(orientation.skew, resample=Image.BILINEAR, expand=True, fillcolor=fill)
+    return corrected
+
+
+def describe(orientation: Optional[PageOrientation]) -> str:
+    if orientation is None:
+        return "sin analizar"
+    return f"rotación {orientation.rotation}°, inclinación {orientation.skew:+.1f}° ({orientation.seconds*1000:.0f} ms)"
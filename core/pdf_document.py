@@ -0,0 +1,122 @@
+from typing import Optional, Dict, Iterator, Tuple, TYPE_CHECKING
+
+from config import settings
+from core.poppler_text import PopplerError, pdf_info, extract_page_text, get_page_count
+from utils.logger import get_app_logger
+from utils.startup_timer import startup_timer
+if TYPE_CHECKING:
+    from PyPDF2 import PdfReader
+app_logger = get_app_logger()
+
+
+class PDFDocument:
+    """
+    Contexto por documento: abre el PDF una sola vez y cachea el texto extraído de cada página.
+    Lo comparten la verificación de "solo imagen" y la extracción directa, de modo que un PDF
+    digital no se parsea ni se extrae dos veces.
+    El texto sale de `text_backend` (TEXT_LAYER_BACKEND): "pdftotext" (nativo de Poppler) o "pypdf2".
+    Si Poppler falla con un documento, ese documento pasa a PyPDF2.
+    """
+
+    def __init__(self, pdf_path: str, text_backend: Optional[str] = None):
+        self.pdf_path = pdf_path
+        self.text_backend = text_backend or getattr(settings, 'TEXT_LAYER_BACKEND', 'pypdf2')
+        self._reader: Optional["PdfReader"] = None
+        self._open_attempted = False
+        self._poppler_info: Optional[Dict[str, str]] = None
+        self._page_texts: Dict[int, str] = {}
+        self._locked = False  # True si está encriptado y no se pudo desencriptar con clave vacía
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _get_reader(self) -> Optional["PdfReader"]:
+        """Abre el PDF la primera vez que se necesita. Lanza la excepción original si no se puede leer."""
+        if not self._open_attempted:
+            self._open_attempted = True
+            reader = startup_timer.import_module("PyPDF2").PdfReader(self.pdf_path) # Importación diferida (arranque rápido)
+            if reader.is_encrypted:
+                try:
+                    reader.decrypt('')
+                except Exception:
+                    app_logger.warning(f"PDF '{self.pdf_path}' encriptado y no se pudo desencriptar.")
+                    self._locked = True
+            self._reader = reader
+        return self._reader
+
+    def _fall_back_to_pypdf2(self, error: Exception):
+        app_logger.warning(f"pdftotext no pudo leer '{self.pdf_path}' ({error}). Se usará PyPDF2 para este documento.")
+        self.text_backend = "pypdf2"
+
+    def _get_poppler_info(self) -> Optional[Dict[str, str]]:
+        """Salida de pdfinfo (solo con el backend pdftotext). None si se pasó a PyPDF2."""
+        if self.text_backend != "pdftotext":
+            return None
+        if self._poppler_info is None:
+            try:
+                self._poppler_info = pdf_info(self.pdf_path)
+                if get_page_count(self._poppler_info) is None:
+                    raise PopplerError("pdfinfo no informó el número de páginas")
+            except PopplerError as e:
+                self._fall_back_to_pypdf2(e) # Incluye PDFs con contraseña: PyPDF2 los marca como bloqueados
+                return None
+        return self._poppler_info
+
+    @property
+    def is_locked(self) -> bool:
+        if self._get_poppler_info() is not None:
+            return False # pdfinfo solo abre el PDF si no requiere contraseña (o la de usuario es vacía)
+        self._get_reader()
+        return self._locked
+
+    @property
+    def num_pages(self) -> int:
+        info = self._get_poppler_info()
+        if info is not None:
+            return get_page_count(info)
+        reader = self._get_reader()
+        return len(reader.pages) if reader else 0
+
+    def get_page_size(self, page_idx: int) -> Tuple[float, float]:
+        """Tamaño (ancho, alto) en puntos de la página tal como la renderiza Poppler (media box, con /Rotate aplicado)."""
+        page = self._get_reader().pages[page_idx]
+        width, height = float(page.mediabox.width), float(page.mediabox.height)
+        rotation = int(page.get('/Rotate', 0) or 0) % 360
+        return (height, width) if rotation in (90, 270) else (width, height)
+
+    def get_page_text(self, page_idx: int) -> str:
+        """Devuelve el texto de la página `page_idx` (base 0), extrayéndolo solo la primera vez."""
+        if page_idx not in self._page_texts:
+            text = None
+            if self._get_poppler_info() is not None:
+                try:
+                    text = extract_page_text(self.pdf_path, page_idx + 1, layout=getattr(settings, 'PDFTOTEXT_LAYOUT', False))
+                except PopplerError as e:
+                    self._fall_back_to_pypdf2(e)
+            if self.text_backend != "pdftotext":
+                reader = self._get_reader()
+                text = reader.pages[page_idx].extract_text() if reader else None
+            self._page_texts[page_idx] = text or ""
+        return self._page_texts[page_idx]
+
+    def iter_page_texts(self, start: int = 0, max_pages: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Generador perezoso de (índice, texto) por página. Solo extrae una página cuando el consumidor
+        la pide, así que quien deja de iterar no paga por el resto del documento.
+        """
+        end = self.num_pages if max_pages is None else min(self.num_pages, start + max_pages)
+        for page_idx in range(start, end):
+            yield page_idx, self.get_page_text(page_idx)
+
+    def get_full_text(self) -> str:
+        """Texto de todas las páginas unido por saltos de línea (usa la caché por página)."""
+        parts = [text for _, text in self.iter_page_texts()]
+        return "\n".join(filter(None, parts)).strip()
+
+    def close(self):
+        self._reader = None
+        self._page_texts.clear()
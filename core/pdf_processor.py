@@ -1,38 +1,56 @@
-import easyocr
-import re
 import os
 import time
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-from typing import Optional, Tuple, Dict, Callable
+from collections import Counter
+from typing import Optional, Tuple, Dict, Callable, List
 import numpy as np
 from PIL import Image
 
-# Importar OpenCV si está disponible y habilitado para preprocesamiento
+# OpenCV (si está habilitado el preprocesamiento) y EasyOCR se importan al crear PDFProcessor, que la GUI
+# hace en un hilo de fondo: importar torch/cv2 aquí retrasaría la aparición de la ventana.
 opencv_available = False
 cv2 = None 
 try:
     from config import settings
-    enable_preprocessing_flag = False
-    if hasattr(settings, 'ENABLE_IMAGE_PREPROCESSING'):
-        enable_preprocessing_flag = settings.ENABLE_IMAGE_PREPROCESSING
-
-    if enable_preprocessing_flag:
-        import cv2
-        opencv_available = True
 except ImportError: 
-    print("ADVERTENCIA (pdf_processor import): No se pudo importar 'config.settings' al verificar OpenCV.")
+    print("ADVERTENCIA (pdf_processor import): No se pudo importar 'config.settings'.")
     settings = None 
-except AttributeError: 
-    print("ADVERTENCIA (pdf_processor import): 'ENABLE_IMAGE_PREPROCESSING' no encontrado en settings al verificar OpenCV.")
 
 
+from core.pdf_document import PDFDocument
+from core.page_cache import page_image_cache
+from core.ocr_cache import get_ocr_cache, OCR_RENDER_DPI
+from core.field_extractor import scan_printed_fields, merge_printed_fields, printed_fields_final
+from core.image_preprocessing import get_image_preprocessor, get_profile_overrides
+from core.page_orientation import PageOrientation, detect_orientation, correct_page, describe as describe_orientation
+from core.layout_templates import LayoutTemplate, FieldRegion, get_template, find_text_line_boxes
+from core.poppler_render import render_region_array
 from utils.logger import get_app_logger
+from utils.startup_timer import startup_timer
 app_logger = get_app_logger()
 
+
+def _load_opencv():
+    """Importa OpenCV (una sola vez) si ENABLE_IMAGE_PREPROCESSING está activo."""
+    global opencv_available, cv2
+    if opencv_available or not (settings and getattr(settings, 'ENABLE_IMAGE_PREPROCESSING', False)):
+        return
+    try:
+        cv2 = startup_timer.import_module("cv2")
+        opencv_available = True
+    except ImportError:
+        app_logger.debug("OpenCV (cv2) no está instalado.")
+
+# ROI del número de acta manuscrito (18% superior, 30% derecho) según la plantilla del Formato B
+HANDWRITTEN_ACTA_REGION = get_template("entregado_manuscrito").get_region("acta_manuscrita")
+
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, use_daemon: Optional[bool] = None):
         self.reader = None
+        self.ocr_backend = "inprocess" # "daemon" si el lector es el servicio OCR local (core/ocr_daemon.py)
+        self.dpi_ladder_stats: Counter = Counter() # Peldaño de OCR_DPI_LADDER en que se resolvió cada documento
+        self.orientation_stats: Counter = Counter() # Correcciones de orientación/inclinación aplicadas antes del OCR
+        # Por PDF (ruta, mtime): se detecta una vez y se reutiliza en cada peldaño y en las ROI; forget_document la descarta
+        self._page_orientations: Dict[Tuple[str, float], PageOrientation] = {}
         try:
             ocr_langs = ['es'] 
             use_gpu = False
@@ -42,9 +60,18 @@ class PDFProcessor:
                 if hasattr(settings, 'OCR_GPU'):
                     use_gpu = settings.OCR_GPU
             
-            app_logger.info(f"Inicializando EasyOCR con idiomas: {ocr_langs}, GPU: {use_gpu}")
-            self.reader = easyocr.Reader(ocr_langs, gpu=use_gpu)
-            app_logger.info("EasyOCR inicializado correctamente.")
+            _load_opencv()
+            if use_daemon is None: use_daemon = getattr(settings, 'OCR_USE_DAEMON', True) if settings else False
+            if use_daemon:
+                # Modelos ya cargados y calientes en el servicio OCR local; si no está en marcha, EasyOCR en proceso
+                from core.ocr_daemon import connect_ocr_daemon
+                self.reader = connect_ocr_daemon()
+                if self.reader: self.ocr_backend = "daemon"
+            if not self.reader:
+                easyocr = startup_timer.import_module("easyocr") # Trae consigo torch: la importación más costosa del arranque
+                app_logger.info(f"Inicializando EasyOCR con idiomas: {ocr_langs}, GPU: {use_gpu}")
+                self.reader = easyocr.Reader(ocr_langs, gpu=use_gpu)
+                app_logger.info("EasyOCR inicializado correctamente.")
 
             enable_preprocessing_check = False
             if settings and hasattr(settings, 'ENABLE_IMAGE_PREPROCESSING'):
@@ -56,18 +83,32 @@ class PDFProcessor:
         except Exception as e:
             app_logger.error(f"Error crítico al inicializar EasyOCR: {e}", exc_info=True)
 
-    def _is_pdf_image_only(self, pdf_path: str) -> bool:
-        # ... (sin cambios respecto a la versión anterior) ...
+    def warm_up(self):
+        """
+        Inferencia de prueba (detector + reconocedor) sobre una imagen sintética, para que el primer
+        documento real no pague la inicialización perezosa de torch ni la reserva inicial de memoria.
+        """
+        if not self.reader or self.ocr_backend == "daemon": return # El servicio ya se calentó al arrancar
+        start_time = time.time()
+        try:
+            dummy = np.full((64, 320), 255, dtype=np.uint8)
+            dummy[20:44, 16:304:10] = 0 # Trazos verticales: el detector tiene algo que procesar
+            self.reader.readtext(dummy, detail=0)
+            self.reader.recognize(dummy, detail=0)
+            app_logger.info(f"Calentamiento de EasyOCR completado en {time.time() - start_time:.2f}s.")
+        except Exception as e:
+            app_logger.warning(f"Calentamiento de EasyOCR falló (no es crítico): {e}")
+
+    def _is_pdf_image_only(self, pdf_doc: PDFDocument) -> bool:
+        pdf_path = pdf_doc.pdf_path
         app_logger.debug(f"Verificando si '{pdf_path}' es solo imagen.")
+        # Solo se sondean las primeras páginas: el OCR y los regex trabajan sobre la cabecera de la pág 1
+        max_probe_pages = getattr(settings, 'TEXT_PROBE_MAX_PAGES', 1) if settings else 1
         try:
-            reader = PdfReader(pdf_path)
-            if reader.is_encrypted:
-                try: reader.decrypt('')
-                except:
-                    app_logger.warning(f"PDF '{pdf_path}' encriptado. Asumiendo OCR.")
-                    return True
-            for page_idx, page in enumerate(reader.pages):
-                text = page.extract_text()
+            if pdf_doc.is_locked:
+                app_logger.warning(f"PDF '{pdf_path}' encriptado. Asumiendo OCR.")
+                return True
+            for page_idx, text in pdf_doc.iter_page_texts(max_pages=max_probe_pages):
                 if text and len(text.strip()) > 50:
                     app_logger.info(f"'{pdf_path}' (pág {page_idx+1}) tiene texto extraíble.")
                     return False
@@ -78,111 +119,344 @@ class PDFProcessor:
             return True
 
 
-    def _preprocess_full_page_image_for_ocr(self, image_np_rgb: np.ndarray) -> np.ndarray:
-        # ... (sin cambios respecto a la versión anterior) ...
-        global opencv_available, cv2
+    def _preprocess_full_page_image_for_ocr(self, page_img: Image.Image, doc_type: Optional[str] = None) -> np.ndarray:
+        """Página lista para EasyOCR: con preprocesamiento, grises + pasos del perfil del tipo de documento; si no, la página tal cual."""
         enable_preprocessing = False
         if settings and hasattr(settings, 'ENABLE_IMAGE_PREPROCESSING'):
             enable_preprocessing = settings.ENABLE_IMAGE_PREPROCESSING
-        if not (enable_preprocessing and opencv_available):
-            return image_np_rgb 
+        if not enable_preprocessing:
+            return self._page_to_array(page_img)
         try:
-            gray = cv2.cvtColor(image_np_rgb, cv2.COLOR_RGB2GRAY)
-            return gray 
-        except Exception as e_cv2:
-            app_logger.error(f"Error preprocesando pág completa: {e_cv2}")
-            return image_np_rgb
-
-    def extract_text_from_pdf(self, pdf_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Tuple[Optional[str], str]:
-        # ... (sin cambios respecto a la versión anterior, incluyendo la lógica de guardado de debug logs) ...
-        # --- ESTA FUNCIÓN ES LARGA, USA LA VERSIÓN COMPLETA DE LA RESPUESTA ANTERIOR ---
-        app_logger.debug(f"ENTRANDO a extract_text_from_pdf para: {pdf_path}")
+            return get_image_preprocessor(doc_type, cv2 if opencv_available else None).prepare_page(page_img)
+        except Exception as e_prep:
+            app_logger.error(f"Error preprocesando pág completa: {e_prep}")
+            return self._page_to_array(page_img)
+
+    @staticmethod
+    def _page_to_array(page_img: Image.Image) -> np.ndarray:
+        """Página como array de solo lectura para EasyOCR, que acepta grises: sin pasar a RGB si ya está en 'L'."""
+        return np.asarray(page_img if page_img.mode in ('L', 'RGB') else page_img.convert('RGB'))
+
+    def _extract_direct_text(self, pdf_doc: PDFDocument, debug_dir: str, progress_callback: Optional[Callable[[int], None]] = None) -> Optional[Tuple[str, str]]:
+        """Extracción directa de la capa de texto reutilizando el contexto del documento (sin re-parsear el PDF)."""
+        pdf_path = pdf_doc.pdf_path
+        if self._is_pdf_image_only(pdf_doc): return None
+        try:
+            app_logger.info(f"Intentando extracción directa para '{pdf_path}'")
+            num_pages = pdf_doc.num_pages; direct_text_parts = []; fields = None
+            # Las páginas se extraen de forma perezosa y cada una se escanea una sola vez; los campos se combinan
+            # con la precedencia del texto completo y se deja de leer cuando ninguna página posterior puede cambiarlos
+            for i, page_text in pdf_doc.iter_page_texts():
+                direct_text_parts.append(page_text)
+                if progress_callback: progress_callback(int(((i + 1) / num_pages) * 50))
+                fields = merge_printed_fields(fields, scan_printed_fields(page_text))
+                if printed_fields_final(fields):
+                    if i + 1 < num_pages: app_logger.info(f"Campos resueltos en pág {i+1}/{num_pages} de '{pdf_path}'. Se omiten las páginas restantes.")
+                    break
+            direct_text = "\n".join(filter(None, direct_text_parts)).strip()
+            if direct_text:
+                app_logger.info(f"Texto extraído directamente de '{pdf_path}'.")
+                if progress_callback: progress_callback(100)
+                if debug_dir:
+                    try:
+                        base_name = os.path.basename(pdf_path).replace('.', '_'); fname = os.path.join(debug_dir, f"debug_direct_text_output_{base_name}.txt")
+                        with open(fname, "w", encoding="utf-8") as f: f.write(f"--- TEXTO DIRECTO {pdf_path} ---\n{direct_text if direct_text else '(Vacio)'}")
+                        app_logger.info(f"Texto directo guardado en: {fname}")
+                    except Exception as e: app_logger.error(f"Error guardando debug directo: {e}")
+                return direct_text, "directo"
+        except Exception as e: app_logger.warning(f"Extracción directa falló para '{pdf_path}': {e}. Intentando OCR.")
+        return None
+
+    def _ocr_cache_lookup(self, pdf_path: str, doc_type: Optional[str] = None) -> Tuple[Optional[str], Optional[Tuple[str, str]]]:
+        """Devuelve (clave, resultado_cacheado) de la caché OCR persistente; (None, None) si está deshabilitada o falla."""
+        ocr_cache = get_ocr_cache()
+        if not ocr_cache: return None, None
+        try:
+            # Con plantilla de formato o perfil de preprocesamiento propio el texto resultante depende del tipo de documento
+            depends_on_type = self._get_layout_template(doc_type) or get_profile_overrides(doc_type)
+            cache_key = ocr_cache.make_key(pdf_path, variant=doc_type if depends_on_type else "")
+            cached = ocr_cache.get_result(cache_key)
+            if cached: app_logger.info(f"Texto de '{os.path.basename(pdf_path)}' recuperado de la caché OCR (método original: {cached[1]}).")
+            return cache_key, cached
+        except Exception as e_cache:
+            app_logger.warning(f"Error consultando caché OCR para '{pdf_path}': {e_cache}")
+            return None, None
+
+    def _ocr_cache_store(self, cache_key: Optional[str], pdf_path: str, text: Optional[str], method: str):
+        ocr_cache = get_ocr_cache()
+        if ocr_cache and cache_key and text: # Solo se cachean extracciones exitosas
+            try: ocr_cache.put_result(cache_key, text, method)
+            except Exception as e_cache: app_logger.warning(f"Error guardando en caché OCR para '{pdf_path}': {e_cache}")
+
+    def extract_text_from_pdf(self, pdf_path: str, progress_callback: Optional[Callable[[int], None]] = None, doc_type: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """
+        Envuelve la extracción con la caché OCR persistente (clave: SHA-256 del PDF + configuración OCR).
+        Si `doc_type` tiene plantilla de formato registrada, el OCR se intenta primero solo sobre sus regiones.
+        """
+        cache_key, cached = self._ocr_cache_lookup(pdf_path, doc_type)
+        if cached:
+            if progress_callback: progress_callback(100)
+            return cached
+        text, method = self._extract_text_uncached(pdf_path, progress_callback, doc_type)
+        self._ocr_cache_store(cache_key, pdf_path, text, method)
+        return text, method
+
+    def extract_texts_from_pdfs(self, pdf_paths: List[str], doc_type: Optional[str] = None) -> List[Tuple[Optional[str], str]]:
+        """
+        Versión por lotes de extract_text_from_pdf: resuelve caché y texto directo documento a documento,
+        y las páginas que necesitan OCR se reconocen juntas con readtext_batch. Resultados en el orden de entrada.
+        """
+        results: List[Optional[Tuple[Optional[str], str]]] = [None] * len(pdf_paths)
+        cache_keys: Dict[int, Optional[str]] = {}
+        pending_ocr: List[int] = []
+        debug_dir = self._get_debug_dir()
+        for idx, pdf_path in enumerate(pdf_paths):
+            cache_key, cached = self._ocr_cache_lookup(pdf_path, doc_type)
+            if cached: results[idx] = cached; continue
+            cache_keys[idx] = cache_key # Solo los no cacheados se guardan al final
+            with PDFDocument(pdf_path) as pdf_doc:
+                direct_result = self._extract_direct_text(pdf_doc, debug_dir)
+            if direct_result: results[idx] = direct_result; continue
+            if not self.reader: results[idx] = (None, "fallido_ocr_no_init"); continue
+            template_result = self._extract_text_with_template(pdf_path, doc_type)
+            if template_result: results[idx] = template_result; continue
+            pending_ocr.append(idx)
+
+        if pending_ocr:
+            try:
+                ocr_lines = self._ocr_full_pages([pdf_paths[idx] for idx in pending_ocr], doc_type)
+                for idx, lines in zip(pending_ocr, ocr_lines):
+                    results[idx] = self._finalize_ocr_text(pdf_paths[idx], lines, debug_dir) if lines is not None else (None, "fallido_ocr_excepcion")
+            except Exception as e:
+                app_logger.error(f"EXCEPCIÓN en OCR por lotes: {e}", exc_info=True)
+                for idx in pending_ocr: results[idx] = (None, "fallido_ocr_excepcion")
+
+        for idx, pdf_path in enumerate(pdf_paths):
+            if idx in cache_keys: self._ocr_cache_store(cache_keys[idx], pdf_path, *results[idx])
+        return results
+
+    def readtext_batch(self, images: List[np.ndarray], **readtext_kwargs) -> List[list]:
+        """
+        OCR por lotes: agrupa imágenes de igual tamaño y las pasa juntas por readtext_batched de EasyOCR
+        (una sola pasada del detector por lote). Devuelve un resultado por imagen, en el orden de entrada.
+        """
+        batch_size = max(1, int(getattr(settings, 'OCR_BATCH_SIZE', 1) if settings else 1))
+        readtext_kwargs.setdefault("batch_size", getattr(settings, 'OCR_RECOGNIZER_BATCH_SIZE', 1) if settings else 1)
+        results: List[Optional[list]] = [None] * len(images)
+        groups: Dict[tuple, List[int]] = {}
+        for idx, img in enumerate(images):
+            groups.setdefault(img.shape, []).append(idx)
+        for shape, indices in groups.items():
+            for chunk_start in range(0, len(indices), batch_size):
+                chunk = indices[chunk_start:chunk_start + batch_size]
+                if len(chunk) == 1:
+                    results[chunk[0]] = self.reader.readtext(images[chunk[0]], **readtext_kwargs)
+                    continue
+                app_logger.debug(f"readtext_batched: {len(chunk)} imágenes de {shape}.")
+                for idx, res in zip(chunk, self.reader.readtext_batched([images[i] for i in chunk], **readtext_kwargs)):
+                    results[idx] = res
+        return results
+
+    def _get_debug_dir(self) -> str:
         debug_dir = ""
         try:
             project_root = os.getcwd(); debug_dir = os.path.join(project_root, "OCRename_Logs_Debug"); os.makedirs(debug_dir, exist_ok=True)
         except Exception as e_mkdir: app_logger.error(f"No se pudo crear dir de debug '{debug_dir}': {e_mkdir}"); debug_dir = ""
-        if not self._is_pdf_image_only(pdf_path):
+        return debug_dir
+
+    def _get_dpi_ladder(self) -> List[int]:
+        ladder = getattr(settings, 'OCR_DPI_LADDER', None) if settings else None
+        return list(ladder) if ladder else [OCR_RENDER_DPI]
+
+    def _required_fields(self, doc_type: Optional[str]) -> List[str]:
+        """Campos que el OCR de página completa debe resolver para no escalar de DPI (los de la plantilla si existe)."""
+        template = get_template(doc_type)
+        return template.required_fields if template else ["id_type", "id_number", "acta_no"]
+
+    def _ocr_full_pages(self, pdf_paths: List[str], doc_type: Optional[str] = None) -> List[Optional[List[str]]]:
+        """
+        OCR de página completa con escalera de DPI (OCR_DPI_LADDER): se reconoce primero a DPI bajo y solo
+        los documentos a los que les faltan campos se vuelven a renderizar y reconocer en el siguiente peldaño.
+        Devuelve las líneas OCR de cada PDF (las del peldaño con más campos resueltos), o None si no se pudo renderizar.
+        """
+        ladder = self._get_dpi_ladder(); required = self._required_fields(doc_type)
+        best: Dict[int, Tuple[int, List[str]]] = {} # idx -> (campos resueltos, líneas)
+        pending = list(range(len(pdf_paths)))
+        for rung, dpi in enumerate(ladder):
+            images = []
+            for idx in pending:
+                try: images.append((idx, self._load_page_for_ocr(pdf_paths[idx], dpi, doc_type)))
+                except Exception as e: app_logger.error(f"EXCEPCIÓN preparando OCR de '{pdf_paths[idx]}' a {dpi} dpi: {e}", exc_info=True)
+            if not images: break
+            ocr_start_time = time.time()
+            batch_results = self.readtext_batch([img for _, img in images], detail=0, paragraph=True)
+            app_logger.debug(f"OCR de {len(images)} página(s) a {dpi} dpi took {time.time() - ocr_start_time:.2f} seconds.")
+            rung_indices = [idx for idx, _ in images]; del images # Liberar las imágenes del peldaño
+            pending = []
+            for idx, res_page in zip(rung_indices, batch_results):
+                lines = res_page or []
+                data = self.extract_printed_data_from_text("\n".join(lines).strip(), verbose=False)
+                resolved = sum(1 for field in required if data.get(field))
+                if idx not in best or resolved >= best[idx][0]: best[idx] = (resolved, lines)
+                if resolved == len(required):
+                    self.dpi_ladder_stats[dpi] += 1
+                    app_logger.info(f"Escalera DPI: '{os.path.basename(pdf_paths[idx])}' resuelto a {dpi} dpi (peldaño {rung+1}/{len(ladder)}).")
+                else:
+                    pending.append(idx)
+            if pending and rung + 1 < len(ladder):
+                app_logger.info(f"Escalera DPI: {len(pending)} documento(s) con campos faltantes a {dpi} dpi; escalando a {ladder[rung+1]} dpi.")
+        for idx in pending:
+            self.dpi_ladder_stats["sin_resolver"] += 1
+            app_logger.info(f"Escalera DPI: '{os.path.basename(pdf_paths[idx])}' sin resolver tras {len(ladder)} peldaño(s); se usa el mejor resultado.")
+        return [best[idx][1] if idx in best else None for idx in range(len(pdf_paths))]
+
+    def _min_skew(self) -> float:
+        return getattr(settings, 'DESKEW_MIN_ANGLE', 0.3) if settings else 0.3
+
+    @staticmethod
+    def _orientation_key(pdf_path: str) -> Tuple[str, float]:
+        """Misma identidad que la caché de páginas: si el archivo cambia en disco, su orientación se vuelve a detectar."""
+        path = os.path.abspath(pdf_path)
+        try: return path, os.path.getmtime(path)
+        except OSError: return path, 0.0
+
+    def forget_document(self, pdf_path: str):
+        """Descarta lo recordado de un PDF ya terminado (su orientación), para que no crezca durante la sesión."""
+        path = os.path.abspath(pdf_path)
+        for key in [key for key in list(self._page_orientations) if key[0] == path]:
+            self._page_orientations.pop(key, None)
+
+    def _get_page_orientation(self, pdf_path: str, page_img: Image.Image) -> PageOrientation:
+        """Orientación de la 1ra página del PDF, detectada (una sola vez) sobre una copia reducida de `page_img`."""
+        key = self._orientation_key(pdf_path)
+        orientation = self._page_orientations.get(key)
+        if orientation is not None: return orientation
+        try:
+            orientation = detect_orientation(page_img, max_side=getattr(settings, 'ORIENTATION_ANALYSIS_MAX_SIDE', 1000),
+                                             max_skew=getattr(settings, 'DESKEW_MAX_ANGLE', 5.0))
+        except Exception as e:
+            app_logger.warning(f"Detección de orientación falló para '{pdf_path}' (se usa la página tal cual): {e}")
+            orientation = PageOrientation()
+        self._page_orientations[key] = orientation
+        if orientation.rotation: self.orientation_stats[f"rotada_{orientation.rotation}"] += 1
+        if abs(orientation.skew) >= self._min_skew(): self.orientation_stats["enderezada"] += 1
+        if orientation.is_identity(self._min_skew()): self.orientation_stats["sin_correccion"] += 1
+        else: app_logger.info(f"Orientación de '{os.path.basename(pdf_path)}': {describe_orientation(orientation)}. Se corrige antes del OCR.")
+        return orientation
+
+    def _correct_page_orientation(self, pdf_path: str, page_img: Image.Image) -> Image.Image:
+        """Página enderezada (nueva imagen) si ENABLE_ORIENTATION_CORRECTION y la página está girada o inclinada."""
+        if not (settings and getattr(settings, 'ENABLE_ORIENTATION_CORRECTION', False)): return page_img
+        orientation = self._get_page_orientation(pdf_path, page_img)
+        if orientation.is_identity(self._min_skew()): return page_img
+        return correct_page(page_img, orientation, self._min_skew())
+
+    def _load_page_for_ocr(self, pdf_path: str, dpi: int = OCR_RENDER_DPI, doc_type: Optional[str] = None) -> np.ndarray:
+        """Primera página lista para OCR (compartida con vista previa y HTR vía caché de páginas), ya enderezada."""
+        start_time = time.time()
+        # Al DPI del peldaño: un peldaño bajo solo reutiliza un render mayor si ya está en caché, nunca lo provoca
+        pil_img = page_image_cache.get_page(pdf_path, page=1, dpi=dpi, exact_render=True)
+        app_logger.debug(f"PDF to images conversion ({dpi} dpi) took {time.time() - start_time:.2f} seconds.")
+        pil_img = self._correct_page_orientation(pdf_path, pil_img)
+        img_ocr = self._preprocess_full_page_image_for_ocr(pil_img, doc_type)
+        app_logger.debug(f"Img OCR pág 1 de '{pdf_path}': tipo={type(img_ocr)}, shape={img_ocr.shape if isinstance(img_ocr, np.ndarray) else 'N/A'}")
+        return img_ocr
+
+    def _finalize_ocr_text(self, pdf_path: str, full_ocr_text: List[str], debug_dir: str) -> Tuple[Optional[str], str]:
+        final_text = "\n".join(full_ocr_text).strip(); app_logger.debug(f"full_ocr_text ANTES join para '{pdf_path}': {full_ocr_text}")
+        gpu_stat = str(settings.OCR_GPU) if settings and hasattr(settings, 'OCR_GPU') else "N/A"
+        app_logger.info(f"--- INICIO TEXTO OCR (GPU:{gpu_stat}) PARA {os.path.basename(pdf_path)} ---")
+        # (Lógica de logging de final_text omitida por brevedad pero debe estar)
+        app_logger.info(f"--- FIN TEXTO OCR (GPU:{gpu_stat}) PARA {os.path.basename(pdf_path)} ---")
+        if debug_dir:
             try:
-                app_logger.info(f"Intentando extracción directa para '{pdf_path}'")
-                reader = PdfReader(pdf_path); direct_text_parts = []; num_pages = len(reader.pages)
-                for i, page_obj in enumerate(reader.pages):
-                    direct_text_parts.append(page_obj.extract_text())
-                    if progress_callback: progress_callback(int(((i + 1) / num_pages) * 50))
-                direct_text = "\n".join(filter(None, direct_text_parts)).strip()
-                if direct_text:
-                    app_logger.info(f"Texto extraído directamente de '{pdf_path}'.")
-                    if progress_callback: progress_callback(100)
-                    if debug_dir:
-                        try:
-                            base_name = os.path.basename(pdf_path).replace('.', '_'); fname = os.path.join(debug_dir, f"debug_direct_text_output_{base_name}.txt")
-                            with open(fname, "w", encoding="utf-8") as f: f.write(f"--- TEXTO DIRECTO {pdf_path} ---\n{direct_text if direct_text else '(Vacio)'}")
-                            app_logger.info(f"Texto directo guardado en: {fname}")
-                        except Exception as e: app_logger.error(f"Error guardando debug directo: {e}")
-                    return direct_text, "directo"
-            except Exception as e: app_logger.warning(f"Extracción directa falló para '{pdf_path}': {e}. Intentando OCR.")
-        if not self.reader: app_logger.error("EasyOCR no inicializado."); return None, "fallido_ocr_no_init"
-        full_ocr_text = []; app_logger.debug(f"Iniciando OCR para {pdf_path}")
+                base_name = os.path.basename(pdf_path).replace('.', '_'); fname = os.path.join(debug_dir, f"debug_ocr_output_{base_name}.txt")
+                with open(fname, "w", encoding="utf-8") as f: f.write(f"--- TEXTO OCR (GPU:{gpu_stat}) {pdf_path} ---\n{final_text if final_text else '(Vacio)'}")
+                app_logger.info(f"OCR guardado en: {fname}")
+            except Exception as e: app_logger.error(f"Error guardando debug OCR: {e}")
+        if final_text: return final_text, "ocr_pagina_completa"
+        else: app_logger.warning(f"OCR pág completa no produjo texto para '{pdf_path}'."); return None, "ocr_pagina_vacia"
+
+    def _get_layout_template(self, doc_type: Optional[str]) -> Optional[LayoutTemplate]:
+        if not (settings and getattr(settings, 'ENABLE_LAYOUT_TEMPLATES', False)): return None
+        return get_template(doc_type)
+
+    def _recognize_region(self, region_np: np.ndarray, allowlist: Optional[str] = None) -> List[str]:
+        """Reconoce una región con el reconocedor de EasyOCR sobre cajas de línea conocidas (sin pasar por el detector)."""
+        line_boxes = find_text_line_boxes(region_np)
+        if not line_boxes: return []
+        return self.reader.recognize(region_np, horizontal_list=line_boxes, free_list=[], detail=0, allowlist=allowlist,
+                                     batch_size=getattr(settings, 'OCR_RECOGNIZER_BATCH_SIZE', 1) if settings else 1)
+
+    def _load_region_image(self, pdf_path: str, region: FieldRegion, dpi: int = OCR_RENDER_DPI) -> np.ndarray:
+        """
+        Región de la 1ra página en escala de grises. Si la página ya está en la caché (p. ej. por la vista
+        previa) se recorta de ahí; si no, Poppler rasteriza solo la caja de la región (ENABLE_REGION_RENDERING).
+        Con ENABLE_ORIENTATION_CORRECTION y la orientación aún sin detectar (acierto de caché OCR, capa de
+        texto o pool de OCR), se detecta aquí sobre la página renderizada.
+        """
+        orientation = self._page_orientations.get(self._orientation_key(pdf_path))
+        if orientation is None and settings and getattr(settings, 'ENABLE_ORIENTATION_CORRECTION', False):
+            orientation = self._get_page_orientation(pdf_path, page_image_cache.get_page(pdf_path, page=1, dpi=dpi))
+        page_is_rotated = orientation is not None and not orientation.is_identity(self._min_skew())
+        if page_is_rotated or page_image_cache.peek(pdf_path, page=1, min_dpi=dpi) is not None or not getattr(settings, 'ENABLE_REGION_RENDERING', True):
+            page_img = page_image_cache.get_page(pdf_path, page=1, dpi=dpi)  # Acierto (o reescalado) de caché, sin Poppler
+            if page_is_rotated: page_img = correct_page(page_img, orientation, self._min_skew()) # La caja de la región es relativa a la página derecha
+            x0, y0, x1, y1 = region.pixel_box(page_img.width, page_img.height)
+            return np.asarray(page_img.crop((x0, y0, x1, y1)).convert('L'))
+        return render_region_array(pdf_path, region.box, dpi, page=1, grayscale=True) # Vista sobre la salida de pdftoppm, sin copia
+
+    def _extract_text_with_template(self, pdf_path: str, doc_type: Optional[str]) -> Optional[Tuple[str, str]]:
+        """
+        OCR solo de las regiones de la plantilla del formato. Devuelve None (y se recurre al OCR de
+        página completa) si no hay plantilla o si faltan los campos imprescindibles de la plantilla.
+        """
+        template = self._get_layout_template(doc_type)
+        if not template or not self.reader: return None
         try:
-            pop_path = settings.POPPLER_PATH if settings and hasattr(settings, 'POPPLER_PATH') else None
-            # Procesar solo la primera página para OCR
             start_time = time.time()
-            images = convert_from_path(pdf_path, poppler_path=pop_path, first_page=1, last_page=1, dpi=200); 
+            region_texts = []
+            for region in template.printed_regions:
+                region_texts.extend(self._recognize_region(self._load_region_image(pdf_path, region), region.allowlist))
+            text = "\n".join(region_texts).strip()
+            data = self.extract_printed_data_from_text(text, verbose=False)
             duration = time.time() - start_time
-            app_logger.debug(f"PDF to images conversion took {duration:.2f} seconds.")
-            app_logger.debug(f"PDF '{pdf_path}' -> {len(images)} imágenes (solo primera página para OCR).")
-            num_images = len(images)
-            for i, pil_img in enumerate(images):
-                p_num = i + 1; app_logger.debug(f"OCR pág {p_num}/{num_images} de '{pdf_path}'")
-                img_np = np.array(pil_img.convert('RGB')); img_ocr = self._preprocess_full_page_image_for_ocr(img_np)
-                app_logger.debug(f"Img OCR pág {p_num}: tipo={type(img_ocr)}, shape={img_ocr.shape if isinstance(img_ocr, np.ndarray) else 'N/A'}")
-                ocr_start_time = time.time()
-                res_page = self.reader.readtext(img_ocr, detail=0, paragraph=True); 
-                ocr_duration = time.time() - ocr_start_time
-                app_logger.debug(f"OCR for page {p_num} took {ocr_duration:.2f} seconds.")
-                app_logger.debug(f"Res OCR pág {p_num}: {res_page}")
-                if res_page: full_ocr_text.extend(res_page)
-                prog_ocr = 50 + int(((i + 1) / num_images) * 50);
-                if progress_callback: progress_callback(prog_ocr)
-            final_text = "\n".join(full_ocr_text).strip(); app_logger.debug(f"full_ocr_text ANTES join para '{pdf_path}': {full_ocr_text}")
-            gpu_stat = str(settings.OCR_GPU) if settings and hasattr(settings, 'OCR_GPU') else "N/A"
-            app_logger.info(f"--- INICIO TEXTO OCR (GPU:{gpu_stat}) PARA {os.path.basename(pdf_path)} ---")
-            # (Lógica de logging de final_text omitida por brevedad pero debe estar)
-            app_logger.info(f"--- FIN TEXTO OCR (GPU:{gpu_stat}) PARA {os.path.basename(pdf_path)} ---")
-            if debug_dir:
-                try:
-                    base_name = os.path.basename(pdf_path).replace('.', '_'); fname = os.path.join(debug_dir, f"debug_ocr_output_{base_name}.txt")
-                    with open(fname, "w", encoding="utf-8") as f: f.write(f"--- TEXTO OCR (GPU:{gpu_stat}) {pdf_path} ---\n{final_text if final_text else '(Vacio)'}")
-                    app_logger.info(f"OCR guardado en: {fname}")
-                except Exception as e: app_logger.error(f"Error guardando debug OCR: {e}")
-            if final_text: return final_text, "ocr_pagina_completa"
-            else: app_logger.warning(f"OCR pág completa no produjo texto para '{pdf_path}'."); return None, "ocr_pagina_vacia"
+            if all(data.get(field) for field in template.required_fields):
+                app_logger.info(f"OCR por plantilla '{template.description}' resolvió '{os.path.basename(pdf_path)}' en {duration:.2f}s.")
+                return text, "ocr_plantilla"
+            app_logger.info(f"OCR por plantilla incompleto para '{os.path.basename(pdf_path)}' ({duration:.2f}s). Se usará OCR de página completa.")
+        except Exception as e:
+            app_logger.warning(f"OCR por plantilla falló para '{pdf_path}': {e}. Se usará OCR de página completa.")
+        return None
+
+    def _extract_text_uncached(self, pdf_path: str, progress_callback: Optional[Callable[[int], None]] = None, doc_type: Optional[str] = None) -> Tuple[Optional[str], str]:
+        app_logger.debug(f"ENTRANDO a extract_text_from_pdf para: {pdf_path}")
+        debug_dir = self._get_debug_dir()
+        # Un único contexto por documento: el PDF se abre y se extrae una sola vez
+        with PDFDocument(pdf_path) as pdf_doc:
+            direct_result = self._extract_direct_text(pdf_doc, debug_dir, progress_callback)
+        if direct_result: return direct_result
+        if not self.reader: app_logger.error("EasyOCR no inicializado."); return None, "fallido_ocr_no_init"
+        template_result = self._extract_text_with_template(pdf_path, doc_type)
+        if template_result:
+            if progress_callback: progress_callback(100)
+            return template_result
+        app_logger.debug(f"Iniciando OCR para {pdf_path}")
+        try:
+            # Procesar solo la primera página para OCR, escalando DPI solo si faltan campos
+            res_page = self._ocr_full_pages([pdf_path], doc_type)[0]
+            if res_page is None: return None, "fallido_ocr_excepcion"
+            app_logger.debug(f"Res OCR pág 1: {res_page}")
+            if progress_callback: progress_callback(100)
+            return self._finalize_ocr_text(pdf_path, res_page, debug_dir)
         except Exception as e:
             app_logger.error(f"EXCEPCIÓN en OCR pág completa de '{pdf_path}': {e}", exc_info=True)
             if "poppler" in str(e).lower() or "pdftoppm" in str(e).lower(): app_logger.error("Error Poppler...")
             return None, "fallido_ocr_excepcion"
 
 
-    def _extract_age_from_text(self, text_content: str) -> Optional[int]:
-        # ... (sin cambios respecto a la versión anterior) ...
-        if not text_content: return None
-        age_pattern = re.compile(r"\b(?:Edad\s*[:\-]?\s*)?(\d{1,3})\s*A[ÑN]OS\b", re.IGNORECASE)
-        match = age_pattern.search(text_content)
-        if match:
-            try:
-                age = int(match.group(1)); app_logger.debug(f"Edad extraída: {age} años."); return age
-            except ValueError: app_logger.warning(f"Patrón edad, pero '{match.group(1)}' no es número.")
-        else:
-            age_simple_match = re.search(r"\b(\d{1,3})\b\s*A[ÑN]OS", text_content, re.IGNORECASE)
-            if age_simple_match:
-                context_start = max(0, age_simple_match.start() - 30); context_window = text_content[context_start : age_simple_match.start()]
-                if "EDAD" in context_window.upper():
-                    try:
-                        age = int(age_simple_match.group(1)); app_logger.debug(f"Edad (simple c/contexto) extraída: {age} años."); return age
-                    except ValueError: pass
-            app_logger.debug("No se pudo extraer la edad.")
-        return None
-
-    def extract_printed_data_from_text(self, text_content: str) -> Dict[str, Optional[str]]:
+    def extract_printed_data_from_text(self, text_content: str, verbose: bool = True) -> Dict[str, Optional[str]]:
+        """`verbose=False` silencia los avisos de resumen (útil para comprobaciones parciales página a página)."""
         data = {"id_type": None, "id_number": None, "acta_no": None}
         if not text_content:
             app_logger.debug("extract_printed_data_from_text: text_content vacío.")
@@ -190,91 +464,40 @@ class PDFProcessor:
 
         app_logger.debug(f"extract_printed_data_from_text: Iniciando Regex.")
 
-        # Tipos de ID permitidos para renombrar (EXCLUYE NIT explícitamente de la captura de tipo)
-        allowed_id_types_regex_capture = r"(CC|TI|CE|PA|RC)" # Cédula Ciudadanía, Tarjeta Identidad, Cédula Extranjería, Pasaporte, Registro Civil
-
-        # --- Extracción de id_number e id_type ---
-        # Prioridad: Buscar el número y luego asociar un tipo permitido, o inferir.
-
-        # Patrón 1: "Identificación: [TIPO_PERMITIDO (opcional)] NUMERO"
-        # El grupo del tipo es opcional. El número es el grupo principal.
-        id_explicit_match = re.search(rf"(?i)Identificaci[oó]n\s*[:\-]?\s*(?:({allowed_id_types_regex_capture})\s*[:\-]?\s*)?(\d{{6,12}})\b", text_content)
-        if id_explicit_match:
-            id_num_candidate = id_explicit_match.group(2) # Grupo del número
-            type_candidate = id_explicit_match.group(1)   # Grupo del tipo (puede ser None)
-            
-            if id_num_candidate and id_num_candidate.isdigit(): # Asegurarse de que el número sea solo dígitos
-                data["id_number"] = id_num_candidate
-                if type_candidate:
-                    data["id_type"] = type_candidate.upper()
-                app_logger.debug(f"Regex ID Matched (P1: 'Identificacion'): TIPO={data['id_type']}, NUM={data['id_number']}")
-
-        # Patrón 2: "[TIPO_PERMITIDO] NUMERO" (sin "Identificación" necesariamente)
-        # Solo si no se encontró id_number aún.
-        if not data["id_number"]:
-            id_type_and_num_match = re.search(rf"(?i)\b({allowed_id_types_regex_capture})\s*[:\-]?\s*(\d{{6,12}})\b", text_content)
-            if id_type_and_num_match:
-                id_num_candidate = id_type_and_num_match.group(2)
-                if id_num_candidate.isdigit():
-                    data["id_type"] = id_type_and_num_match.group(1).upper()
-                    data["id_number"] = id_num_candidate
-                    app_logger.debug(f"Regex ID Matched (P2: tipo + número): TIPO={data['id_type']}, NUM={data['id_number']}")
-        
-        # Patrón 3: Número solitario (solo dígitos) con contexto de "Identificación" o similar.
-        # Solo si no se encontró id_number aún.
-        if not data["id_number"]:
-            for m in re.finditer(r"\b(\d{6,10})\b", text_content): # Busca números puros
-                num_candidate = m.group(1)
-                context_start = max(0, m.start() - 70)
-                context_end = min(len(text_content), m.end() + 70)
-                context_window = text_content[context_start:context_end]
-                
-                # Contexto para confirmar que es un id_number
-                if re.search(r"Identificaci[oó]n|DOCUMENTO|No\.\s*Doc|C[.\s]*C\b|IDENTIFICACION\s*No", context_window, re.IGNORECASE):
-                    if num_candidate.isdigit(): # Doble chequeo
-                        data["id_number"] = num_candidate
-                        app_logger.debug(f"Regex ID Number Matched (P3: número solitario con contexto): NUM={data['id_number']}")
-                        # Intentar encontrar tipo permitido en el mismo contexto si no se encontró antes
-                        if not data["id_type"]: 
-                            type_match_context_solo = re.search(rf"\b({allowed_id_types_regex_capture})\b", context_window, re.IGNORECASE)
-                            if type_match_context_solo:
-                                data["id_type"] = type_match_context_solo.group(1).upper()
-                                app_logger.debug(f"Regex ID Type Matched (contexto de P3): TIPO={data['id_type']}")
-                        break # Tomar la primera coincidencia válida
+        # Una sola pasada sobre el texto para todos los campos (ver core/field_extractor.py).
+        # id_number: primer número de 6-10 dígitos con contexto de identificación ("Identificación",
+        # "DOCUMENTO", "No. Doc", "C.C."...) a menos de 70 caracteres; id_type: primer tipo permitido
+        # (CC, TI, CE, PA, RC; NIT excluido) en esa misma ventana.
+        fields = scan_printed_fields(text_content)
+        if fields["id_number"]:
+            data["id_number"], data["id_type"] = fields["id_number"], fields["id_type"]
+            app_logger.debug(f"Regex ID Number Matched (número con contexto): TIPO={data['id_type']}, NUM={data['id_number']}")
 
         # --- Lógica de Inferencia y Default para id_type (SOLO SI HAY id_number) ---
         if data["id_number"]: 
             if not data["id_type"]: # Si id_number existe, pero id_type (permitido) no fue capturado
-                age = self._extract_age_from_text(text_content)
+                age = fields["age"]
                 if age is not None:
                     if age >= 18: data["id_type"] = "CC"
                     elif age < 5: data["id_type"] = "RC"
                     else: data["id_type"] = "TI" 
-                    app_logger.info(f"Se infirió id_type='{data['id_type']}' basado en la edad: {age} años.")
+                    if verbose: app_logger.info(f"Se infirió id_type='{data['id_type']}' basado en la edad: {age} años.")
                 else:
                     # Si no hay edad para inferir Y no se encontró un tipo permitido, default a "CC"
-                    app_logger.warning("id_type no encontrado por Regex y no se pudo inferir por edad. Asignando 'CC' por defecto ya que id_number existe.")
+                    if verbose: app_logger.warning("id_type no encontrado por Regex y no se pudo inferir por edad. Asignando 'CC' por defecto ya que id_number existe.")
                     data["id_type"] = "CC"
         else: 
-            app_logger.warning("No se encontró id_number. No se puede inferir id_type ni renombrar efectivamente.")
+            if verbose: app_logger.warning("No se encontró id_number. No se puede inferir id_type ni renombrar efectivamente.")
             data["id_type"] = None # Asegurar que id_type sea None si no hay id_number para que falle el renombrado
 
-        # --- Extracción de acta_no ---
-        acta_patterns = [
-            re.compile(r"(?i)Acta\s*de\s*Entrega\s*No\.?\s*(\d+)"),
-            re.compile(r"(?i)F[oó]rmula\s*M[eé]dica\s*Nro\.?\s*(\d+)"),
-            re.compile(r"(?i)(?:ORDEN|AUTORIZACION)\s*N[°oº\.]*[:\s]*(\d+)"),
-            re.compile(r"(?i)(?:Entrega\s*No|Nro|RECIBO)\.?\s*(\d+)")
-        ]
-        for i, pattern in enumerate(acta_patterns):
-            match = pattern.search(text_content)
-            if match:
-                data["acta_no"] = match.group(1)
-                app_logger.debug(f"Regex Acta Matched (patrón {i+1}): ACTA={data['acta_no']}")
-                break 
+        # --- Extracción de acta_no (patrón de mayor prioridad presente en el texto) ---
+        if fields["acta_no"]:
+            data["acta_no"] = fields["acta_no"]
+            app_logger.debug(f"Regex Acta Matched (patrón {fields['acta_pattern']}): ACTA={data['acta_no']}")
         if not data["acta_no"]: app_logger.debug("Regex Acta: Ningún patrón de acta coincidió.")
 
         # Logging final
+        if not verbose: return data
         if not data.get("id_number"): app_logger.warning(f"Extracción Regex final: FALTA ID_NUMBER. Datos: {data}")
         elif not data.get("id_type"): app_logger.warning(f"Extracción Regex final: FALTA ID_TYPE (id_number existe). Datos: {data}") # Debería ser CC si id_number existe
         elif not data.get("acta_no"): app_logger.warning(f"Extracción Regex final: FALTA ACTA_NO. Datos: {data}")
@@ -288,28 +511,84 @@ class PDFProcessor:
         app_logger.debug("Preprocesando ROI para número manuscrito...")
         try:
             if len(roi_image_np.shape) == 3: gray_roi = cv2.cvtColor(roi_image_np, cv2.COLOR_RGB2GRAY)
-            else: gray_roi = roi_image_np.copy()
+            else: gray_roi = roi_image_np # CLAHE escribe en un buffer nuevo: no hace falta copiar la entrada
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8)); contrast_roi = clahe.apply(gray_roi)
             _, binary_roi = cv2.threshold(contrast_roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU) 
             app_logger.debug("Preprocesamiento ROI HTR completado."); return binary_roi
         except Exception as e: app_logger.error(f"Error preprocesando ROI HTR: {e}", exc_info=True); return roi_image_np
 
-    def extract_handwritten_acta_number(self, first_page_pil_image: Image.Image) -> Optional[str]:
-        # ... (sin cambios) ...
+    def _crop_handwritten_acta_roi(self, first_page_pil_image: Image.Image, pdf_path: Optional[str] = None) -> Optional[np.ndarray]:
+        """ROI del número de acta manuscrito (región 'acta_manuscrita' de la plantilla), ya preprocesada para HTR."""
+        # Con la ruta, la página se endereza antes (la caja es relativa a la página derecha)
+        if pdf_path: first_page_pil_image = self._correct_page_orientation(pdf_path, first_page_pil_image)
+        # Recorte en PIL antes de pasar a grises/NumPy: solo la caja se copia, no la página completa
+        x0, y0, x1, y1 = HANDWRITTEN_ACTA_REGION.pixel_box(first_page_pil_image.width, first_page_pil_image.height)
+        roi_np = np.asarray(first_page_pil_image.crop((x0, y0, x1, y1)).convert('L'))
+        if roi_np.size == 0: app_logger.warning("ROI acta manuscrita vacía."); return None
+        return self._preprocess_roi_for_handwritten_acta(roi_np)
+
+    def _parse_handwritten_acta(self, ocr_res: list) -> Optional[str]:
+        if ocr_res:
+            num_digits = "".join(filter(str.isdigit, "".join(ocr_res).replace(" ", "").strip()))
+            app_logger.info(f"ROI HTR: '{num_digits}'")
+            if num_digits and 4 <= len(num_digits) <= 6: return num_digits
+            else: app_logger.warning(f"ROI HTR '{num_digits}' longitud inválida.")
+        else: app_logger.warning("EasyOCR no encontró números en ROI HTR.")
+        return None
+
+    def _load_handwritten_acta_roi(self, pdf_path: str) -> Optional[np.ndarray]:
+        """ROI del acta manuscrita renderizada directamente desde el PDF (solo la caja, en grises), ya preprocesada."""
+        roi_np = self._load_region_image(pdf_path, HANDWRITTEN_ACTA_REGION, OCR_RENDER_DPI)
+        if roi_np.size == 0: app_logger.warning("ROI acta manuscrita vacía."); return None
+        return self._preprocess_roi_for_handwritten_acta(roi_np)
+
+    def extract_handwritten_acta_number(self, first_page_pil_image: Image.Image, pdf_path: Optional[str] = None) -> Optional[str]:
         if not self.reader: app_logger.error("EasyOCR no inicializado para HTR."); return None
         app_logger.info("Intentando extraer acta manuscrita...")
         try:
-            img_np_rgb = np.array(first_page_pil_image.convert('RGB')); alto, ancho, _ = img_np_rgb.shape
-            roi_y_s, roi_y_e = 0, int(alto * 0.18); roi_x_s, roi_x_e = int(ancho * 0.70), ancho
-            roi_np = img_np_rgb[roi_y_s:roi_y_e, roi_x_s:roi_x_e]
-            if roi_np.size == 0: app_logger.warning("ROI acta manuscrita vacía."); return None
-            proc_roi = self._preprocess_roi_for_handwritten_acta(roi_np)
+            proc_roi = self._crop_handwritten_acta_roi(first_page_pil_image, pdf_path)
+            if proc_roi is None: return None
             ocr_res = self.reader.readtext(proc_roi, detail=0, paragraph=False, allowlist='0123456789')
-            if ocr_res:
-                num_digits = "".join(filter(str.isdigit, "".join(ocr_res).replace(" ", "").strip()))
-                app_logger.info(f"ROI HTR: '{num_digits}'")
-                if num_digits and 4 <= len(num_digits) <= 6: return num_digits
-                else: app_logger.warning(f"ROI HTR '{num_digits}' longitud inválida.")
-            else: app_logger.warning("EasyOCR no encontró números en ROI HTR.")
+            return self._parse_handwritten_acta(ocr_res)
         except Exception as e: app_logger.error(f"Error extrayendo acta manuscrita: {e}", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+    def extract_handwritten_acta_number_from_pdf(self, pdf_path: str) -> Optional[str]:
+        """Como extract_handwritten_acta_number, pero sin rasterizar la página completa."""
+        return self.extract_handwritten_acta_numbers_from_pdfs([pdf_path])[0]
+
+    def _recognize_handwritten_rois(self, crops: List[Tuple[int, np.ndarray]], results: List[Optional[str]]) -> List[Optional[str]]:
+        if not crops: return results
+        app_logger.info(f"Intentando extraer {len(crops)} actas manuscritas por lotes...")
+        try:
+            batch_res = self.readtext_batch([roi for _, roi in crops], detail=0, paragraph=False, allowlist='0123456789')
+            for (idx, _), ocr_res in zip(crops, batch_res):
+                results[idx] = self._parse_handwritten_acta(ocr_res)
+        except Exception as e: app_logger.error(f"Error extrayendo actas manuscritas por lotes: {e}", exc_info=True)
+        return results
+
+    def extract_handwritten_acta_numbers(self, first_page_pil_images: List[Optional[Image.Image]],
+                                         pdf_paths: Optional[List[str]] = None) -> List[Optional[str]]:
+        """HTR por lotes: recorta la ROI de cada página y reconoce todas las ROIs en una sola llamada por lotes."""
+        results: List[Optional[str]] = [None] * len(first_page_pil_images)
+        if not self.reader: app_logger.error("EasyOCR no inicializado para HTR."); return results
+        crops: List[Tuple[int, np.ndarray]] = []
+        for idx, pil_img in enumerate(first_page_pil_images):
+            if pil_img is None: continue
+            try:
+                proc_roi = self._crop_handwritten_acta_roi(pil_img, pdf_paths[idx] if pdf_paths else None)
+                if proc_roi is not None: crops.append((idx, proc_roi))
+            except Exception as e: app_logger.error(f"Error recortando ROI de acta manuscrita: {e}", exc_info=True)
+        return self._recognize_handwritten_rois(crops, results)
+
+    def extract_handwritten_acta_numbers_from_pdfs(self, pdf_paths: List[str]) -> List[Optional[str]]:
+        """HTR por lotes a partir de las rutas: cada ROI se renderiza sola desde el PDF."""
+        results: List[Optional[str]] = [None] * len(pdf_paths)
+        if not self.reader: app_logger.error("EasyOCR no inicializado para HTR."); return results
+        crops: List[Tuple[int, np.ndarray]] = []
+        for idx, pdf_path in enumerate(pdf_paths):
+            try:
+                proc_roi = self._load_handwritten_acta_roi(pdf_path)
+                if proc_roi is not None: crops.append((idx, proc_roi))
+            except Exception as e: app_logger.error(f"Error renderizando ROI de acta manuscrita de '{pdf_path}': {e}", exc_info=True)
+        return self._recognize_handwritten_rois(crops, results)
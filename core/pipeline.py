@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+_SENTINEL = object()
+
+
+class PipelineStage:
+    """
+    Etapa del pipeline: `func(item)` devuelve el item para la siguiente etapa, o None si el item
+    termina aquí (p. ej. un documento que ya se movió a fallidos).
+    Con `batch_size > 1`, `func` recibe una lista de hasta `batch_size` items (los que lleguen antes de
+    `batch_timeout` segundos) y devuelve una lista del mismo largo con el resultado de cada uno.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Optional[Any]], workers: int = 1, queue_size: int = 4,
+                 batch_size: int = 1, batch_timeout: float = 0.5):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self.batch_size = max(1, int(batch_size))
+        self.batch_timeout = batch_timeout
+        self.busy_seconds = 0.0
+        self.processed = 0
+
+
+class StagedPipeline:
+    """
+    Pipeline productor/consumidor: cada etapa tiene su propia cola acotada y su grupo de hilos.
+    Las colas acotadas dan backpressure (una etapa rápida se bloquea en put() si la siguiente va
+    atrasada), así que la memoria en vuelo está limitada y el rendimiento en régimen estable lo
+    marca la etapa más lenta en lugar de la suma de todas.
+    """
+
+    def __init__(self, stages: List[PipelineStage],
+                 on_item_done: Optional[Callable[[Any], None]] = None,
+                 on_item_error: Optional[Callable[[str, Any, Exception], None]] = None):
+        if not stages:
+            raise ValueError("El pipeline necesita al menos una etapa.")
+        self.stages = stages
+        self.on_item_done = on_item_done
+        self.on_item_error = on_item_error
+        self._queues = [queue.Queue(maxsize=stage.queue_size) for stage in stages]
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def stop(self):
+        """Pide a todas las etapas que dejen de tomar trabajo nuevo."""
+        self._stop_event.set()
+
+    def _put(self, q: "queue.Queue", item: Any):
+        # put() bloqueante pero interrumpible por stop()
+        while True:
+            try:
+                q.put(item, timeout=0.2)
+                return
+            except queue.Full:
+                if self._stop_event.is_set() and item is not _SENTINEL:
+                    return
+
+    def _collect_batch(self, stage: PipelineStage, in_queue: "queue.Queue"):
+        """Toma hasta `batch_size` items. Devuelve (items, recibió_centinela)."""
+        item = in_queue.get()
+        if item is _SENTINEL:
+            return [], True
+        batch = [item]
+        deadline = time.perf_counter() + stage.batch_timeout
+        while len(batch) < stage.batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = in_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _SENTINEL:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _worker(self, stage_idx: int, remaining_workers: Dict[int, int]):
+        stage = self.stages[stage_idx]
+        in_queue = self._queues[stage_idx]
+        is_last = stage_idx == len(self.stages) - 1
+        finished = False
+        while not finished:
+            batch, finished = self._collect_batch(stage, in_queue)
+            if not batch or self._stop_event.is_set():
+                continue  # Drenar sin procesar hasta recibir el centinela
+            start = time.perf_counter()
+            try:
+                results = stage.func(batch) if stage.batch_size > 1 else [stage.func(batch[0])]
+            except Exception as e:
+                app_logger.error(f"Pipeline: error en etapa '{stage.name}': {e}", exc_info=True)
+                if self.on_item_error:
+                    for item in batch:
+                        self.on_item_error(stage.name, item, e)
+                results = []
+            with self._lock:
+                stage.busy_seconds += time.perf_counter() - start
+                stage.processed += len(batch)
+            for result in results:
+                if result is None:
+                    continue
+                if is_last:
+                    if self.on_item_done:
+                        self.on_item_done(result)
+                else:
+                    self._put(self._queues[stage_idx + 1], result)
+
+        # El último worker de la etapa propaga el cierre a la etapa siguiente
+        with self._lock:
+            remaining_workers[stage_idx] -= 1
+            last_worker = remaining_workers[stage_idx] == 0
+        if last_worker and not is_last:
+            for _ in range(self.stages[stage_idx + 1].workers):
+                self._put(self._queues[stage_idx + 1], _SENTINEL)
+
+    def run(self, items: List[Any]):
+        """Procesa todos los items y retorna cuando el pipeline se ha vaciado (o se detuvo)."""
+        remaining_workers = {idx: stage.workers for idx, stage in enumerate(self.stages)}
+        threads = []
+        for idx, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(idx, remaining_workers), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        start = time.perf_counter()
+        for item in items:
+            if self._stop_event.is_set():
+                break
+            self._put(self._queues[0], item)
+        for _ in range(self.stages[0].workers):
+            self._put(self._queues[0], _SENTINEL)
+        for t in threads:
+            t.join()
+        self._log_stats(time.perf_counter() - start)
+
+    def _log_stats(self, elapsed: float):
+        parts = [f"{s.name}: {s.processed} items, {s.busy_seconds:.1f}s ocupados ({s.workers} hilos)" for s in self.stages]
+        app_logger.info(f"Pipeline completado en {elapsed:.1f}s. " + " | ".join(parts))
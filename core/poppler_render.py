@@ -0,0 +1,70 @@
+import math
+import re
+import subprocess
+from io import BytesIO
+from typing import Optional, Tuple
+import numpy as np
+from PIL import Image
+
+from core.layout_templates import RelativeBox
+from core.pdf_document import PDFDocument
+from core.poppler_text import PopplerError, get_poppler_binary
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+_PDFTOPPM_TIMEOUT_SECONDS = 60
+
+# Cabecera PNM binaria de pdftoppm: P5 (grises) o P6 (RGB), ancho, alto y valor máximo (255)
+_PNM_HEADER_RE = re.compile(rb"P([56])\s+(\d+)\s+(\d+)\s+(\d+)\s")
+
+
+def _render_region_pnm(pdf_path: str, box: RelativeBox, dpi: int, page: int, grayscale: bool,
+                       page_size_pts: Optional[Tuple[float, float]]) -> bytes:
+    if page_size_pts is None:
+        with PDFDocument(pdf_path) as pdf_doc:
+            page_size_pts = pdf_doc.get_page_size(page - 1)
+    width_px = math.ceil(page_size_pts[0] * dpi / 72.0)
+    height_px = math.ceil(page_size_pts[1] * dpi / 72.0)
+    x0, y0, x1, y1 = box
+    crop_x, crop_y = int(width_px * x0), int(height_px * y0)
+    crop_w, crop_h = max(1, int(width_px * x1) - crop_x), max(1, int(height_px * y1) - crop_y)
+
+    cmd = [get_poppler_binary("pdftoppm"), "-f", str(page), "-l", str(page), "-r", str(dpi),
+           "-x", str(crop_x), "-y", str(crop_y), "-W", str(crop_w), "-H", str(crop_h)]
+    if grayscale:
+        cmd.append("-gray")
+    cmd.append(pdf_path)  # Sin raíz de salida: pdftoppm escribe la imagen PPM/PGM en stdout
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=_PDFTOPPM_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise PopplerError(f"No se pudo ejecutar '{cmd[0]}' al renderizar región de '{pdf_path}': {e}") from e
+    if proc.returncode != 0 or not proc.stdout:
+        raise PopplerError(f"pdftoppm falló ({proc.returncode}) al renderizar región de '{pdf_path}': {proc.stderr.decode(errors='replace').strip()}")
+    return proc.stdout
+
+
+def render_region(pdf_path: str, box: RelativeBox, dpi: int, page: int = 1, grayscale: bool = True,
+                  page_size_pts: Optional[Tuple[float, float]] = None) -> Image.Image:
+    """
+    Rasteriza solo la región `box` (fracciones de la página) de `page` (base 1) con pdftoppm -x/-y/-W/-H,
+    en escala de grises si se pide. Poppler no dibuja el resto de la página, así que el coste y la memoria
+    son proporcionales al área de la región y no a la de la página completa.
+    """
+    img = Image.open(BytesIO(_render_region_pnm(pdf_path, box, dpi, page, grayscale, page_size_pts)))
+    img.load()
+    return img
+
+
+def render_region_array(pdf_path: str, box: RelativeBox, dpi: int, page: int = 1, grayscale: bool = True,
+                        page_size_pts: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """
+    Como render_region, pero devuelve un array uint8 que es una vista (sin copia, de solo lectura) de la
+    salida PGM/PPM de pdftoppm: (alto, ancho) en grises o (alto, ancho, 3) en RGB.
+    """
+    data = _render_region_pnm(pdf_path, box, dpi, page, grayscale, page_size_pts)
+    header = _PNM_HEADER_RE.match(data)
+    if not header or int(header.group(4)) != 255:
+        raise PopplerError(f"Salida de pdftoppm no reconocida para '{pdf_path}' (cabecera {data[:20]!r}).")
+    width, height = int(header.group(2)), int(header.group(3))
+    shape = (height, width) if header.group(1) == b"5" else (height, width, 3)
+    return np.frombuffer(data, dtype=np.uint8, count=math.prod(shape), offset=header.end()).reshape(shape)
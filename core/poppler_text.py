@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+from config import settings
+
+_PDFTOTEXT_TIMEOUT_SECONDS = 60
+
+
+class PopplerError(RuntimeError):
+    pass
+
+
+def get_poppler_binary(name: str) -> str:
+    """Ruta al ejecutable de Poppler: dentro de POPPLER_PATH si está configurado, si no se busca en el PATH."""
+    exe_name = f"{name}.exe" if sys.platform.startswith("win") else name
+    poppler_path = getattr(settings, 'POPPLER_PATH', None)
+    return os.path.join(poppler_path, exe_name) if poppler_path else exe_name
+
+
+def _run(cmd: List[str]) -> str:
+    try:
+        proc = subprocess.run(cmd, capture_output=True, timeout=_PDFTOTEXT_TIMEOUT_SECONDS)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise PopplerError(f"No se pudo ejecutar '{cmd[0]}': {e}") from e
+    if proc.returncode != 0:
+        raise PopplerError(f"'{cmd[0]}' falló ({proc.returncode}): {proc.stderr.decode(errors='replace').strip()}")
+    return proc.stdout.decode("utf-8", errors="replace")
+
+
+def pdf_info(pdf_path: str) -> Dict[str, str]:
+    """Campos de `pdfinfo` ("Pages", "Encrypted", ...). Lanza PopplerError si el PDF no se puede abrir (p. ej. con contraseña)."""
+    info = {}
+    for line in _run([get_poppler_binary("pdfinfo"), pdf_path]).splitlines():
+        key, sep, value = line.partition(":")
+        if sep:
+            info[key.strip()] = value.strip()
+    return info
+
+
+def extract_page_text(pdf_path: str, page: int, layout: bool = False) -> str:
+    """Texto de la página `page` (base 1) con pdftotext (extracción nativa de Poppler, escrita a stdout)."""
+    cmd = [get_poppler_binary("pdftotext"), "-f", str(page), "-l", str(page), "-enc", "UTF-8"]
+    if layout:
+        cmd.append("-layout")
+    return _run(cmd + [pdf_path, "-"]).replace("\f", "")
+
+
+def get_page_count(info: Dict[str, str]) -> Optional[int]:
+    try:
+        return int(info["Pages"])
+    except (KeyError, ValueError):
+        return None
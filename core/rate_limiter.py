@@ -0,0 +1,95 @@
+import asyncio
+import email.utils
+import time
+from typing import Callable, Dict, Mapping, Optional
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Segundos de espera pedidos por el servidor: `retry-after-ms`, o `Retry-After` en segundos o como fecha HTTP."""
+    if not headers:
+        return None
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        try:
+            return max(0.0, float(retry_ms) / 1000.0)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        retry_date = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_date.timestamp() - time.time())
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket compartido por todas las peticiones a la API, para usar dentro de un único bucle asyncio.
+    Adaptativo (AIMD): cada respuesta 429 reduce la tasa a la mitad (sin bajar de `min_rate`) y, si trae
+    Retry-After, cierra el bucket hasta ese momento para todas las peticiones; cada éxito recupera
+    `recovery_step` peticiones/s hasta volver a la tasa configurada. Las esperas son `asyncio.sleep`:
+    no bloquean ningún hilo.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: Optional[float] = None, recovery_step: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 16
+        self.recovery_step = float(recovery_step) if recovery_step else self.max_rate / 10
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._last_refill = clock()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()  # Orden FIFO entre las peticiones que esperan
+        self.acquired = 0
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.acquired += 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        now = self._clock()
+        self._refill(now)
+        self.rate_limited += 1
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0)  # Sin ráfaga tras un 429: las siguientes peticiones van a la nueva tasa
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            self._refill(self._clock())
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "acquired": self.acquired,
+            "rate_limited": self.rate_limited,
+            "rate": round(self.rate, 3),
+            "waited_seconds": round(self.waited_seconds, 2),
+        }
@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Any, Dict
+
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+
+class SQLiteCache:
+    """
+    Caché clave -> valor JSON persistida en SQLite, con expulsión por tamaño (se eliminan primero
+    las entradas usadas hace más tiempo) y, opcionalmente, por antigüedad (`ttl_seconds` desde que se
+    escribió la entrada). Es segura para usarse desde varios hilos de la GUI.
+    """
+
+    def __init__(self, db_path: str, table: str, max_bytes: int, ttl_seconds: Optional[float] = None):
+        self.db_path = db_path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_access ON {self.table}(last_access)")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_created ON {self.table}(created_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            with self._conn:
+                if self.ttl_seconds and row[1] < now - self.ttl_seconds:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+                self._conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            app_logger.warning(f"Entrada corrupta en caché '{self.table}' para clave {key[:12]}...; se ignora.")
+            return None
+
+    def set(self, key: str, value: Any):
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode('utf-8')), now, now),
+            )
+            self._evict_if_needed()
+
+    def _evict_if_needed(self):
+        # Debe llamarse con el lock adquirido y dentro de una transacción
+        if self.ttl_seconds:
+            removed = self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,)).rowcount
+            if removed:
+                self.expired += removed
+                app_logger.debug(f"Caché '{self.table}': {removed} entradas caducadas eliminadas.")
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        app_logger.debug(f"Caché '{self.table}': {evicted} entradas expulsadas por tamaño.")
+
+    def purge(self):
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+        with self._lock:
+            self._conn.execute("VACUUM")
+        app_logger.info(f"Caché '{self.table}' purgada ({self.db_path}).")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, total = self._conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}").fetchone()
+            stats = {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+            if self.ttl_seconds:
+                stats["expired"] = self.expired
+            return stats
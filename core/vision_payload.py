@@ -0,0 +1,119 @@
+"""
+Construcción de la imagen que se envía a la IA de visión: qué parte de la página (completa, banda de
+cabecera o solo las regiones de campos de la plantilla, solo con ENABLE_LAYOUT_TEMPLATES), en grises o no, a qué tamaño máximo y con qué
+codificación (PNG, JPEG o WebP con calidad configurable). Ajustes VISION_PAYLOAD_* y VISION_MAX_DIM.
+"""
+import base64
+import time
+from io import BytesIO
+from typing import NamedTuple, Optional, Tuple
+from PIL import Image, features
+
+from config import settings
+from core.layout_templates import get_template
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+PAYLOAD_REGIONS = ("full", "header", "fields")
+PAYLOAD_FORMATS = ("png", "jpeg", "webp")
+DEFAULT_HEADER_FRACTION = 0.4 # Banda superior a enviar si el tipo de documento no tiene plantilla
+FIELDS_GAP = 12 # Píxeles blancos entre regiones apiladas
+_MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+# Frase que se añade al prompt de visión para que el modelo sepa qué está viendo
+REGION_NOTES = {
+    "full": "",
+    "header": "La imagen muestra solo la parte superior del documento, donde están la cabecera y los datos del paciente.",
+    "fields": "La imagen contiene solo recortes de las zonas de campos del documento, apilados de arriba abajo "
+              "(el primero suele ser la esquina superior derecha, con el número manuscrito).",
+}
+
+
+class VisionPayloadOptions(NamedTuple):
+    region: str = "full"
+    grayscale: bool = False
+    image_format: str = "png"
+    quality: int = 85
+    max_dim: int = 1280
+
+    @classmethod
+    def from_settings(cls) -> "VisionPayloadOptions":
+        return cls(
+            region=getattr(settings, 'VISION_PAYLOAD_REGION', "full"),
+            grayscale=bool(getattr(settings, 'VISION_PAYLOAD_GRAYSCALE', False)),
+            image_format=str(getattr(settings, 'VISION_PAYLOAD_FORMAT', "png")).lower(),
+            quality=int(getattr(settings, 'VISION_PAYLOAD_QUALITY', 85)),
+            max_dim=int(getattr(settings, 'VISION_MAX_DIM', 1280)),
+        ).validated()
+
+    def validated(self) -> "VisionPayloadOptions":
+        if self.region not in PAYLOAD_REGIONS:
+            raise ValueError(f"Región de imagen de visión no válida: '{self.region}' (opciones: {PAYLOAD_REGIONS})")
+        if self.image_format not in PAYLOAD_FORMATS:
+            raise ValueError(f"Formato de imagen de visión no válido: '{self.image_format}' (opciones: {PAYLOAD_FORMATS})")
+        if not 1 <= self.quality <= 100:
+            raise ValueError(f"La calidad de la imagen de visión debe estar entre 1 y 100 (valor: {self.quality})")
+        if self.image_format == "webp" and not features.check("webp"):
+            app_logger.warning("Pillow no tiene soporte WebP; la imagen de visión se codificará como JPEG.")
+            return self._replace(image_format="jpeg")
+        return self
+
+    def describe(self) -> str:
+        quality = f"@{self.quality}" if self.image_format != "png" else ""
+        return f"{self.region}/{'gris' if self.grayscale else 'color'}/{self.image_format}{quality}/max{self.max_dim}"
+
+
+class VisionPayload(NamedTuple):
+    data_url: str
+    num_bytes: int           # Bytes de la imagen codificada (el base64 ocupa ~4/3)
+    size: Tuple[int, int]
+    encode_seconds: float    # Recorte + conversión + redimensión + codificación
+    region_note: str
+
+
+def _select_region(image: Image.Image, region: str, doc_type: Optional[str]) -> Image.Image:
+    template = get_template(doc_type)
+    if region == "full":
+        return image
+    width, height = image.size
+    if region == "fields" and template and template.regions:
+        crops = [image.crop(field.pixel_box(width, height)) for field in template.regions]
+        stacked = Image.new(image.mode, (max(c.width for c in crops), sum(c.height for c in crops) + FIELDS_GAP * (len(crops) - 1)), "white")
+        y = 0
+        for crop in crops:
+            stacked.paste(crop, (0, y))
+            y += crop.height + FIELDS_GAP
+        return stacked
+    # "header" (o "fields" sin plantilla): banda superior que cubre todas las regiones de la plantilla
+    bottom = max(field.box[3] for field in template.regions) if template and template.regions else DEFAULT_HEADER_FRACTION
+    return image.crop((0, 0, width, min(height, int(height * bottom))))
+
+
+def build_vision_payload(image: Image.Image, options: VisionPayloadOptions, doc_type: Optional[str] = None) -> VisionPayload:
+    """Imagen lista para el mensaje de visión (data URL base64). La imagen de entrada no se modifica."""
+    start = time.perf_counter()
+    if not getattr(settings, 'ENABLE_LAYOUT_TEMPLATES', False):
+        region = "full" # Las cajas de las plantillas no están calibradas: sin plantillas activadas no se recorta
+    else:
+        region = options.region if options.region != "fields" or get_template(doc_type) else "header"
+    payload_img = _select_region(image, region, doc_type)
+    if options.grayscale and payload_img.mode != "L":
+        payload_img = payload_img.convert("L")
+    elif not options.grayscale and payload_img.mode not in ("RGB", "L"):
+        payload_img = payload_img.convert("RGB")
+    width, height = payload_img.size
+    if max(width, height) > options.max_dim:
+        scale = options.max_dim / max(width, height)
+        # reducing_gap: primero una reducción entera barata y luego LANCZOS sobre la imagen ya pequeña
+        payload_img = payload_img.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    buffered = BytesIO()
+    if options.image_format == "png":
+        payload_img.save(buffered, format="PNG")
+    elif options.image_format == "jpeg":
+        payload_img.save(buffered, format="JPEG", quality=options.quality, optimize=False)
+    else:
+        payload_img.save(buffered, format="WEBP", quality=options.quality, method=4)
+    encoded = buffered.getvalue()
+    data_url = f"data:{_MIME_TYPES[options.image_format]};base64,{base64.b64encode(encoded).decode('ascii')}"
+    return VisionPayload(data_url, len(encoded), payload_img.size, time.perf_counter() - start, REGION_NOTES[region])
@@ -3,19 +3,32 @@ from tkinter import filedialog, messagebox, ttk
 import threading
 import os
 import logging
-from typing import List, Dict, Optional
+import queue
+import time
+import concurrent.futures
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
 
 from PIL import Image, ImageTk # Para la vista previa de imagen
-from pdf2image import convert_from_path # Para obtener la imagen para vista previa y HTR/Visión
 
 from utils.logger import get_app_logger
 from core.pdf_processor import PDFProcessor
 from core.ai_integration import AIIntegrator
 from core.file_manager import FileManager
+from core.page_cache import page_image_cache, preview_image_cache, render_page # Imagen compartida para vista previa, OCR y HTR/Visión
+from core.ocr_cache import get_ocr_cache
+from core.ai_cache import get_ai_cache
+from core.ai_race import RaceEntrant, race_extractors
+from core.image_preprocessing import preprocessing_stats
+from core.ocr_pool import OCRWorkerPool, resolve_worker_settings
+from core.pipeline import StagedPipeline, PipelineStage
+from utils.startup_timer import startup_timer
 from config import settings
 
 app_logger = get_app_logger()
 
+UI_QUEUE_POLL_MS = 50 # Cada cuánto el hilo de Tk aplica las actualizaciones encoladas por los hilos de trabajo
+
 class AppGUI:
     def __init__(self, root_tk: tk.Tk):
         self.root = root_tk
@@ -23,19 +36,47 @@ class AppGUI:
         self.root.geometry("1100x750") # Más ancho para la vista previa
 
         self.pdf_processor: Optional[PDFProcessor] = None
+        self.ocr_pool: Optional[OCRWorkerPool] = None # Solo si OCR_WORKERS != 1
+        self.processing_pipeline: Optional[StagedPipeline] = None # Solo mientras se procesa en modo pipeline
         self.ai_integrator = AIIntegrator()
         self.file_manager = FileManager()
 
         self.selected_files: List[str] = []
         self.is_processing = False
+        # Tkinter no es seguro entre hilos: los hilos de trabajo (inicialización, etapas del pipeline, logging)
+        # encolan aquí sus cambios de widgets y el hilo de Tk los aplica (ver _call_in_ui / _drain_ui_queue)
+        self._ui_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._window_open = threading.Event()
+        self._window_open.set()
+        self.root.bind("<Destroy>", self._on_root_destroy, add="+")
 
         # Para la vista previa de imagen
         self.current_preview_pil_image: Optional[Image.Image] = None
         self.current_preview_tk_image: Optional[ImageTk.PhotoImage] = None
 
         self._setup_ui()
+        self.root.after(UI_QUEUE_POLL_MS, self._drain_ui_queue)
         self._initialize_ocr_engine_async()
 
+    def _on_root_destroy(self, event):
+        if event.widget is self.root: self._window_open.clear()
+
+    def _call_in_ui(self, func, *args):
+        """Encola `func(*args)` para el hilo de Tk. Se puede llamar desde cualquier hilo."""
+        if self._window_open.is_set(): self._ui_queue.put((func, args))
+
+    def _set_status(self, message: str):
+        self._call_in_ui(self.status_var.set, message)
+
+    def _drain_ui_queue(self):
+        while True:
+            try: func, args = self._ui_queue.get_nowait()
+            except queue.Empty: break
+            try: func(*args)
+            except tk.TclError: pass # Widget destruido mientras la actualización esperaba
+            except Exception as e: app_logger.debug(f"Error aplicando actualización de la GUI: {e}")
+        if self._window_open.is_set(): self.root.after(UI_QUEUE_POLL_MS, self._drain_ui_queue)
+
     def _initialize_ocr_engine_async(self):
         # ... (sin cambios desde la última versión) ...
         self.status_var.set("Inicializando motor OCR (EasyOCR)... Esto puede tardar unos segundos.")
@@ -44,24 +85,33 @@ class AppGUI:
         def init_task():
             try:
                 self.pdf_processor = PDFProcessor()
+                if getattr(settings, 'OCR_WARMUP_ENABLED', True): self.pdf_processor.warm_up()
+                num_workers, torch_threads = resolve_worker_settings()
+                if num_workers > 1:
+                    # El lector del proceso principal se conserva para HTR; el OCR de página completa va al pool
+                    self.ocr_pool = OCRWorkerPool(num_workers, torch_threads)
                 if self.pdf_processor and self.pdf_processor.reader:
-                    self.status_var.set("Motor OCR listo. Seleccione archivos y tipo de documento.")
-                    app_logger.info("Motor OCR (EasyOCR) inicializado desde la GUI.")
-                    if self.process_button.winfo_exists(): self.process_button.config(state=tk.NORMAL)
+                    self._set_status("Motor OCR listo. Seleccione archivos y tipo de documento.")
+                    app_logger.info(f"Motor OCR (EasyOCR) inicializado desde la GUI (backend: {self.pdf_processor.ocr_backend}).")
+                    self._call_in_ui(self.process_button.config, {"state": tk.NORMAL})
+                    startup_timer.mark("OCR listo")
+                    startup_timer.log_report()
                 else:
-                    self.status_var.set("ERROR: Motor OCR no pudo inicializar. Revise logs.")
-                    messagebox.showerror("Error OCR", "No se pudo inicializar EasyOCR. La funcionalidad OCR no estará disponible. Revise 'ocrename_activity.log'.")
+                    self._set_status("ERROR: Motor OCR no pudo inicializar. Revise logs.")
+                    self._call_in_ui(messagebox.showerror, "Error OCR", "No se pudo inicializar EasyOCR. La funcionalidad OCR no estará disponible. Revise 'ocrename_activity.log'.")
             except Exception as e:
-                self.status_var.set("ERROR CRÍTICO: Inicialización de OCR falló.")
+                self._set_status("ERROR CRÍTICO: Inicialización de OCR falló.")
                 app_logger.critical(f"Error crítico inicializando PDFProcessor: {e}", exc_info=True)
-                messagebox.showerror("Error Crítico OCR", f"Error al inicializar el motor OCR: {e}\nLa aplicación podría no funcionar correctamente.")
+                self._call_in_ui(messagebox.showerror, "Error Crítico OCR", f"Error al inicializar el motor OCR: {e}\nLa aplicación podría no funcionar correctamente.")
+            # Crear también el cliente de IA en segundo plano, para que no lo pague el primer documento
+            self.ai_integrator.is_api_configured_and_client_valid()
         
         threading.Thread(target=init_task, daemon=True).start()
 
 
     def _update_api_status_label(self):
         # ... (sin cambios) ...
-        if self.ai_integrator.is_api_configured_and_client_valid():
+        if self.ai_integrator.is_api_key_configured():
             self.api_status_var.set("DeepSeek/Llama (OpenRouter): API Key Configurada")
             self.api_status_label.config(foreground="green")
         else:
@@ -163,20 +213,24 @@ class AppGUI:
     def _add_gui_log_handler(self):
         # ... (sin cambios) ...
         class GUILogHandler(logging.Handler):
-            def __init__(self, text_widget):
+            # Los registros llegan desde cualquier hilo: el texto se escribe en el widget desde el hilo de Tk
+            def __init__(self, text_widget, call_in_ui):
                 super().__init__()
                 self.text_widget = text_widget
+                self.call_in_ui = call_in_ui
                 self.formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%H:%M:%S')
 
             def emit(self, record):
-                msg = self.format(record)
+                self.call_in_ui(self._append, self.format(record))
+
+            def _append(self, msg: str):
                 if self.text_widget.winfo_exists():
                     self.text_widget.config(state=tk.NORMAL)
                     self.text_widget.insert(tk.END, msg + "\n")
                     self.text_widget.see(tk.END)
                     self.text_widget.config(state=tk.DISABLED)
         
-        gui_handler = GUILogHandler(self.log_text)
+        gui_handler = GUILogHandler(self.log_text, self._call_in_ui)
         gui_handler.setLevel(logging.INFO) 
         app_logger.addHandler(gui_handler)
 
@@ -227,10 +281,11 @@ class AppGUI:
     def _load_and_display_first_pdf_page(self, filepath: str):
         """Carga la primera página de un PDF y la muestra."""
         try:
-            poppler_path_setting = settings.POPPLER_PATH if hasattr(settings, 'POPPLER_PATH') else None
-            images = convert_from_path(filepath, first_page=1, last_page=1, poppler_path=poppler_path_setting, dpi=150) # DPI más bajo para vista previa rápida
-            if images:
-                self.current_preview_pil_image = images[0]
+            # En color aunque la caché compartida guarde grises (PAGE_RENDER_GRAYSCALE); si no, la vista previa reutiliza su render
+            preview_cache = preview_image_cache if page_image_cache.grayscale else page_image_cache
+            preview_image = preview_cache.get_page(filepath, page=1, dpi=150) # DPI más bajo para vista previa rápida
+            if preview_image:
+                self.current_preview_pil_image = preview_image
                 self._display_preview_image(self.current_preview_pil_image)
             else:
                 app_logger.warning(f"No se pudo convertir PDF para vista previa: {filepath}")
@@ -301,11 +356,12 @@ class AppGUI:
 
 
     def _update_ocr_progress_callback(self, value: int):
-        # ... (sin cambios) ...
-        if self.root.winfo_exists():
-            self.ocr_progressbar['value'] = value
-            self.ocr_progress_var.set(f"{value}%")
-            self.root.update_idletasks()
+        # Llamado desde el hilo de procesamiento
+        self._call_in_ui(self._show_ocr_progress, value)
+
+    def _show_ocr_progress(self, value: int):
+        self.ocr_progressbar['value'] = value
+        self.ocr_progress_var.set(f"{value}%")
 
     def _update_overall_progress_label(self, current, total):
         # ... (sin cambios) ...
@@ -340,6 +396,10 @@ class AppGUI:
                 self.process_button.config(state=tk.DISABLED)
 
 
+    def _show_overall_progress(self, completed: int, total: int):
+        self.overall_progressbar['value'] = completed
+        self._update_overall_progress_label(completed, total)
+
     def _start_processing_thread(self):
         # ... (sin cambios) ...
         if not self.selected_files:
@@ -355,158 +415,518 @@ class AppGUI:
         self._toggle_controls(True)
         self.status_var.set("Iniciando procesamiento...")
         
-        processing_thread = threading.Thread(target=self._process_files_logic, daemon=True)
+        processing_thread = threading.Thread(target=self._process_files_logic, args=(self.doc_type_var.get(), list(self.selected_files)), daemon=True)
         processing_thread.start()
 
 
-    def _process_files_logic(self):
-        selected_doc_type = self.doc_type_var.get()
+    def _process_files_logic(self, selected_doc_type: str, files_to_process: List[str]):
+        # Hilo de procesamiento: los widgets solo se tocan a través de _call_in_ui
         app_logger.info(f"Tipo de documento seleccionado para procesar: {selected_doc_type}")
 
-        total_files = len(self.selected_files)
+        total_files = len(files_to_process)
         if total_files == 0:
-            if self.root.winfo_exists(): self._toggle_controls(False)
-            self.status_var.set("No hay archivos seleccionados para procesar.")
+            self._call_in_ui(self._toggle_controls, False)
+            self._set_status("No hay archivos seleccionados para procesar.")
             return
 
-        self.overall_progressbar['maximum'] = total_files
-        files_to_process = list(self.selected_files)
+        self._call_in_ui(self.overall_progressbar.config, {"maximum": total_files})
+        self.completed_files = 0
+        self.batch_total_files = total_files
+        self._progress_lock = threading.Lock()
+        self.ai_race_stats = Counter()
+        self._ai_race_lock = threading.Lock()
+        self._held_jobs: List[dict] = [] # Incompletos con un circuito de IA abierto; se reintentan al final (ver _retry_held_jobs)
+        self._hold_enabled = getattr(settings, 'AI_CIRCUIT_HOLD_MAX_SECONDS', 300) > 0
+
+        # Un "job" por documento: acumula lo que cada etapa produce para las siguientes
+        jobs = [{"index": i, "filepath": fp, "filename": os.path.basename(fp), "doc_type": selected_doc_type, "total": total_files,
+                 "text": None, "method": None, "data": None, "source": None, "first_page_image": None, "ocr_future": None}
+                for i, fp in enumerate(files_to_process)]
+        # Con pool de procesos, todos los PDFs se despachan de entrada y se consumen en orden
+        if self.ocr_pool:
+            for job in jobs: job["ocr_future"] = self.ocr_pool.submit(job["filepath"], job["doc_type"])
+
+        stage_funcs = [("rasterize", self._stage_rasterize), ("ocr", self._stage_ocr), ("fields", self._stage_extract_fields),
+                       ("ai", self._stage_ai_fallback), ("commit", self._stage_commit)]
+
+        if getattr(settings, 'PIPELINE_ENABLED', False):
+            stage_workers = getattr(settings, 'PIPELINE_STAGE_WORKERS', {}) or {}
+            queue_size = getattr(settings, 'PIPELINE_QUEUE_SIZE', 4)
+            ocr_batch_size = getattr(settings, 'OCR_BATCH_SIZE', 1)
+            ai_batch_size = getattr(settings, 'AI_TEXT_BATCH_SIZE', 1)
+            batch_funcs, batch_sizes, batch_timeouts = {}, {}, {}
+            if ocr_batch_size > 1 and not self.ocr_pool: # Con pool, cada worker ya hace su propio OCR
+                batch_funcs.update({"ocr": self._stage_ocr_batch, "fields": self._stage_extract_fields_batch})
+                batch_sizes.update({"ocr": ocr_batch_size, "fields": ocr_batch_size})
+            if ai_batch_size > 1: # Varios documentos incompletos por petición de IA de texto
+                batch_funcs["ai"], batch_sizes["ai"] = self._stage_ai_fallback_batch, ai_batch_size
+                batch_timeouts["ai"] = getattr(settings, 'AI_TEXT_BATCH_TIMEOUT_SECONDS', 2.0)
+            batch_timeout = getattr(settings, 'OCR_BATCH_TIMEOUT_SECONDS', 0.5)
+            stages = [PipelineStage(name, batch_funcs.get(name, func), workers=stage_workers.get(name, 1), queue_size=queue_size,
+                                    batch_size=batch_sizes.get(name, 1), batch_timeout=batch_timeouts.get(name, batch_timeout))
+                      for name, func in stage_funcs]
+            if self.ocr_pool: stages[1].workers = max(stages[1].workers, self.ocr_pool.num_workers)
+            self.processing_pipeline = StagedPipeline(stages, on_item_error=self._on_pipeline_job_error)
+            app_logger.info(f"Procesando {total_files} archivos en pipeline por etapas: " + ", ".join(f"{s.name}x{s.workers}" for s in stages))
+            self.processing_pipeline.run(jobs)
+            self.processing_pipeline = None
+        else:
+            for job in jobs:
+                if not self._window_open.is_set():
+                    app_logger.info("Ventana de GUI cerrada, deteniendo procesamiento.")
+                    break
+                self._run_stages_serially(job, stage_funcs)
+        if self._held_jobs: self._retry_held_jobs([(name, func) for name, func in stage_funcs if name in ("ai", "commit")])
+
+        # Fin del bucle de procesamiento
+        app_logger.info(f"Caché de páginas: {page_image_cache.stats()}")
+        ocr_cache = get_ocr_cache()
+        if ocr_cache: app_logger.info(f"Caché OCR: {ocr_cache.stats()}")
+        ai_cache = get_ai_cache()
+        if ai_cache: app_logger.info(f"Caché IA: {ai_cache.stats()}")
+        for profile_name, profile_stats in preprocessing_stats().items(): app_logger.info(f"Preprocesamiento ({profile_name}): {profile_stats}")
+        if self.ai_integrator.stats(): app_logger.info(f"Límite de tasa de la IA: {self.ai_integrator.stats()}")
+        if self.ai_integrator.health_stats(): app_logger.info(f"Salud de modelos de IA: {self.ai_integrator.health_stats()}")
+        if self.ai_integrator.batch_stats(): app_logger.info(f"Lotes de IA de texto: {self.ai_integrator.batch_stats()}")
+        if self.ai_integrator.stream_stats(): app_logger.info(f"Streaming de IA: {self.ai_integrator.stream_stats()}")
+        if self.ai_race_stats: app_logger.info(f"Carreras de IA (visión/texto): {dict(self.ai_race_stats)}")
+        if self.ai_integrator.vision_stats(): app_logger.info(f"Imágenes para IA de visión: {self.ai_integrator.vision_stats()}")
+        if self.ai_integrator.compaction_stats(): app_logger.info(f"Compactación de prompts de IA de texto: {self.ai_integrator.compaction_stats()}")
+        if self.pdf_processor and self.pdf_processor.orientation_stats: app_logger.info(f"Orientación (páginas por corrección): {dict(self.pdf_processor.orientation_stats)}")
+        if self.pdf_processor and self.pdf_processor.dpi_ladder_stats: app_logger.info(f"Escalera DPI (documentos por peldaño): {dict(self.pdf_processor.dpi_ladder_stats)}")
+        if self._window_open.is_set():
+            self._call_in_ui(self._finish_processing, total_files)
+        else:
+            app_logger.info("Procesamiento completado pero la ventana de GUI ya no existe.")
 
-        for i, filepath in enumerate(files_to_process):
-            if not self.root.winfo_exists():
+    def _run_stages_serially(self, job: dict, stage_funcs: List[Tuple[str, object]]):
+        for stage_name, stage_func in stage_funcs:
+            try:
+                job = stage_func(job)
+            except Exception as e_stage:
+                app_logger.error(f"Error en etapa '{stage_name}' para {job['filename']}: {e_stage}", exc_info=True)
+                self._on_pipeline_job_error(stage_name, job, e_stage)
+                job = None
+            if job is None: break
+
+    def _retry_held_jobs(self, stage_funcs: List[Tuple[str, object]]):
+        """
+        Segunda y última pasada por la IA para los documentos retenidos por un circuito abierto: espera a que
+        los circuitos admitan la petición de prueba (como mucho AI_CIRCUIT_HOLD_MAX_SECONDS) y, si siguen
+        incompletos después, van a fallidos como antes.
+        """
+        held_jobs, self._held_jobs = self._held_jobs, []
+        self._hold_enabled = False
+        wait_seconds = self.ai_integrator.circuit_wait_seconds() or 0.0
+        hold_max_seconds = float(getattr(settings, 'AI_CIRCUIT_HOLD_MAX_SECONDS', 300))
+        if wait_seconds > hold_max_seconds:
+            app_logger.warning(f"Los circuitos de IA siguen abiertos {wait_seconds:.0f}s más (máximo {hold_max_seconds:.0f}s): "
+                               f"{len(held_jobs)} documento(s) retenido(s) se reintentan sin esperar.")
+            wait_seconds = 0.0
+        if wait_seconds:
+            app_logger.info(f"Esperando {wait_seconds:.0f}s a que se cierren los circuitos de IA para reintentar {len(held_jobs)} documento(s) retenido(s).")
+            self._set_status(f"Esperando a la IA ({wait_seconds:.0f}s) para {len(held_jobs)} documento(s) retenido(s)...")
+            deadline = time.monotonic() + wait_seconds
+            while time.monotonic() < deadline and self._window_open.is_set():
+                time.sleep(min(0.5, max(0.0, deadline - time.monotonic())))
+        for job in held_jobs:
+            if not self._window_open.is_set():
                 app_logger.info("Ventana de GUI cerrada, deteniendo procesamiento.")
                 break
-            
-            filename = os.path.basename(filepath)
-            # Actualizar vista previa al archivo actual si la GUI aún existe
-            if self.root.winfo_exists():
-                 self.root.after(0, self._load_and_display_first_pdf_page, filepath) # Usar after para actualizar desde hilo
-
-            self.current_file_var.set(f"{filename} ({i+1}/{total_files})")
-            self.ocr_progressbar['value'] = 0
-            # ... (resto de la lógica de _process_files_logic como en la respuesta anterior,
-            #      incluyendo la llamada a get_data_with_text_ai y get_data_with_vision_ai
-            #      basándose en selected_doc_type y si los datos están completos) ...
-            # Asegúrate de que la lógica de qué IA llamar y cuándo esté bien definida.
-
-            # --- COMIENZO DE LA LÓGICA DE PROCESAMIENTO DETALLADA (como antes) ---
-            app_logger.info(f"--- Procesando archivo: {filename} ---")
-            self.status_var.set(f"Extrayendo texto de {filename}...")
-
-            extracted_text, text_extraction_method = self.pdf_processor.extract_text_from_pdf(filepath, self._update_ocr_progress_callback)
-            if not extracted_text and selected_doc_type == "pendiente_impreso": # Si es impreso y no hay texto, es un problema mayor
-                app_logger.error(f"No se pudo extraer texto de {filename} (tipo impreso, método: {text_extraction_method}). Se moverá a fallidos.")
-                self.file_manager.move_to_failed(filepath)
-                self.overall_progressbar['value'] = i + 1
-                continue
-            elif not extracted_text and selected_doc_type == "entregado_manuscrito":
-                app_logger.warning(f"No se pudo extraer texto OCR de página completa de {filename} (tipo manuscrito). Se intentará con IA de Visión si es posible.")
-                # No continuamos, dejaremos que la IA de Visión lo intente con la imagen.
-
-            # Actualizar status_var solo si la GUI existe
-            if self.root.winfo_exists(): self.status_var.set(f"Analizando datos de {filename}...")
-
-            # PASO 2: Extracción de datos impresos (ID, Nombre)
-            extracted_data = {}
-            if extracted_text: # Solo intentar regex si hay texto
-                extracted_data = self.pdf_processor.extract_printed_data_from_text(extracted_text)
-            else: # Inicializar con Nones si no hubo texto para regex
-                extracted_data = {"id_type": None, "id_number": None, "acta_no": None}
-
-            final_data_source = "PrintedRegex" if extracted_text else "NoTextForRegex"
-
-
-            # PASO 3: Lógica específica para el número de acta y/o IA de Visión
-            first_page_pil_image = None # Para IA de visión o HTR de ROI
-
-            if selected_doc_type == "entregado_manuscrito":
-                app_logger.info(f"Documento tipo 'Entregado con Manuscrito' para {filename}.")
-                try:
-                    poppler_path_setting = settings.POPPLER_PATH if hasattr(settings, 'POPPLER_PATH') else None
-                    temp_images = convert_from_path(filepath, first_page=1, last_page=1, poppler_path=poppler_path_setting, dpi=200) # Mejor DPI para HTR/Visión
-                    if temp_images:
-                        first_page_pil_image = temp_images[0]
-                except Exception as e_img_load:
-                    app_logger.error(f"No se pudo cargar imagen para acta manuscrita/visión de {filename}: {e_img_load}", exc_info=True)
-
-                if first_page_pil_image:
-                    # Intento 1 para "entregado_manuscrito": HTR de ROI
-                    handwritten_acta_roi = self.pdf_processor.extract_handwritten_acta_number(first_page_pil_image)
-                    if handwritten_acta_roi:
-                        extracted_data["acta_no"] = handwritten_acta_roi
-                        final_data_source += "/HandwrittenROI"
-                        app_logger.info(f"Número de acta de ROI manuscrita '{handwritten_acta_roi}' usado para {filename}.")
-                    
-                    # Intento 2 para "entregado_manuscrito": IA de Visión (si ROI HTR falló o para todos los campos)
-                    # Decidimos si usar Vision AI siempre o como fallback. Aquí como fallback si datos incompletos.
-                    data_complete_after_roi = all(extracted_data.get(key) for key in ["id_type", "id_number", "acta_no"])
-                    if (not data_complete_after_roi or extracted_data.get("acta_no") is None) and \
-                       self.ai_integrator.is_api_configured_and_client_valid() and self.ai_integrator.vision_model_name:
-                        
-                        if self.root.winfo_exists(): self.status_var.set(f"Consultando IA de Visión para {filename}...")
-                        vision_ai_data = self.ai_integrator.get_data_with_vision_ai(first_page_pil_image, filename)
-                        if vision_ai_data:
-                            app_logger.info(f"IA de Visión devolvió: {vision_ai_data}")
-                            # La IA de visión podría rellenar todos los campos.
-                            # Darle prioridad si devuelve algo.
-                            for key_v in ["id_type", "id_number", "acta_no"]:
-                                if vision_ai_data.get(key_v) is not None:
-                                    extracted_data[key_v] = vision_ai_data.get(key_v)
-                            final_data_source = "VisionAI" # Asumir que si se usa, es la fuente principal
-                            app_logger.info(f"Datos para '{filename}' actualizados por IA de Visión: {extracted_data}")
-                        else:
-                            app_logger.warning(f"IA de Visión no pudo extraer datos para {filename}.")
-                else:
-                    app_logger.warning(f"No se pudo obtener imagen para HTR/Visión en {filename} (tipo manuscrito).")
+            app_logger.info(f"Reintentando IA para el documento retenido '{job['filename']}'.")
+            self._run_stages_serially(job, stage_funcs)
+
+    def _hold_for_open_circuit(self, job: dict) -> bool:
+        """Retiene un documento incompleto mientras algún circuito de IA está abierto, en vez de moverlo a fallidos."""
+        if not self._hold_enabled or self.ai_integrator.circuit_wait_seconds() is None: return False
+        with self._progress_lock:
+            self._held_jobs.append(job)
+        app_logger.warning(f"Datos incompletos para '{job['filename']}' con un circuito de IA abierto: se retiene para reintentarlo al final del lote.")
+        return True
+
+    def _finish_processing(self, total_files: int):
+        self._toggle_controls(False)
+        self.status_var.set(f"Procesamiento completado. {total_files} archivos procesados.")
+        self.current_file_var.set("N/A")
+        self._update_overall_progress_label(total_files, total_files)
+        messagebox.showinfo("Completado", f"Procesamiento finalizado.\nArchivos renombrados en: {self.file_manager.renamed_dir}\nArchivos fallidos en: {self.file_manager.failed_dir}")
+        self.selected_files.clear()
+        self._update_files_listbox() # Esto limpiará la vista previa también
+
+    def _is_pipeline_mode(self) -> bool:
+        return self.processing_pipeline is not None
+
+    def _mark_job_finished(self, job: dict):
+        """Avanza el progreso general; las etapas pueden terminar documentos fuera de orden en modo pipeline."""
+        if self.pdf_processor: self.pdf_processor.forget_document(job["filepath"])
+        with self._progress_lock:
+            self.completed_files += 1
+            completed = self.completed_files
+        self._call_in_ui(self._show_overall_progress, completed, self.batch_total_files)
+
+    def _on_pipeline_job_error(self, stage_name: str, job: dict, error: Exception):
+        app_logger.error(f"Documento '{job['filename']}' abortado en etapa '{stage_name}'. Se moverá a fallidos.")
+        self.file_manager.move_to_failed(job["filepath"])
+        self._mark_job_finished(job)
+
+    # --- Etapas del procesamiento (se ejecutan en serie o como pipeline, ver _process_files_logic) ---
+
+    def _stage_rasterize(self, job: dict) -> Optional[dict]:
+        if not self._window_open.is_set():
+            if self._is_pipeline_mode(): self.processing_pipeline.stop()
+            app_logger.info("Ventana de GUI cerrada, deteniendo procesamiento.")
+            return None
+        filepath, filename = job["filepath"], job["filename"]
+        # Actualizar vista previa al archivo actual si la GUI aún existe
+        self._call_in_ui(self._load_and_display_first_pdf_page, filepath)
+        self._call_in_ui(self.current_file_var.set, f"{filename} ({job['index']+1}/{job['total']})")
+        self._call_in_ui(self._show_ocr_progress, 0)
+        app_logger.info(f"--- Procesando archivo: {filename} ---")
+
+        if job["doc_type"] == "entregado_manuscrito" and not getattr(settings, 'ENABLE_REGION_RENDERING', True):
+            # Sin render por regiones, el HTR necesita la página completa (el OCR la reutiliza desde la caché)
+            job["first_page_image"] = self._load_first_page_image(job)
+        return job
+
+    def _load_first_page_image(self, job: dict) -> Optional[Image.Image]:
+        """Imagen de la 1ra página para HTR/Visión (queda en la caché compartida de páginas)."""
+        try:
+            return page_image_cache.get_page(job["filepath"], page=1, dpi=200) # Mejor DPI para HTR/Visión
+        except Exception as e_img_load:
+            app_logger.error(f"No se pudo cargar imagen para acta manuscrita/visión de {job['filename']}: {e_img_load}", exc_info=True)
+            return None
 
-            # PASO 4: Fallback a IA de Texto si los datos siguen incompletos (para ambos tipos de doc)
-            data_complete_before_text_ai = all(extracted_data.get(key) for key in ["id_type", "id_number", "acta_no"])
+    def _stage_ocr(self, job: dict) -> Optional[dict]:
+        filepath, filename, selected_doc_type = job["filepath"], job["filename"], job["doc_type"]
+        self._set_status(f"Extrayendo texto de {filename}...")
 
-            if not data_complete_before_text_ai and self.ai_integrator.is_api_configured_and_client_valid() and self.ai_integrator.text_model_name:
-                if not extracted_text:
-                    app_logger.warning(f"No hay texto OCR de página completa para enviar a IA de texto para {filename}. Omitiendo IA de texto.")
-                else:
-                    if self.root.winfo_exists(): self.status_var.set(f"Consultando IA de texto para {filename}...")
-                    ai_text_data = self.ai_integrator.get_data_with_text_ai(extracted_text, filename)
-                    if ai_text_data:
-                        app_logger.info(f"IA de Texto devolvió: {ai_text_data}")
-                        for key_t in ["id_type", "id_number", "acta_no"]:
-                            if ai_text_data.get(key_t) is not None and extracted_data.get(key_t) is None: # Solo rellenar si estaba vacío
-                                extracted_data[key_t] = ai_text_data.get(key_t)
-                                final_data_source += "+TextAIComplement"
-                        app_logger.info(f"Datos para '{filename}' complementados por IA de texto: {extracted_data}")
-                    else:
-                        app_logger.warning(f"IA de texto no pudo extraer/mejorar datos para {filename}.")
-            
-            # PASO 5: Verificación final y renombrado
-            new_filename_base = self.file_manager.generate_new_filename(
-                extracted_data.get("id_type"),
-                extracted_data.get("id_number"),
-                extracted_data.get("acta_no"),
-                original_ext=os.path.splitext(filename)[1]
-            )
-
-            if new_filename_base:
-                app_logger.info(f"Datos finales para '{filename}' (fuente: {final_data_source}): {extracted_data}. Nuevo nombre: {new_filename_base}")
-                if self.root.winfo_exists(): self.status_var.set(f"Renombrando {filename}...")
-                self.file_manager.copy_and_rename(filepath, new_filename_base)
+        if job["ocr_future"]:
+            try:
+                extracted_text, text_extraction_method = job["ocr_future"].result()
+            except Exception as e_pool:
+                app_logger.error(f"Worker OCR falló para {filename}: {e_pool}", exc_info=True)
+                extracted_text, text_extraction_method = None, "fallido_ocr_excepcion"
+            job["ocr_future"] = None
+            self._update_ocr_progress_callback(100)
+        else:
+            # En modo pipeline varios documentos comparten la barra; solo se reporta progreso en serie
+            progress_cb = None if self._is_pipeline_mode() else self._update_ocr_progress_callback
+            extracted_text, text_extraction_method = self.pdf_processor.extract_text_from_pdf(filepath, progress_cb, doc_type=selected_doc_type)
+        return self._handle_ocr_result(job, extracted_text, text_extraction_method)
+
+    def _stage_ocr_batch(self, jobs: List[dict]) -> List[Optional[dict]]:
+        """Variante por lotes de _stage_ocr: las páginas de varios documentos se reconocen en una sola llamada."""
+        self._set_status(f"Extrayendo texto de {len(jobs)} archivos (lote)...")
+        batch_results = self.pdf_processor.extract_texts_from_pdfs([job["filepath"] for job in jobs], doc_type=jobs[0]["doc_type"]) # Un lote = un tipo de documento
+        return [self._handle_ocr_result(job, text, method) for job, (text, method) in zip(jobs, batch_results)]
+
+    def _handle_ocr_result(self, job: dict, extracted_text: Optional[str], text_extraction_method: str) -> Optional[dict]:
+        filepath, filename, selected_doc_type = job["filepath"], job["filename"], job["doc_type"]
+        job["text"], job["method"] = extracted_text, text_extraction_method
+
+        if not extracted_text and selected_doc_type == "pendiente_impreso": # Si es impreso y no hay texto, es un problema mayor
+            app_logger.error(f"No se pudo extraer texto de {filename} (tipo impreso, método: {text_extraction_method}). Se moverá a fallidos.")
+            self.file_manager.move_to_failed(filepath)
+            self._mark_job_finished(job)
+            return None
+        elif not extracted_text and selected_doc_type == "entregado_manuscrito":
+            app_logger.warning(f"No se pudo extraer texto OCR de página completa de {filename} (tipo manuscrito). Se intentará con IA de Visión si es posible.")
+            # No continuamos, dejaremos que la IA de Visión lo intente con la imagen.
+        return job
+
+    def _stage_extract_fields(self, job: dict) -> Optional[dict]:
+        self._apply_printed_fields(job)
+        # PASO 3a: HTR de ROI para el número de acta manuscrito
+        if job["doc_type"] == "entregado_manuscrito":
+            app_logger.info(f"Documento tipo 'Entregado con Manuscrito' para {job['filename']}.")
+            if job["first_page_image"]:
+                self._apply_handwritten_acta(job, self.pdf_processor.extract_handwritten_acta_number(job["first_page_image"], job["filepath"]))
+            elif getattr(settings, 'ENABLE_REGION_RENDERING', True):
+                # Solo se rasteriza la caja del acta, no la página completa
+                self._apply_handwritten_acta(job, self.pdf_processor.extract_handwritten_acta_number_from_pdf(job["filepath"]))
             else:
-                app_logger.error(f"No se pudo generar un nombre de archivo válido para '{filename}' (datos cruciales faltantes). Moviendo a fallidos. Datos: {extracted_data}")
-                self.file_manager.move_to_failed(filepath)
-            
-            if self.root.winfo_exists(): self.overall_progressbar['value'] = i + 1
-            self._update_overall_progress_label(i + 1, total_files)
-            # --- FIN DE LA LÓGICA DE PROCESAMIENTO DETALLADA ---
-
+                app_logger.warning(f"No se pudo obtener imagen para HTR/Visión en {job['filename']} (tipo manuscrito).")
+        job["first_page_image"] = None # Si la IA de Visión la necesita, la vuelve a pedir a la caché de páginas
+        return job
+
+    def _stage_extract_fields_batch(self, jobs: List[dict]) -> List[Optional[dict]]:
+        """Variante por lotes de _stage_extract_fields: las ROIs manuscritas de todo el lote van en una sola llamada HTR."""
+        for job in jobs: self._apply_printed_fields(job)
+        htr_jobs = [job for job in jobs if job["doc_type"] == "entregado_manuscrito"]
+        if getattr(settings, 'ENABLE_REGION_RENDERING', True):
+            if htr_jobs:
+                actas = self.pdf_processor.extract_handwritten_acta_numbers_from_pdfs([job["filepath"] for job in htr_jobs])
+                for job, acta in zip(htr_jobs, actas): self._apply_handwritten_acta(job, acta)
+            return jobs
+        for job in htr_jobs:
+            if not job["first_page_image"]:
+                app_logger.warning(f"No se pudo obtener imagen para HTR/Visión en {job['filename']} (tipo manuscrito).")
+        htr_jobs = [job for job in htr_jobs if job["first_page_image"]]
+        if htr_jobs:
+            actas = self.pdf_processor.extract_handwritten_acta_numbers([job["first_page_image"] for job in htr_jobs], [job["filepath"] for job in htr_jobs])
+            for job, acta in zip(htr_jobs, actas): self._apply_handwritten_acta(job, acta)
+        for job in jobs: job["first_page_image"] = None # Mientras el lote espera a la IA, la caché de páginas puede expulsarlas
+        return jobs
+
+    def _apply_handwritten_acta(self, job: dict, handwritten_acta_roi: Optional[str]):
+        if handwritten_acta_roi:
+            job["data"]["acta_no"] = handwritten_acta_roi
+            job["source"] += "/HandwrittenROI"
+            app_logger.info(f"Número de acta de ROI manuscrita '{handwritten_acta_roi}' usado para {job['filename']}.")
+
+    def _apply_printed_fields(self, job: dict):
+        filename, extracted_text = job["filename"], job["text"]
+        # Actualizar status_var solo si la GUI existe
+        self._set_status(f"Analizando datos de {filename}...")
+
+        # PASO 2: Extracción de datos impresos (ID, Nombre)
+        if extracted_text: # Solo intentar regex si hay texto
+            extracted_data = self.pdf_processor.extract_printed_data_from_text(extracted_text)
+        else: # Inicializar con Nones si no hubo texto para regex
+            extracted_data = {"id_type": None, "id_number": None, "acta_no": None}
+        final_data_source = "PrintedRegex" if extracted_text else "NoTextForRegex"
+        job["data"], job["source"] = extracted_data, final_data_source
+
+    def _stage_ai_fallback(self, job: dict) -> Optional[dict]:
+        if getattr(settings, 'AI_STRATEGY', "chain") == "race":
+            return self._race_ai_fallback(job)
+        filename = job["filename"]
+        # PASO 3b: IA de Visión para "entregado_manuscrito" (si ROI HTR falló o para todos los campos)
+        first_page_pil_image = self._vision_ai_image(job)
+        if first_page_pil_image:
+            self._set_status(f"Consultando IA de Visión para {filename}...")
+            self._apply_vision_ai_data(job, self.ai_integrator.get_data_with_vision_ai(first_page_pil_image, filename, job["doc_type"]))
+        job["first_page_image"] = None # La imagen ya no se necesita; liberar la referencia cuanto antes
+
+        # PASO 4: Fallback a IA de Texto si los datos siguen incompletos (para ambos tipos de doc)
+        if self._needs_text_ai(job):
+            self._set_status(f"Consultando IA de texto para {filename}...")
+            self._apply_text_ai_data(job, self.ai_integrator.get_data_with_text_ai(job["text"], filename))
+        return job
+
+    def _race_ai_fallback(self, job: dict) -> Optional[dict]:
+        """
+        Como la cadena visión -> texto, pero en carrera: la IA de Visión sale primero y la de texto a los
+        AI_RACE_HEDGE_DELAY_SECONDS (o en cuanto la visión termina sin completar los datos). Gana el primer
+        resultado con el que los datos quedan completos y el resto se cancela. Los resultados se combinan
+        siempre con la precedencia de la cadena (visión reemplaza, texto solo rellena), lleguen en el orden que lleguen.
+        """
+        filename, doc_type = job["filename"], job["doc_type"]
+        base_data, base_source = job["data"], job["source"]
+
+        def merged(results: dict) -> Tuple[dict, str]:
+            data, source = self._merge_vision_ai_data(base_data, base_source, results.get("vision"))
+            return self._merge_text_ai_data(data, source, results.get("text"))
+
+        def launch_vision(results: dict):
+            first_page_pil_image = self._vision_ai_image(job)
+            job["first_page_image"] = None
+            return self.ai_integrator.submit_vision_ai(first_page_pil_image, filename, doc_type) if first_page_pil_image else None
+
+        def launch_text(results: dict):
+            return self.ai_integrator.submit_text_ai(job["text"], filename) if self._needs_text_ai(job, merged(results)[0]) else None
+
+        self._set_status(f"Consultando IA para {filename}...")
+        outcome = race_extractors(
+            [RaceEntrant("vision", launch_vision), RaceEntrant("text", launch_text, float(getattr(settings, 'AI_RACE_HEDGE_DELAY_SECONDS', 4.0)))],
+            is_done=lambda results: self._is_data_complete(merged(results)[0]))
+        job["first_page_image"] = None
+        if outcome.launched:
+            app_logger.info(f"Carrera de IA para '{filename}': lanzados {outcome.launched}, ganador {outcome.winner or 'ninguno'}"
+                            + (f", cancelados {outcome.cancelled}" if outcome.cancelled else "") + f" ({outcome.seconds:.2f}s).")
+            with self._ai_race_lock:
+                self.ai_race_stats[f"ganador_{outcome.winner or 'ninguno'}"] += 1
+                for name in outcome.cancelled: self.ai_race_stats[f"cancelado_{name}"] += 1
+        # Mismos registros y reglas que la cadena, en orden de precedencia
+        if "vision" in outcome.results: self._apply_vision_ai_data(job, outcome.results["vision"])
+        if "text" in outcome.results: self._apply_text_ai_data(job, outcome.results["text"])
+        return job
+
+    def _stage_ai_fallback_batch(self, jobs: List[dict]) -> List[Optional[dict]]:
+        """Variante por lotes de _stage_ai_fallback: visión en paralelo y la IA de texto de todo el lote en pocas peticiones."""
+        if getattr(settings, 'AI_STRATEGY', "chain") == "race":
+            return self._race_ai_fallback_batch(jobs)
+        vision_futures = []
+        for job in jobs:
+            first_page_pil_image = self._vision_ai_image(job)
+            if first_page_pil_image: vision_futures.append((job, self.ai_integrator.submit_vision_ai(first_page_pil_image, job["filename"], job["doc_type"])))
+            job["first_page_image"] = None
+        if vision_futures: self._set_status(f"Consultando IA de Visión para {len(vision_futures)} archivos...")
+        for job, future in vision_futures: self._apply_vision_ai_data(job, future.result())
+
+        text_jobs = [job for job in jobs if self._needs_text_ai(job)]
+        if text_jobs:
+            self._set_status(f"Consultando IA de texto para {len(text_jobs)} archivos (lote)...")
+            ai_results = self.ai_integrator.get_data_with_text_ai_batch([(job["text"], job["filename"]) for job in text_jobs])
+            for job, ai_text_data in zip(text_jobs, ai_results): self._apply_text_ai_data(job, ai_text_data)
+        return jobs
+
+    def _race_ai_fallback_batch(self, jobs: List[dict]) -> List[Optional[dict]]:
+        """
+        Carrera con la IA de texto por lotes: la IA de Visión de cada documento sale enseguida y, a los
+        AI_RACE_HEDGE_DELAY_SECONDS (o en cuanto terminan todas las visiones), los documentos aún incompletos
+        van juntos a la IA de texto por lotes. Cuando el lote de texto completa un documento, su petición de
+        visión se cancela. Los resultados se combinan con la precedencia de la cadena, como en _race_ai_fallback.
+        """
+        start = time.perf_counter()
+        hedge_delay = float(getattr(settings, 'AI_RACE_HEDGE_DELAY_SECONDS', 4.0))
+        vision_futures: Dict[int, concurrent.futures.Future] = {}
+        for index, job in enumerate(jobs):
+            first_page_pil_image = self._vision_ai_image(job)
+            if first_page_pil_image: vision_futures[index] = self.ai_integrator.submit_vision_ai(first_page_pil_image, job["filename"], job["doc_type"])
+            job["first_page_image"] = None
+        vision_results: Dict[int, Optional[Dict[str, str]]] = {}
+        text_results: Dict[int, Optional[Dict[str, str]]] = {}
+        winners: Dict[int, str] = {}
+
+        def merged(index: int) -> dict:
+            data, source = self._merge_vision_ai_data(jobs[index]["data"], jobs[index]["source"], vision_results.get(index))
+            return self._merge_text_ai_data(data, source, text_results.get(index))[0]
+
+        def collect_vision(done):
+            for index, future in list(vision_futures.items()):
+                if future not in done: continue
+                del vision_futures[index]
+                try: vision_results[index] = future.result()
+                except Exception as e:
+                    app_logger.error(f"IA de Visión falló en la carrera para {jobs[index]['filename']}: {e}", exc_info=True)
+                    vision_results[index] = None
+                if index not in winners and self._is_data_complete(merged(index)): winners[index] = "vision"
+
+        if vision_futures:
+            self._set_status(f"Consultando IA de Visión para {len(vision_futures)} archivos...")
+            done, _ = concurrent.futures.wait(list(vision_futures.values()), timeout=hedge_delay)
+            collect_vision(done)
+        text_indices = [index for index, job in enumerate(jobs) if self._needs_text_ai(job, merged(index))]
+        text_future = None
+        if text_indices:
+            self._set_status(f"Consultando IA de texto para {len(text_indices)} archivos (lote)...")
+            text_future = self.ai_integrator.submit_text_ai_batch([(jobs[index]["text"], jobs[index]["filename"]) for index in text_indices])
+        cancelled = 0
+        while vision_futures or text_future:
+            waiting = list(vision_futures.values()) + ([text_future] if text_future else [])
+            done, _ = concurrent.futures.wait(waiting, return_when=concurrent.futures.FIRST_COMPLETED)
+            collect_vision(done)
+            if text_future in done:
+                try: batch_results = text_future.result()
+                except Exception as e:
+                    app_logger.error(f"IA de texto por lotes falló en la carrera: {e}", exc_info=True)
+                    batch_results = [None] * len(text_indices)
+                text_future = None
+                for index, ai_text_data in zip(text_indices, batch_results):
+                    text_results[index] = ai_text_data
+                    if index not in winners and self._is_data_complete(merged(index)): winners[index] = "text"
+                for index in [index for index in vision_futures if self._is_data_complete(merged(index))]:
+                    vision_futures.pop(index).cancel() # El texto ya completó el documento
+                    cancelled += 1
+
+        raced = [index for index in range(len(jobs)) if index in vision_results or index in text_results or index in winners]
+        if raced:
+            outcome_counts = Counter(winners.get(index, "ninguno") for index in raced)
+            app_logger.info(f"Carrera de IA por lotes: {len(raced)} documento(s), ganadores {dict(outcome_counts)}"
+                            + (f", {cancelled} visión(es) cancelada(s)" if cancelled else "") + f" ({time.perf_counter() - start:.2f}s).")
+            with self._ai_race_lock:
+                for name, count in outcome_counts.items(): self.ai_race_stats[f"ganador_{name}"] += count
+                if cancelled: self.ai_race_stats["cancelado_vision"] += cancelled
+        # Mismos registros y reglas que la cadena, en orden de precedencia
+        for index, job in enumerate(jobs):
+            if index in vision_results: self._apply_vision_ai_data(job, vision_results[index])
+            if index in text_results: self._apply_text_ai_data(job, text_results[index])
+        return jobs
+
+    def _vision_ai_image(self, job: dict) -> Optional[Image.Image]:
+        """Imagen de la 1ra página si el documento manuscrito necesita la IA de Visión; None si no."""
+        # Decidimos si usar Vision AI siempre o como fallback. Aquí como fallback si datos incompletos.
+        if job["doc_type"] != "entregado_manuscrito": return None
+        extracted_data = job["data"]
+        data_complete_after_roi = self._is_data_complete(extracted_data)
+        if (not data_complete_after_roi or extracted_data.get("acta_no") is None) and \
+           self.ai_integrator.is_api_configured_and_client_valid() and self.ai_integrator.vision_model_name:
+            # La página completa solo se rasteriza aquí, cuando de verdad hace falta la IA de Visión
+            if page_image_cache.grayscale and not getattr(settings, 'VISION_PAYLOAD_GRAYSCALE', False):
+                return self._load_first_page_color_image(job)
+            return job["first_page_image"] or self._load_first_page_image(job)
+        return None
+
+    def _load_first_page_color_image(self, job: dict) -> Optional[Image.Image]:
+        """1ra página en color para la IA de Visión (VISION_PAYLOAD_GRAYSCALE=False): la caché de páginas solo guarda grises."""
+        try:
+            return render_page(job["filepath"], page=1, dpi=200, grayscale=False)
+        except Exception as e_img_load:
+            app_logger.error(f"No se pudo renderizar en color la página para IA de Visión de {job['filename']}: {e_img_load}", exc_info=True)
+            return None
+
+    @staticmethod
+    def _merge_vision_ai_data(data: dict, source: str, vision_ai_data: Optional[Dict[str, str]]) -> Tuple[dict, str]:
+        if not vision_ai_data: return data, source
+        merged_data = dict(data)
+        # La IA de visión podría rellenar todos los campos.
+        # Darle prioridad si devuelve algo.
+        for key_v in ["id_type", "id_number", "acta_no"]:
+            if vision_ai_data.get(key_v) is not None:
+                merged_data[key_v] = vision_ai_data.get(key_v)
+        return merged_data, "VisionAI" # Asumir que si se usa, es la fuente principal
+
+    @staticmethod
+    def _merge_text_ai_data(data: dict, source: str, ai_text_data: Optional[Dict[str, str]]) -> Tuple[dict, str]:
+        if not ai_text_data: return data, source
+        merged_data = dict(data)
+        for key_t in ["id_type", "id_number", "acta_no"]:
+            if ai_text_data.get(key_t) is not None and merged_data.get(key_t) is None: # Solo rellenar si estaba vacío
+                merged_data[key_t] = ai_text_data.get(key_t)
+                source += "+TextAIComplement"
+        return merged_data, source
+
+    @staticmethod
+    def _is_data_complete(data: dict) -> bool:
+        return all(data.get(key) for key in ["id_type", "id_number", "acta_no"])
+
+    def _apply_vision_ai_data(self, job: dict, vision_ai_data: Optional[Dict[str, str]]):
+        filename = job["filename"]
+        if vision_ai_data:
+            app_logger.info(f"IA de Visión devolvió: {vision_ai_data}")
+            job["data"], job["source"] = self._merge_vision_ai_data(job["data"], job["source"], vision_ai_data)
+            app_logger.info(f"Datos para '{filename}' actualizados por IA de Visión: {job['data']}")
+        else:
+            app_logger.warning(f"IA de Visión no pudo extraer datos para {filename}.")
+
+    def _needs_text_ai(self, job: dict, data: Optional[dict] = None) -> bool:
+        data_complete_before_text_ai = self._is_data_complete(job["data"] if data is None else data)
+        if data_complete_before_text_ai or not (self.ai_integrator.is_api_configured_and_client_valid() and self.ai_integrator.text_model_name):
+            return False
+        if not job["text"]:
+            app_logger.warning(f"No hay texto OCR de página completa para enviar a IA de texto para {job['filename']}. Omitiendo IA de texto.")
+            return False
+        return True
+
+    def _apply_text_ai_data(self, job: dict, ai_text_data: Optional[Dict[str, str]]):
+        filename = job["filename"]
+        if ai_text_data:
+            app_logger.info(f"IA de Texto devolvió: {ai_text_data}")
+            job["data"], job["source"] = self._merge_text_ai_data(job["data"], job["source"], ai_text_data)
+            app_logger.info(f"Datos para '{filename}' complementados por IA de texto: {job['data']}")
+        else:
+            app_logger.warning(f"IA de texto no pudo extraer/mejorar datos para {filename}.")
+
+    def _stage_commit(self, job: dict) -> Optional[dict]:
+        filepath, filename, extracted_data = job["filepath"], job["filename"], job["data"]
+        # PASO 5: Verificación final y renombrado
+        new_filename_base = self.file_manager.generate_new_filename(
+            extracted_data.get("id_type"),
+            extracted_data.get("id_number"),
+            extracted_data.get("acta_no"),
+            original_ext=os.path.splitext(filename)[1]
+        )
 
-        # Fin del bucle de procesamiento
-        if self.root.winfo_exists():
-            self._toggle_controls(False)
-            self.status_var.set(f"Procesamiento completado. {total_files} archivos procesados.")
-            self.current_file_var.set("N/A")
-            self._update_overall_progress_label(total_files, total_files)
-            messagebox.showinfo("Completado", f"Procesamiento finalizado.\nArchivos renombrados en: {self.file_manager.renamed_dir}\nArchivos fallidos en: {self.file_manager.failed_dir}")
-            self.selected_files.clear()
-            self._update_files_listbox() # Esto limpiará la vista previa también
+        if new_filename_base:
+            app_logger.info(f"Datos finales para '{filename}' (fuente: {job['source']}): {extracted_data}. Nuevo nombre: {new_filename_base}")
+            self._set_status(f"Renombrando {filename}...")
+            self.file_manager.copy_and_rename(filepath, new_filename_base)
+        elif self._hold_for_open_circuit(job):
+            return job
         else:
-            app_logger.info("Procesamiento completado pero la ventana de GUI ya no existe.")
\ No newline at end of file
+            app_logger.error(f"No se pudo generar un nombre de archivo válido para '{filename}' (datos cruciales faltantes). Moviendo a fallidos. Datos: {extracted_data}")
+            self.file_manager.move_to_failed(filepath)
+
+        self._mark_job_finished(job)
+        return job
\ No newline at end of file
@@ -1,15 +1,42 @@
+from utils.startup_timer import startup_timer # Primero: el cronómetro de arranque empieza a contar aquí
+import argparse
+import time
 import tkinter as tk
-from gui.interface import AppGUI
+_gui_import_start = time.perf_counter()
+from gui.interface import AppGUI # Los módulos pesados (easyocr/torch, cv2, openai...) se importan en su primer uso
+startup_timer.record_import("gui.interface", time.perf_counter() - _gui_import_start)
 from utils.logger import get_app_logger # Cambiado
 from config import settings
 
 app_logger = get_app_logger() # Obtener logger
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="OCRename: renombrado de actas PDF mediante OCR e IA.")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="No leer ni escribir la caché persistente de resultados OCR.")
+    parser.add_argument("--purge-ocr-cache", action="store_true", help="Vaciar la caché OCR antes de iniciar.")
+    parser.add_argument("--no-ai-cache", action="store_true", help="No leer ni escribir la caché persistente de respuestas de la IA.")
+    parser.add_argument("--purge-ai-cache", action="store_true", help="Vaciar la caché de IA antes de iniciar.")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     app_logger.info("===============================================")
     app_logger.info("    Iniciando Aplicación OCRename        ")
     app_logger.info("===============================================")
 
+    if args.purge_ocr_cache:
+        from core.ocr_cache import purge_ocr_cache
+        purge_ocr_cache()
+    if args.no_ocr_cache:
+        settings.OCR_CACHE_ENABLED = False
+        app_logger.info("Caché OCR deshabilitada por línea de comandos (--no-ocr-cache).")
+    if args.purge_ai_cache:
+        from core.ai_cache import purge_ai_cache
+        purge_ai_cache()
+    if args.no_ai_cache:
+        settings.AI_CACHE_ENABLED = False
+        app_logger.info("Caché de IA deshabilitada por línea de comandos (--no-ai-cache).")
+
     if not settings.OPENROUTER_API_KEY:
         app_logger.warning("ADVERTENCIA: OPENROUTER_API_KEY no está configurada en .env.")
         app_logger.warning("La funcionalidad de IA (DeepSeek) estará deshabilitada.")
@@ -21,7 +48,10 @@ def main():
         # from tkinterdnd2 import TkinterDnD # Descomenta si reinstalas y usas tkinterdnd2
         # root = TkinterDnD.Tk()          # Descomenta si reinstalas y usas tkinterdnd2
         app = AppGUI(root)
+        root.after_idle(startup_timer.mark, "ventana visible")
         root.mainloop()
+        if app.ocr_pool: app.ocr_pool.shutdown()
+        app.ai_integrator.close()
     except Exception as e:
         app_logger.critical("Error fatal al iniciar o ejecutar la aplicación:", exc_info=True)
     finally:
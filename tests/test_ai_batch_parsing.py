@@ -0,0 +1,85 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from config import settings
+
+
+def _entry(label, acta_no="46150", **extra):
+    return {"archivo": label, "id_type": "CC", "id_number": "12345678", "acta_no": acta_no, **extra}
+
+
+class ParseAIBatchResponseTest(unittest.TestCase):
+    LABELS = ["a.pdf", "b.pdf", "c.pdf"]
+
+    @classmethod
+    def setUpClass(cls):
+        from core.ai_integration import AIIntegrator
+        with mock.patch.object(settings, "OPENROUTER_API_KEY", "", create=True):
+            cls.integrator = AIIntegrator()
+
+    def _parse(self, content: str, labels=None):
+        return self.integrator._parse_ai_batch_response(content, "modelo", 0, labels or self.LABELS)
+
+    def test_full_array_in_code_fence(self):
+        content = "```json\n" + json.dumps([_entry(label) for label in self.LABELS]) + "\n```"
+        entries = self._parse(content)
+        self.assertEqual(set(entries), set(self.LABELS))
+        self.assertEqual(entries["b.pdf"], {"id_type": "CC", "id_number": "12345678", "acta_no": "46150"})
+
+    def test_partial_array_keeps_only_answered_documents(self):
+        entries = self._parse(json.dumps([_entry("a.pdf"), _entry("c.pdf", acta_no=None)]))
+        self.assertEqual(set(entries), {"a.pdf", "c.pdf"})
+        self.assertIsNone(entries["c.pdf"]["acta_no"]) # null explícito: respuesta válida, no se reintenta
+
+    def test_entries_missing_fields_or_malformed_are_dropped(self):
+        content = json.dumps([{"archivo": "a.pdf", "id_type": "CC"}, "b.pdf", 7, _entry("c.pdf")])
+        self.assertEqual(set(self._parse(content)), {"c.pdf"})
+
+    def test_unknown_filenames_are_ignored(self):
+        self.assertEqual(set(self._parse(json.dumps([_entry("otro.pdf"), _entry("a.pdf")]))), {"a.pdf"})
+        self.assertIsNone(self._parse(json.dumps([_entry("otro.pdf")])))
+
+    def test_duplicate_entries_keep_the_first(self):
+        entries = self._parse(json.dumps([_entry("a.pdf", acta_no="1"), _entry("a.pdf", acta_no="2")]))
+        self.assertEqual(entries["a.pdf"]["acta_no"], "1")
+
+    def test_object_keyed_by_filename(self):
+        content = json.dumps({label: {"id_type": "TI", "id_number": "99", "acta_no": "5"} for label in self.LABELS[:2]})
+        self.assertEqual(set(self._parse(content)), {"a.pdf", "b.pdf"})
+
+    def test_loose_objects_with_prose_around_them(self):
+        content = f"Documento 1: {json.dumps(_entry('a.pdf'))}\nDocumento 2 {{roto\n{json.dumps(_entry('b.pdf'))} fin."
+        self.assertEqual(set(self._parse(content)), {"a.pdf", "b.pdf"})
+
+    def test_reply_without_usable_json_is_none(self):
+        for content in ("No pude leer los documentos.", "[]", "[1, 2, 3]", '{"nota": "sin datos"}', ""):
+            with self.subTest(content=content):
+                self.assertIsNone(self._parse(content))
+
+
+class TextBatchRequeueTest(unittest.TestCase):
+    def test_documents_missing_from_the_batch_answer_are_retried_alone(self):
+        from core.ai_integration import AIIntegrator, _TextBatchItem
+        with mock.patch.object(settings, "OPENROUTER_API_KEY", "", create=True):
+            integrator = AIIntegrator()
+        group = [_TextBatchItem(label, f"texto {label}", label, None) for label in ("a.pdf", "b.pdf", "c.pdf")]
+        answer = json.dumps([_entry("a.pdf"), {"archivo": "b.pdf", "acta_no": "1"}])
+
+        async def fake_request(model_name, messages, label, parse, **kwargs):
+            return parse(answer, 0)
+
+        async def fake_single(item):
+            return {"id_type": "CC", "id_number": "1", "acta_no": f"solo-{item.label}"}
+
+        with mock.patch.object(integrator, "_request_with_retries", fake_request), \
+             mock.patch.object(integrator, "_single_text_call_async", side_effect=fake_single) as single:
+            results = asyncio.run(integrator._text_batch_call_async(group))
+        self.assertEqual([call.args[0].label for call in single.call_args_list], ["b.pdf", "c.pdf"])
+        self.assertEqual([result["acta_no"] for result in results], ["46150", "solo-b.pdf", "solo-c.pdf"])
+        self.assertEqual(integrator.text_batch_stats["reintentos_individuales"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from config import settings
+from core.ai_health import BATCH, CLOSED, HALF_OPEN, OPEN, ModelHealth, get_model_health, reset_model_health
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.health = ModelHealth("modelo", failure_threshold=2, cooldown_seconds=30, clock=self.clock)
+
+    def _open(self):
+        self.health.record_failure()
+        self.assertTrue(self.health.record_failure())
+        self.assertEqual(self.health.state, OPEN)
+
+    def test_closed_circuit_allows_normal_requests(self):
+        self.assertIs(self.health.allow_request(), False)
+        self.assertFalse(self.health.record_failure())
+        self.assertEqual(self.health.state, CLOSED)
+
+    def test_success_resets_consecutive_failures(self):
+        self.health.record_failure()
+        self.health.record_success(1.0)
+        self.assertFalse(self.health.record_failure())
+        self.assertEqual(self.health.state, CLOSED)
+
+    def test_open_circuit_rejects_until_cooldown(self):
+        self._open()
+        self.assertIsNone(self.health.allow_request())
+        self.assertFalse(self.health.is_available())
+        self.clock.now = 29.9
+        self.assertIsNone(self.health.allow_request())
+        self.assertAlmostEqual(self.health.cooldown_remaining(), 0.1)
+        self.assertEqual(self.health.counts["rechazadas"], 2)
+
+    def test_half_open_lets_a_single_probe_through(self):
+        self._open()
+        self.clock.now = 30
+        self.assertTrue(self.health.is_available())
+        self.assertIs(self.health.allow_request(), True)
+        self.assertEqual(self.health.state, HALF_OPEN)
+        self.assertIsNone(self.health.allow_request())
+        self.assertFalse(self.health.is_available())
+
+    def test_probe_success_closes_and_failure_reopens(self):
+        self._open()
+        self.clock.now = 30
+        self.health.allow_request()
+        self.health.record_success(0.5)
+        self.assertEqual(self.health.state, CLOSED)
+        self._open()
+        self.clock.now = 60
+        self.health.allow_request()
+        self.assertTrue(self.health.record_failure()) # Un solo fallo en semiabierto basta
+        self.assertEqual(self.health.state, OPEN)
+        self.assertEqual(self.health.counts["aperturas"], 3)
+
+    def test_only_the_probe_releases_the_probe_slot(self):
+        self._open()
+        self.clock.now = 30
+        probe = self.health.allow_request()
+        self.health.release_probe(False) # Una petición normal cancelada (p. ej. la perdedora de una carrera)
+        self.assertIsNone(self.health.allow_request())
+        self.health.release_probe(probe)
+        self.assertIs(self.health.allow_request(), True)
+
+
+class AdaptiveTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.multiple(settings, AI_ADAPTIVE_TIMEOUT=True, AI_TIMEOUT_PERCENTILE=95,
+                                      AI_TIMEOUT_MULTIPLIER=2.0, AI_TIMEOUT_MIN_SECONDS=3.0, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.health = ModelHealth("modelo", window=10)
+
+    def test_default_until_enough_samples(self):
+        for _ in range(4): self.health.record_success(1.0)
+        self.assertEqual(self.health.timeout(60.0), 60.0)
+        self.health.record_success(1.0)
+        self.assertEqual(self.health.timeout(60.0), 3.0) # 2 x 1s, con el mínimo de 3s
+
+    def test_percentile_of_the_window_clamped_to_default(self):
+        for latency in (1, 2, 3, 4, 10): self.health.record_success(latency)
+        self.assertEqual(self.health.percentile(50), 3)
+        self.assertEqual(self.health.timeout(60.0), 20.0)
+        self.assertEqual(self.health.timeout(15.0), 15.0)
+
+    def test_old_samples_leave_the_window(self):
+        for _ in range(10): self.health.record_success(20.0)
+        for _ in range(10): self.health.record_success(2.0)
+        self.assertEqual(self.health.percentile(95), 2.0)
+
+    def test_batch_latencies_do_not_move_the_single_timeout(self):
+        for _ in range(5):
+            self.health.record_success(2.0)
+            self.health.record_success(12.0, BATCH)
+        self.assertEqual(self.health.timeout(60.0), 4.0)
+        self.assertEqual(self.health.timeout(60.0, BATCH), 24.0)
+        self.assertEqual(self.health.stats()["p50_lote"], 12.0)
+
+
+class _FakeCompletions:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def _api_error(error_class, status_code: int = None):
+    # Sin pasar por el constructor: su firma cambia entre versiones del paquete openai
+    error = error_class.__new__(error_class)
+    Exception.__init__(error, f"HTTP {status_code}")
+    error.response = None
+    if status_code is not None: error.status_code = status_code
+    return error
+
+
+class RequestWithRetriesHealthTest(unittest.TestCase):
+    MODEL = "modelo-de-prueba"
+
+    def setUp(self):
+        patcher = mock.patch.multiple(settings, OPENROUTER_API_KEY="", AI_STREAMING=False, API_MAX_RETRIES=3,
+                                      AI_REQUESTS_PER_MINUTE=60000, AI_RATE_LIMIT_BURST=100,
+                                      AI_CIRCUIT_FAILURE_THRESHOLD=1, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        reset_model_health()
+        self.addCleanup(reset_model_health)
+
+    def _request(self, error: Exception) -> _FakeCompletions:
+        from core.ai_integration import AIIntegrator
+        completions = _FakeCompletions(error)
+        integrator = AIIntegrator()
+        integrator._client = mock.Mock(chat=mock.Mock(completions=completions))
+        integrator._client_init_attempted = True
+        result = asyncio.run(integrator._request_with_retries(self.MODEL, [], "doc.pdf", lambda content, attempt: content))
+        self.assertIsNone(result)
+        return completions
+
+    def test_rate_limit_does_not_open_the_circuit(self):
+        from openai import RateLimitError
+        completions = self._request(_api_error(RateLimitError, 429))
+        health = get_model_health(self.MODEL)
+        self.assertEqual(completions.calls, 3)
+        self.assertEqual(health.state, CLOSED)
+        self.assertEqual(health.counts["fallos"], 0)
+
+    def test_server_error_opens_the_circuit(self):
+        from openai import APIStatusError
+        completions = self._request(_api_error(APIStatusError, 503))
+        self.assertEqual(completions.calls, 1) # Con el circuito abierto no se reintenta
+        self.assertEqual(get_model_health(self.MODEL).state, OPEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
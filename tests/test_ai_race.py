@@ -0,0 +1,74 @@
+import concurrent.futures
+import threading
+import unittest
+
+from core.ai_race import RaceEntrant, race_extractors
+
+
+def _future_after(seconds: float, result=None, error: Exception = None) -> concurrent.futures.Future:
+    future = concurrent.futures.Future()
+
+    def finish():
+        if not future.set_running_or_notify_cancel(): return # Cancelado antes de terminar
+        if error: future.set_exception(error)
+        else: future.set_result(result)
+    timer = threading.Timer(seconds, finish)
+    timer.daemon = True
+    timer.start()
+    return future
+
+
+def _complete(results: dict) -> bool:
+    return any(result and result.get("acta_no") for result in results.values())
+
+
+class RaceExtractorsTest(unittest.TestCase):
+    def test_fast_first_entrant_wins_before_hedge(self):
+        outcome = race_extractors([RaceEntrant("vision", lambda results: _future_after(0.01, {"acta_no": "1"})),
+                                   RaceEntrant("text", lambda results: _future_after(0.01, {"acta_no": "2"}), delay=5.0)], _complete)
+        self.assertEqual(outcome.winner, "vision")
+        self.assertEqual(outcome.launched, ["vision"])
+        self.assertEqual(outcome.cancelled, [])
+        self.assertLess(outcome.seconds, 1.0)
+
+    def test_hedge_wins_and_slow_entrant_is_cancelled(self):
+        slow = []
+
+        def launch_vision(results):
+            slow.append(_future_after(5.0, {"acta_no": "1"}))
+            return slow[0]
+        outcome = race_extractors([RaceEntrant("vision", launch_vision),
+                                   RaceEntrant("text", lambda results: _future_after(0.01, {"acta_no": "2"}), delay=0.05)], _complete)
+        self.assertEqual(outcome.winner, "text")
+        self.assertEqual(outcome.launched, ["vision", "text"])
+        self.assertEqual(outcome.cancelled, ["vision"])
+        self.assertTrue(slow[0].cancelled())
+        self.assertNotIn("vision", outcome.results)
+
+    def test_incomplete_first_result_launches_next_without_waiting(self):
+        seen = []
+
+        def launch_text(results):
+            seen.append(dict(results))
+            return _future_after(0.01, {"acta_no": "2"})
+        outcome = race_extractors([RaceEntrant("vision", lambda results: _future_after(0.01, {"acta_no": None})),
+                                   RaceEntrant("text", launch_text, delay=5.0)], _complete)
+        self.assertEqual(outcome.winner, "text")
+        self.assertEqual(seen, [{"vision": {"acta_no": None}}])
+        self.assertLess(outcome.seconds, 1.0)
+
+    def test_failed_entrant_counts_as_empty_result(self):
+        outcome = race_extractors([RaceEntrant("vision", lambda results: _future_after(0.01, error=RuntimeError("503"))),
+                                   RaceEntrant("text", lambda results: _future_after(0.01, None), delay=5.0)], _complete)
+        self.assertIsNone(outcome.winner)
+        self.assertEqual(outcome.results, {"vision": None, "text": None})
+
+    def test_entrant_that_declines_is_not_launched(self):
+        outcome = race_extractors([RaceEntrant("vision", lambda results: None),
+                                   RaceEntrant("text", lambda results: _future_after(0.01, {"acta_no": "2"}), delay=5.0)], _complete)
+        self.assertEqual(outcome.launched, ["text"])
+        self.assertEqual(outcome.winner, "text")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from core.field_extractor import merge_printed_fields, printed_fields_final, scan_printed_fields
+
+
+def _scan_pages(pages):
+    fields = None
+    for page_text in pages:
+        fields = merge_printed_fields(fields, scan_printed_fields(page_text))
+        if printed_fields_final(fields):
+            break
+    return fields
+
+
+class MergePrintedFieldsTest(unittest.TestCase):
+    def test_preferred_acta_on_later_page_wins_over_fallback(self):
+        pages = [
+            "Paciente: JUAN PEREZ Identificación CC 12345678\nRECIBO 555",
+            "Acta de Entrega No. 46150",
+        ]
+        fields = _scan_pages(pages)
+        self.assertEqual(fields["acta_no"], "46150")
+        self.assertEqual(fields["acta_pattern"], 1)
+        self.assertEqual((fields["id_type"], fields["id_number"]), ("CC", "12345678"))
+        full_text = scan_printed_fields("\n".join(pages))
+        self.assertEqual((fields["acta_no"], fields["id_number"]), (full_text["acta_no"], full_text["id_number"]))
+
+    def test_fallback_acta_is_not_final(self):
+        fields = scan_printed_fields("Identificación CC 12345678\nRECIBO 555")
+        self.assertEqual(fields["acta_pattern"], 4)
+        self.assertFalse(printed_fields_final(fields))
+
+    def test_first_page_values_kept_for_id_and_equal_priority_acta(self):
+        fields = _scan_pages([
+            "Identificación CC 12345678\nFórmula Médica Nro. 111",
+            "Identificación TI 87654321\nFórmula Médica Nro. 222",
+        ])
+        self.assertEqual((fields["id_type"], fields["id_number"], fields["acta_no"]), ("CC", "12345678", "111"))
+
+    def test_stops_once_preferred_acta_and_id_are_resolved(self):
+        fields = _scan_pages(["Identificación CC 12345678\nActa de Entrega No. 46150", "Acta de Entrega No. 99999"])
+        self.assertTrue(printed_fields_final(fields))
+        self.assertEqual(fields["acta_no"], "46150")
+
+
+if __name__ == "__main__":
+    unittest.main()
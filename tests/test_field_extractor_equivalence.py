@@ -0,0 +1,134 @@
+"""
+Equivalencia del extractor de una sola pasada (core.field_extractor.scan_printed_fields) con la cascada de
+regex anterior de extract_printed_data_from_text, sobre el corpus de regresión y variantes aleatorias
+generadas a partir de sus fragmentos. benchmarks/bench_field_extractor.py reutiliza este corpus.
+"""
+import random
+import re
+import unittest
+
+from core.field_extractor import scan_printed_fields
+
+# Corpus de regresión: casos reales simplificados y casos borde de la cascada anterior
+CORPUS = [
+    "",
+    "Acta de Entrega No. 12345\nPaciente: JUAN PEREZ\nIdentificación: CC 1020304050\nEdad: 45 AÑOS",
+    "FÓRMULA MÉDICA NRO. 998877\nDocumento 52345678 TI\nEdad 12 años",
+    "Fórmula Médica Nro 4455\nIdentificacion No 80123456\n3 AÑOS",
+    "ORDEN N°: 7788\nC.C. 1032456789",
+    "AUTORIZACION Nº 123456\nNo. Doc 99887766 RC\n",
+    "RECIBO 5566 Entrega No. 44 Nro. 77 paciente CE 1234567",
+    "Entrega No 31 ... Acta de Entrega No.32",
+    "NIT 900123456-1 Documento 7654321",
+    "Cuenta 12345678901 IDENTIFICACION 1234567890123",
+    "C C 12345678",
+    "acceso 12345678",
+    "texto sin nada relevante 123456 y más texto",
+    "Edad: 4 años  Identificación 1122334455  PA",
+    "30AÑOS edad 7 AÑOS DOCUMENTO: 10203040",
+    "tiene 25 AÑOSX y EDAD 17 AÑOS. documento 55555555",
+    "EDAD\n 8 años 3344556677 identificación",
+    "x" * 60 + "12345678" + "y" * 75 + "Identificación",
+    "Identificación" + " " * 69 + "12345678",
+    "CCX12345678" + " " * 64 + "DOCC",
+    "acc" + " " * 60 + "7654321",
+    "Id: 5555555 ... (" + "z" * 80 + ") Documento",
+    "Número: 1234567 cc. Acta de Entrega No. 001",
+    "ORDEN N. : 0042 Formula Medica Nro.43 RECIBO. 44",
+    "Identificación: TI: 1009988776 Edad 11 AÑOS",
+]
+
+_FRAGMENTS = [
+    "Identificación", "IDENTIFICACION No", "Documento", "No. Doc", "C.C.", "CC", "TI", "CE", "PA", "RC", "cc", "c. c",
+    "Acta de Entrega No.", "Fórmula Médica Nro.", "ORDEN N°:", "AUTORIZACION", "Entrega No", "Nro.", "RECIBO",
+    "Edad:", "EDAD", "AÑOS", "años", "3 AÑOS", "Edad 17 años", "edad: 70AÑOS",
+    "NIT", ":", "-", ".", "\n", " ", "  ", "Paciente JUAN", "acceso", "x",
+]
+
+
+def random_text(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 40)):
+        roll = rng.random()
+        if roll < 0.35:
+            parts.append(str(rng.randint(0, 10 ** rng.randint(1, 12))))
+        elif roll < 0.45:
+            parts.append(" " * rng.randint(1, 80))
+        else:
+            parts.append(rng.choice(_FRAGMENTS))
+        if rng.random() < 0.6:
+            parts.append(rng.choice([" ", "", "\n", ": "]))
+    return "".join(parts)
+
+
+def legacy_age(text_content: str):
+    # Réplica de PDFProcessor._extract_age_from_text anterior
+    if not text_content: return None
+    match = re.search(r"\b(?:Edad\s*[:\-]?\s*)?(\d{1,3})\s*A[ÑN]OS\b", text_content, re.IGNORECASE)
+    if match:
+        return int(match.group(1))
+    age_simple_match = re.search(r"\b(\d{1,3})\b\s*A[ÑN]OS", text_content, re.IGNORECASE)
+    if age_simple_match:
+        context_start = max(0, age_simple_match.start() - 30)
+        if "EDAD" in text_content[context_start:age_simple_match.start()].upper():
+            return int(age_simple_match.group(1))
+    return None
+
+
+def legacy_cascade(text_content: str) -> dict:
+    # Réplica de la cascada anterior de extract_printed_data_from_text (campos crudos, sin inferencia)
+    data = {"id_type": None, "id_number": None, "acta_no": None, "age": None}
+    if not text_content: return data
+    allowed = r"(CC|TI|CE|PA|RC)"
+    m = re.search(rf"(?i)Identificaci[oó]n\s*[:\-]?\s*(?:({allowed})\s*[:\-]?\s*)?(\d{{6,12}})\b", text_content)
+    if m and m.group(2) and m.group(2).isdigit():
+        data["id_number"] = m.group(2)
+        if m.group(1): data["id_type"] = m.group(1).upper()
+    if not data["id_number"]:
+        m = re.search(rf"(?i)\b({allowed})\s*[:\-]?\s*(\d{{6,12}})\b", text_content)
+        if m and m.group(2).isdigit():
+            data["id_type"], data["id_number"] = m.group(1).upper(), m.group(2)
+    if not data["id_number"]:
+        for m in re.finditer(r"\b(\d{6,10})\b", text_content):
+            window = text_content[max(0, m.start() - 70):min(len(text_content), m.end() + 70)]
+            if re.search(r"Identificaci[oó]n|DOCUMENTO|No\.\s*Doc|C[.\s]*C\b|IDENTIFICACION\s*No", window, re.IGNORECASE):
+                if m.group(1).isdigit():
+                    data["id_number"] = m.group(1)
+                    if not data["id_type"]:
+                        type_match = re.search(rf"\b({allowed})\b", window, re.IGNORECASE)
+                        if type_match: data["id_type"] = type_match.group(1).upper()
+                    break
+    if data["id_number"] and not data["id_type"]:
+        data["age"] = legacy_age(text_content)
+    for pattern in (r"(?i)Acta\s*de\s*Entrega\s*No\.?\s*(\d+)", r"(?i)F[oó]rmula\s*M[eé]dica\s*Nro\.?\s*(\d+)",
+                    r"(?i)(?:ORDEN|AUTORIZACION)\s*N[°oº\.]*[:\s]*(\d+)", r"(?i)(?:Entrega\s*No|Nro|RECIBO)\.?\s*(\d+)"):
+        m = re.search(pattern, text_content)
+        if m:
+            data["acta_no"] = m.group(1)
+            break
+    return data
+
+
+def single_pass(text_content: str) -> dict:
+    fields = scan_printed_fields(text_content)
+    data = {key: fields[key] for key in ("id_type", "id_number", "acta_no")}
+    data["age"] = fields["age"] if fields["id_number"] and not fields["id_type"] else None  # La cascada solo la calculaba aquí
+    return data
+
+
+
+class LegacyCascadeEquivalenceTest(unittest.TestCase):
+    def test_corpus_matches_legacy_cascade(self):
+        for text in CORPUS:
+            with self.subTest(text=text[:60]):
+                self.assertEqual(single_pass(text), legacy_cascade(text))
+
+    def test_random_variants_match_legacy_cascade(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            text = random_text(rng)
+            self.assertEqual(single_pass(text), legacy_cascade(text), msg=repr(text[:120]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from core.json_stream import IncrementalJSONScanner, first_matching_value
+
+
+def _feed_in_chunks(text: str, size: int) -> list:
+    scanner = IncrementalJSONScanner()
+    values = []
+    for start in range(0, len(text), size):
+        values.extend(scanner.feed(text[start:start + size]))
+    return values
+
+
+class IncrementalJSONScannerTest(unittest.TestCase):
+    ANSWER = 'Claro. ```json\n{"id_type": "CC", "id_number": "12345678", "acta_no": "46150"}\n```'
+
+    def test_object_is_emitted_when_its_closing_brace_arrives(self):
+        scanner = IncrementalJSONScanner()
+        closing = self.ANSWER.index("}")
+        self.assertEqual(scanner.feed(self.ANSWER[:closing]), [])
+        self.assertEqual(scanner.feed(self.ANSWER[closing:]), [{"id_type": "CC", "id_number": "12345678", "acta_no": "46150"}])
+
+    def test_result_does_not_depend_on_chunk_size(self):
+        expected = _feed_in_chunks(self.ANSWER, len(self.ANSWER))
+        for size in (1, 3, 7):
+            with self.subTest(size=size):
+                self.assertEqual(_feed_in_chunks(self.ANSWER, size), expected)
+
+    def test_stray_braces_and_quotes_in_prose_are_ignored(self):
+        text = 'Veo una llave { y unas comillas " sueltas. {"acta_no": "46150"}'
+        self.assertEqual(_feed_in_chunks(text, 4), [{"acta_no": "46150"}])
+
+    def test_nested_values_come_before_their_container(self):
+        values = _feed_in_chunks('[{"archivo": "a.pdf"}, {"archivo": "b.pdf"}]', 5)
+        self.assertEqual(values, [{"archivo": "a.pdf"}, {"archivo": "b.pdf"}, [{"archivo": "a.pdf"}, {"archivo": "b.pdf"}]])
+
+    def test_braces_inside_strings_close_the_right_value(self):
+        self.assertEqual(_feed_in_chunks('{"nota": "usa } y ] en el texto", "acta_no": "1"}', 2),
+                         [{"nota": "usa } y ] en el texto", "acta_no": "1"}])
+
+    def test_unclosed_value_yields_nothing(self):
+        self.assertEqual(_feed_in_chunks('{"acta_no": "46150", "id_number": "12', 3), [])
+
+
+class FirstMatchingValueTest(unittest.TestCase):
+    def test_returns_first_match_or_none(self):
+        values = [{"nota": 1}, {"acta_no": "1"}, {"acta_no": "2"}]
+        self.assertEqual(first_matching_value(values, lambda value: "acta_no" in value), {"acta_no": "1"})
+        self.assertIsNone(first_matching_value(values, lambda value: isinstance(value, list)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+from unittest import mock
+
+from config import settings
+from core.ocr_cache import ocr_settings_fingerprint
+
+
+class OCRSettingsFingerprintTest(unittest.TestCase):
+    def test_settings_that_change_the_ocr_text_change_the_fingerprint(self):
+        for name, values in (("ENABLE_REGION_RENDERING", (True, False)), ("ENABLE_LAYOUT_TEMPLATES", (True, False)),
+                             ("OCR_LANGUAGES", (["es"], ["es", "en"]))):
+            with self.subTest(setting=name):
+                fingerprints = set()
+                for value in values:
+                    with mock.patch.object(settings, name, value, create=True):
+                        fingerprints.add(ocr_settings_fingerprint())
+                self.assertEqual(len(fingerprints), len(values))
+
+    def test_fingerprint_is_stable(self):
+        self.assertEqual(ocr_settings_fingerprint(), ocr_settings_fingerprint())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import socket
+import unittest
+from unittest import mock
+
+from core.ocr_daemon import RemoteOCRReader, _send_message
+
+
+class _Buffer:
+    def __init__(self):
+        self.data = b""
+
+    def sendall(self, data):
+        self.data += bytes(data)
+
+
+def _reply(result) -> bytes:
+    buffer = _Buffer()
+    _send_message(buffer, {"ok": True, "result": result})
+    return buffer.data
+
+
+class _FakeSocket:
+    """Socket de prueba: `send_error` falla en el envío, `recv_error` al leer la respuesta."""
+
+    def __init__(self, reply: bytes = b"", send_error: Exception = None, recv_error: Exception = None):
+        self.reply = reply
+        self.send_error = send_error
+        self.recv_error = recv_error
+        self.sent = 0
+        self.closed = False
+
+    def sendall(self, data):
+        if self.send_error: raise self.send_error
+        self.sent += 1
+
+    def recv(self, size):
+        if self.recv_error: raise self.recv_error
+        chunk, self.reply = self.reply[:size], self.reply[size:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class RemoteOCRReaderRetryTest(unittest.TestCase):
+    def _reader(self, *sockets):
+        reader = RemoteOCRReader("/tmp/no-existe.sock", timeout=1.0)
+        connect = mock.patch.object(reader, "_connect", side_effect=list(sockets))
+        self.connect = connect.start()
+        self.addCleanup(connect.stop)
+        return reader
+
+    def test_broken_pipe_on_send_reconnects_and_resends(self):
+        stale, fresh = _FakeSocket(send_error=BrokenPipeError()), _FakeSocket(_reply({"protocol": 1}))
+        reader = self._reader(stale, fresh)
+        self.assertEqual(reader.ping(), {"protocol": 1})
+        self.assertTrue(stale.closed)
+        self.assertEqual(fresh.sent, 1)
+
+    def test_refused_connection_is_retried_once(self):
+        reader = self._reader(ConnectionRefusedError(), ConnectionRefusedError())
+        with self.assertRaises(ConnectionRefusedError):
+            reader.ping()
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_timeout_is_raised_without_resending(self):
+        slow = _FakeSocket(recv_error=socket.timeout("timed out"))
+        reader = self._reader(slow, _FakeSocket(_reply({})))
+        with self.assertRaises(socket.timeout):
+            reader.ping()
+        self.assertEqual((self.connect.call_count, slow.sent), (1, 1))
+        self.assertTrue(slow.closed)
+
+    def test_reset_after_sending_is_not_resent(self):
+        reader = self._reader(_FakeSocket(recv_error=ConnectionResetError()), _FakeSocket(_reply({})))
+        with self.assertRaises(ConnectionResetError):
+            reader.ping()
+        self.assertEqual(self.connect.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from core.page_cache import PageImageCache
+
+
+class PageImageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.renders = []
+        patcher = mock.patch("core.page_cache.render_page", self._fake_render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _pdf(self, name: str = "doc.pdf") -> str:
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "wb") as f: f.write(b"%PDF-1.4\n")
+        return path
+
+    def _fake_render(self, pdf_path, page=1, dpi=200, grayscale=False):
+        # Carta (8.5x11") en escala reducida: 1 píxel cada 10 puntos de DPI
+        self.renders.append((os.path.basename(pdf_path), page, dpi))
+        return Image.new("L" if grayscale else "RGB", (85 * dpi // 100, 110 * dpi // 100), "white")
+
+    def test_exact_hit_does_not_render_again(self):
+        cache, pdf = PageImageCache(max_bytes=10 ** 7), self._pdf()
+        first = cache.get_page(pdf, dpi=200)
+        self.assertIs(cache.get_page(pdf, dpi=200), first)
+        self.assertEqual(len(self.renders), 1)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+
+    def test_lower_dpi_is_downscaled_from_a_higher_render(self):
+        cache, pdf = PageImageCache(max_bytes=10 ** 7), self._pdf()
+        cache.get_page(pdf, dpi=300)
+        low = cache.get_page(pdf, dpi=150)
+        self.assertEqual(low.size, (128, 165))
+        self.assertEqual(len(self.renders), 1)
+        self.assertEqual(cache.stats()["downscale_hits"], 1)
+
+    def test_min_render_dpi_unless_exact_render(self):
+        cache = PageImageCache(max_bytes=10 ** 7, min_render_dpi=200)
+        cache.get_page(self._pdf("a.pdf"), dpi=120)
+        cache.get_page(self._pdf("b.pdf"), dpi=120, exact_render=True)
+        self.assertEqual(self.renders, [("a.pdf", 1, 200), ("b.pdf", 1, 120)])
+
+    def test_grayscale_setting_reaches_the_renderer(self):
+        self.assertEqual(PageImageCache(max_bytes=10 ** 7, grayscale=True).get_page(self._pdf(), dpi=100).mode, "L")
+
+    def test_least_recently_used_page_is_evicted_first(self):
+        page_bytes = 85 * 110 # Una página en grises a 100 dpi
+        cache = PageImageCache(max_bytes=2 * page_bytes, grayscale=True)
+        a, b, c = self._pdf("a.pdf"), self._pdf("b.pdf"), self._pdf("c.pdf")
+        cache.get_page(a, dpi=100)
+        cache.get_page(b, dpi=100)
+        cache.get_page(a, dpi=100) # "a" pasa a ser la más reciente
+        cache.get_page(c, dpi=100) # Expulsa "b"
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertLessEqual(cache.stats()["bytes"], 2 * page_bytes)
+        self.assertIsNotNone(cache.peek(a, min_dpi=100))
+        self.assertIsNone(cache.peek(b, min_dpi=100))
+        cache.get_page(b, dpi=100)
+        self.assertEqual(self.renders.count(("b.pdf", 1, 100)), 2)
+
+    def test_modified_file_is_not_served_from_cache(self):
+        cache, pdf = PageImageCache(max_bytes=10 ** 7), self._pdf()
+        cache.get_page(pdf, dpi=100)
+        os.utime(pdf, (0, os.path.getmtime(pdf) + 10))
+        self.assertIsNone(cache.peek(pdf, min_dpi=100))
+        cache.get_page(pdf, dpi=100)
+        self.assertEqual(len(self.renders), 2)
+
+    def test_peek_returns_smallest_render_at_or_above_min_dpi(self):
+        cache, pdf = PageImageCache(max_bytes=10 ** 8), self._pdf()
+        cache.get_page(pdf, dpi=400, exact_render=True)
+        cache.get_page(pdf, dpi=250, exact_render=True)
+        self.assertEqual(cache.peek(pdf, min_dpi=200)[0], 250)
+        self.assertEqual(cache.peek(pdf, min_dpi=300)[0], 400)
+        self.assertIsNone(cache.peek(pdf, min_dpi=500))
+
+
+if __name__ == "__main__":
+    unittest.main()
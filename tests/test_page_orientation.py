@@ -0,0 +1,72 @@
+import random
+import unittest
+
+from PIL import Image, ImageDraw, ImageFont
+
+from core.page_orientation import PageOrientation, correct_page, detect_orientation
+
+_WORDS = ("el paciente recibe la formula medica numero de acta entrega identificacion cedula ciudadania "
+          "fecha observaciones firma medicamento cantidad dosis tratamiento").split()
+_HEADER_WORDS = "ACTA DE ENTREGA No. 46150 CC 1234567 FORMULA MEDICA Nro. 2024-11-03".split()
+
+
+def _prose_page(font_size: int, seed: int = 0) -> Image.Image:
+    """Página derecha de 1700x2200 (carta a 200 dpi) con líneas de texto corrido y alguna cabecera en mayúsculas."""
+    rng = random.Random(seed)
+    page = Image.new("L", (1700, 2200), 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=font_size)
+    y = 150
+    while y < 2050:
+        if rng.random() < 0.3:
+            line = " ".join(rng.choice(_HEADER_WORDS) for _ in range(8))
+        else:
+            line = " ".join(rng.choice(_WORDS) for _ in range(10)).capitalize()
+        draw.text((120, y), line, fill=0, font=font)
+        y += int(font_size * 1.8)
+    return page
+
+
+def _scanned(page: Image.Image, rotation: int, skew: float = 0.0) -> Image.Image:
+    """Como la escanearía alguien: girada `rotation` grados antihorarios y luego inclinada `skew` grados."""
+    scanned = page.transpose({90: Image.ROTATE_90, 180: Image.ROTATE_180, 270: Image.ROTATE_270}[rotation]) if rotation else page
+    return scanned.rotate(skew, resample=Image.BILINEAR, expand=True, fillcolor=255) if skew else scanned
+
+
+class DetectOrientationTest(unittest.TestCase):
+    # Corrección esperada (antihoraria) para cada giro antihorario del escaneo
+    EXPECTED_CORRECTION = {0: 0, 90: 270, 180: 180, 270: 90}
+
+    def test_quarter_turns_of_body_text(self):
+        for font_size in (12, 20, 32):
+            page = _prose_page(font_size, seed=font_size)
+            for rotation, expected in self.EXPECTED_CORRECTION.items():
+                with self.subTest(font_size=font_size, rotation=rotation):
+                    self.assertEqual(detect_orientation(_scanned(page, rotation)).rotation, expected)
+
+    def test_upside_down_small_text_is_flipped(self):
+        for font_size in (10, 14, 20):
+            with self.subTest(font_size=font_size):
+                self.assertEqual(detect_orientation(_scanned(_prose_page(font_size), 180)).rotation, 180)
+
+    def test_skewed_pages_keep_their_quarter_turn(self):
+        page = _prose_page(20, seed=3)
+        for rotation, skew in ((0, 3.0), (0, -2.0), (180, 3.0), (90, -2.5), (270, 2.0)):
+            with self.subTest(rotation=rotation, skew=skew):
+                orientation = detect_orientation(_scanned(page, rotation, skew))
+                self.assertEqual(orientation.rotation, self.EXPECTED_CORRECTION[rotation])
+                self.assertAlmostEqual(orientation.skew, -skew, delta=0.3)
+
+    def test_blank_page_is_identity(self):
+        orientation = detect_orientation(Image.new("L", (1700, 2200), 255))
+        self.assertTrue(orientation.is_identity(0.3))
+
+    def test_correct_page_restores_upright_size(self):
+        page = _prose_page(20)
+        corrected = correct_page(_scanned(page, 90), PageOrientation(rotation=270))
+        self.assertEqual(corrected.size, page.size)
+        self.assertEqual(corrected.tobytes(), page.tobytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
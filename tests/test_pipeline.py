@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+
+from core.pipeline import PipelineStage, StagedPipeline
+
+
+def _run_in_thread(pipeline: StagedPipeline, items: list, timeout: float = 5.0) -> bool:
+    """True si run() terminó antes de `timeout` (un cierre que no se propaga dejaría hilos colgados)."""
+    thread = threading.Thread(target=pipeline.run, args=(items,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+
+class StagedPipelineTest(unittest.TestCase):
+    def test_every_item_goes_through_all_stages(self):
+        done = []
+        pipeline = StagedPipeline([PipelineStage("doble", lambda x: x * 2, workers=3, queue_size=1),
+                                   PipelineStage("mas_uno", lambda x: x + 1, workers=2, queue_size=1)],
+                                  on_item_done=done.append)
+        self.assertTrue(_run_in_thread(pipeline, list(range(20))))
+        self.assertEqual(sorted(done), [x * 2 + 1 for x in range(20)])
+        self.assertEqual([stage.processed for stage in pipeline.stages], [20, 20])
+
+    def test_none_ends_the_item_at_that_stage(self):
+        done = []
+        pipeline = StagedPipeline([PipelineStage("filtro", lambda x: x if x % 2 else None),
+                                   PipelineStage("final", lambda x: x)], on_item_done=done.append)
+        self.assertTrue(_run_in_thread(pipeline, list(range(10))))
+        self.assertEqual(sorted(done), [1, 3, 5, 7, 9])
+        self.assertEqual(pipeline.stages[1].processed, 5)
+
+    def test_errors_are_reported_per_item_and_do_not_stop_the_rest(self):
+        done, errors = [], []
+
+        def fragile(x):
+            if x == 3: raise ValueError("roto")
+            return x
+        pipeline = StagedPipeline([PipelineStage("fragil", fragile), PipelineStage("final", lambda x: x)],
+                                  on_item_done=done.append, on_item_error=lambda stage, item, e: errors.append((stage, item)))
+        self.assertTrue(_run_in_thread(pipeline, list(range(6))))
+        self.assertEqual(sorted(done), [0, 1, 2, 4, 5])
+        self.assertEqual(errors, [("fragil", 3)])
+
+    def test_batches_respect_size_and_keep_item_order(self):
+        batches, done = [], []
+
+        def batched(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+        pipeline = StagedPipeline([PipelineStage("lote", batched, batch_size=4, batch_timeout=0.5, queue_size=10)],
+                                  on_item_done=done.append)
+        self.assertTrue(_run_in_thread(pipeline, list(range(10))))
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertEqual([item for batch in batches for item in batch], list(range(10)))
+        self.assertEqual(done, [x * 10 for x in range(10)])
+
+    def test_batch_closes_early_when_input_ends(self):
+        batches = []
+        pipeline = StagedPipeline([PipelineStage("lote", lambda items: batches.append(list(items)) or items,
+                                                 batch_size=10, batch_timeout=30.0)])
+        start = time.perf_counter()
+        self.assertTrue(_run_in_thread(pipeline, [1, 2, 3]))
+        self.assertEqual(batches, [[1, 2, 3]]) # El centinela cierra el lote sin esperar batch_timeout
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+    def test_stop_drains_queues_and_shuts_down(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(x):
+            started.set()
+            release.wait(5)
+            return x
+        done = []
+        pipeline = StagedPipeline([PipelineStage("lenta", slow, queue_size=1), PipelineStage("final", lambda x: x)],
+                                  on_item_done=done.append)
+        thread = threading.Thread(target=pipeline.run, args=(list(range(50)),), daemon=True)
+        thread.start()
+        self.assertTrue(started.wait(5))
+        pipeline.stop()
+        release.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(len(done), 50)
+        self.assertTrue(all(q.empty() for q in pipeline._queues))
+
+    def test_needs_at_least_one_stage(self):
+        with self.assertRaises(ValueError):
+            StagedPipeline([])
+
+
+if __name__ == "__main__":
+    unittest.main()
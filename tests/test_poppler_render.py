@@ -0,0 +1,34 @@
+import subprocess
+import unittest
+from unittest import mock
+
+from core.poppler_render import render_region_array
+from core.poppler_text import PopplerError
+
+
+class RenderRegionErrorsTest(unittest.TestCase):
+    def _render(self):
+        return render_region_array("doc.pdf", (0.0, 0.0, 0.5, 0.5), dpi=100, page_size_pts=(612.0, 792.0))
+
+    def test_missing_binary_and_timeout_raise_poppler_error(self):
+        for error in (FileNotFoundError("pdftoppm"), subprocess.TimeoutExpired(["pdftoppm"], 60)):
+            with self.subTest(error=type(error).__name__), mock.patch("core.poppler_render.subprocess.run", side_effect=error):
+                with self.assertRaises(PopplerError):
+                    self._render()
+
+    def test_failed_run_raises_poppler_error(self):
+        failed = subprocess.CompletedProcess(["pdftoppm"], 1, stdout=b"", stderr=b"Syntax Error")
+        with mock.patch("core.poppler_render.subprocess.run", return_value=failed):
+            with self.assertRaisesRegex(PopplerError, "Syntax Error"):
+                self._render()
+
+    def test_gray_output_is_returned_as_an_array_view(self):
+        done = subprocess.CompletedProcess(["pdftoppm"], 0, stdout=b"P5\n3 2\n255\n" + bytes(range(6)), stderr=b"")
+        with mock.patch("core.poppler_render.subprocess.run", return_value=done):
+            region = self._render()
+        self.assertEqual(region.shape, (2, 3))
+        self.assertEqual(region[1].tolist(), [3, 4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import email.utils
+import time
+import unittest
+from unittest import mock
+
+from core.rate_limiter import AsyncTokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class ParseRetryAfterTest(unittest.TestCase):
+    def test_missing_headers(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after({}))
+
+    def test_milliseconds_take_precedence(self):
+        self.assertEqual(parse_retry_after({"retry-after-ms": "1500", "retry-after": "9"}), 1.5)
+
+    def test_seconds_and_invalid_values(self):
+        self.assertEqual(parse_retry_after({"retry-after": "7"}), 7.0)
+        self.assertEqual(parse_retry_after({"retry-after-ms": "abc", "retry-after": "2"}), 2.0)
+        self.assertIsNone(parse_retry_after({"retry-after": "pronto"}))
+
+    def test_http_date(self):
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertAlmostEqual(parse_retry_after({"retry-after": date}), 30.0, delta=2.0)
+        past = email.utils.formatdate(time.time() - 30, usegmt=True)
+        self.assertEqual(parse_retry_after({"retry-after": past}), 0.0)
+
+
+class AsyncTokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("core.rate_limiter.asyncio.sleep", self.clock.sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _acquire(self, bucket: AsyncTokenBucket, times: int):
+        async def acquire_all():
+            for _ in range(times):
+                await bucket.acquire()
+        _run(acquire_all())
+
+    def test_burst_then_steady_rate(self):
+        bucket = AsyncTokenBucket(rate=2.0, burst=3, clock=self.clock)
+        self._acquire(bucket, 3)
+        self.assertEqual(self.clock.now, 0.0)
+        self._acquire(bucket, 2)
+        self.assertAlmostEqual(self.clock.now, 1.0)
+        self.assertEqual(bucket.acquired, 5)
+        self.assertAlmostEqual(bucket.waited_seconds, 1.0)
+
+    def test_rate_limited_halves_rate_and_drops_burst(self):
+        bucket = AsyncTokenBucket(rate=4.0, burst=4, clock=self.clock)
+        bucket.on_rate_limited()
+        self.assertEqual(bucket.rate, 2.0)
+        self._acquire(bucket, 1)
+        self.assertAlmostEqual(self.clock.now, 0.5) # Sin ráfaga: el siguiente token llega a la nueva tasa
+
+    def test_rate_never_below_minimum(self):
+        bucket = AsyncTokenBucket(rate=1.0, min_rate=0.4, clock=self.clock)
+        for _ in range(5): bucket.on_rate_limited()
+        self.assertEqual(bucket.rate, 0.4)
+        self.assertEqual(bucket.rate_limited, 5)
+
+    def test_retry_after_blocks_until_deadline(self):
+        bucket = AsyncTokenBucket(rate=10.0, burst=10, clock=self.clock)
+        bucket.on_rate_limited(retry_after=3.0)
+        self._acquire(bucket, 1)
+        self.assertGreaterEqual(self.clock.now, 3.0)
+
+    def test_success_recovers_additively_up_to_max(self):
+        bucket = AsyncTokenBucket(rate=10.0, recovery_step=2.0, clock=self.clock)
+        bucket.on_rate_limited()
+        bucket.on_rate_limited()
+        self.assertEqual(bucket.rate, 2.5)
+        bucket.on_success()
+        self.assertEqual(bucket.rate, 4.5)
+        for _ in range(10): bucket.on_success()
+        self.assertEqual(bucket.rate, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
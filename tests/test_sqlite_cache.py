@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core.ai_cache import AIResultCache
+from core.sqlite_cache import SQLiteCache
+
+
+def _entry_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+class SQLiteCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.db_path = os.path.join(self.tmp_dir.name, "cache.sqlite3")
+        self.now = 1000.0
+        patcher = mock.patch("core.sqlite_cache.time")
+        fake_time = patcher.start()
+        fake_time.time.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+
+    def _cache(self, max_bytes: int = 10 ** 6, ttl_seconds=None) -> SQLiteCache:
+        cache = SQLiteCache(self.db_path, table="pruebas", max_bytes=max_bytes, ttl_seconds=ttl_seconds)
+        self.addCleanup(cache._conn.close)
+        return cache
+
+    def test_round_trip_and_counters(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", {"texto": "Acta Nº 46150", "metodo": "ocr"})
+        self.assertEqual(cache.get("a"), {"texto": "Acta Nº 46150", "metodo": "ocr"})
+        self.assertEqual({key: cache.stats()[key] for key in ("hits", "misses", "entries")}, {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_values_survive_reopening(self):
+        self._cache().set("a", [1, 2, 3])
+        self.assertEqual(self._cache().get("a"), [1, 2, 3])
+
+    def test_least_recently_accessed_entries_are_evicted_first(self):
+        value = "x" * 100
+        cache = self._cache(max_bytes=3 * _entry_size(value))
+        for key in ("a", "b", "c"):
+            cache.set(key, value)
+            self.now += 1
+        cache.get("a") # "b" pasa a ser la menos usada
+        self.now += 1
+        cache.set("d", value)
+        self.assertIsNone(cache.get("b"))
+        for key in ("a", "c", "d"):
+            self.assertEqual(cache.get(key), value)
+        self.assertLessEqual(cache.stats()["bytes"], 3 * _entry_size(value))
+
+    def test_expired_entry_is_a_miss_and_is_deleted(self):
+        cache = self._cache(ttl_seconds=60)
+        cache.set("a", "valor")
+        self.now += 59
+        self.assertEqual(cache.get("a"), "valor") # Leerla no renueva su antigüedad
+        self.now += 2
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expired"], 1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_writes_drop_every_expired_entry(self):
+        cache = self._cache(ttl_seconds=60)
+        cache.set("viejo_1", 1)
+        cache.set("viejo_2", 2)
+        self.now += 120
+        cache.set("nuevo", 3)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["expired"], 2)
+
+    def test_purge_empties_the_table(self):
+        cache = self._cache()
+        cache.set("a", 1)
+        cache.purge()
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+class AIResultCacheKeyTest(unittest.TestCase):
+    def test_key_changes_with_model_kind_prompt_version_and_payload(self):
+        base = ("modelo", "texto", 1, "hash")
+        key = AIResultCache.make_key(*base)
+        self.assertEqual(key, AIResultCache.make_key(*base))
+        for position, other in enumerate(("otro_modelo", "vision", 2, "otro_hash")):
+            changed = list(base)
+            changed[position] = other
+            with self.subTest(campo=position):
+                self.assertNotEqual(AIResultCache.make_key(*changed), key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import importlib
+import sys
+import threading
+import time
+from typing import List, Tuple
+
+from utils.logger import get_app_logger
+app_logger = get_app_logger()
+
+
+class StartupTimer:
+    """
+    Cronómetro del arranque: tiempo de importación de los módulos pesados (que se importan de forma
+    diferida, en su primer uso) y marcas de hitos (ventana visible, OCR listo) relativas al inicio.
+    """
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._imports: List[Tuple[str, float]] = []
+        self._marks: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def import_module(self, name: str):
+        """importlib.import_module que registra la duración de la primera importación del módulo."""
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        with self._lock:
+            self._imports.append((name, time.perf_counter() - start))
+        return module
+
+    def record_import(self, name: str, seconds: float):
+        with self._lock:
+            self._imports.append((name, seconds))
+
+    def mark(self, milestone: str):
+        with self._lock:
+            self._marks.append((milestone, time.perf_counter() - self._start))
+
+    def report(self) -> str:
+        with self._lock:
+            imports = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in self._imports)
+            marks = " | ".join(f"{name} a los {seconds:.2f}s" for name, seconds in self._marks)
+        return f"Importaciones: {imports or '-'}. Hitos: {marks or '-'}."
+
+    def log_report(self):
+        app_logger.info(f"Tiempos de arranque. {self.report()}")
+
+
+startup_timer = StartupTimer()